@@ -1,5 +1,7 @@
 """JWT validation and Auth0 user id extraction."""
-import os
+import hashlib
+import threading
+import time
 from typing import Optional
 
 import jwt
@@ -7,12 +9,50 @@ from fastapi import HTTPException, Security, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from jwt import PyJWKClient
 
-from backend.core.config import AUTH0_AUDIENCE, AUTH0_DOMAIN
+from backend.core.cache import TTLCache
+from backend.core.config import (
+    AUTH0_AUDIENCE,
+    AUTH0_DOMAIN,
+    AUTH0_HTTP_TIMEOUT_SECONDS,
+    AUTH0_JWKS_REFRESH_SECONDS,
+    AUTH_CLAIMS_CACHE_SIZE,
+)
 
 security = HTTPBearer(auto_error=False)
 
+# sha256(token) -> verified claims; each entry expires with the token's exp
+_claims_cache = TTLCache(AUTH_CLAIMS_CACHE_SIZE, ttl=0.0)
+
+_verify_lock = threading.Lock()
+_verify_stats = {"count": 0, "failures": 0, "total_ms": 0.0, "max_ms": 0.0}
+
+
+class _JWKClient(PyJWKClient):
+    """PyJWKClient that counts JWKS fetches (startup, background refresh, unknown kid)."""
+
+    def __init__(self, uri: str):
+        # Cached set outlives two refresh periods, so requests only fetch on an unknown kid
+        # or when the background refresh has been failing
+        super().__init__(uri, lifespan=2 * AUTH0_JWKS_REFRESH_SECONDS, timeout=AUTH0_HTTP_TIMEOUT_SECONDS)
+        self.fetches = 0
+        self.fetch_failures = 0
+        self.last_fetch_at: float | None = None
+
+    def fetch_data(self):
+        try:
+            data = super().fetch_data()
+        except Exception:
+            self.fetch_failures += 1
+            raise
+        self.fetches += 1
+        self.last_fetch_at = time.monotonic()
+        return data
+
+
 # Cache JWKS client per domain
-_jwks_client: Optional[PyJWKClient] = None
+_jwks_client: Optional[_JWKClient] = None
+_refresher: threading.Thread | None = None
+_stop_refresh = threading.Event()
 
 
 def _get_jwks_client() -> PyJWKClient:
@@ -23,10 +63,92 @@ def _get_jwks_client() -> PyJWKClient:
                 status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
                 detail="Auth0 is not configured (AUTH0_DOMAIN)",
             )
-        _jwks_client = PyJWKClient(f"https://{AUTH0_DOMAIN}/.well-known/jwks.json")
+        _jwks_client = _JWKClient(f"https://{AUTH0_DOMAIN}/.well-known/jwks.json")
     return _jwks_client
 
 
+def _refresh_jwks() -> bool:
+    try:
+        _get_jwks_client().get_jwk_set(refresh=True)
+        return True
+    except Exception as e:
+        print(f"[Auth] JWKS fetch failed: {e}")
+        return False
+
+
+def _run_refresher() -> None:
+    while not _stop_refresh.wait(AUTH0_JWKS_REFRESH_SECONDS):
+        _refresh_jwks()
+
+
+def start() -> None:
+    """Fetch the JWKS now (so the first request does not pay for it) and keep it fresh in the background."""
+    global _refresher
+    if not AUTH0_DOMAIN or not AUTH0_AUDIENCE:
+        return  # signatures are not verified, nothing to fetch
+    _refresh_jwks()
+    _stop_refresh.clear()
+    if _refresher is None or not _refresher.is_alive():
+        _refresher = threading.Thread(target=_run_refresher, name="jwks-refresher", daemon=True)
+        _refresher.start()
+
+
+def stop() -> None:
+    _stop_refresh.set()
+
+
+def _decode(token: str) -> dict:
+    # If no audience configured, decode without verification (dev only)
+    if not AUTH0_AUDIENCE:
+        return jwt.decode(
+            token,
+            options={"verify_signature": False},
+            algorithms=["RS256"],
+        )
+    signing_key = _get_jwks_client().get_signing_key_from_jwt(token)
+    return jwt.decode(
+        token,
+        signing_key.key,
+        algorithms=["RS256"],
+        audience=AUTH0_AUDIENCE,
+    )
+
+
+def _verify(token: str) -> dict:
+    """Decode and verify a token, recording how long it took."""
+    start = time.perf_counter()
+    ok = False
+    try:
+        payload = _decode(token)
+        ok = True
+        return payload
+    finally:
+        ms = (time.perf_counter() - start) * 1000
+        with _verify_lock:
+            _verify_stats["count"] += 1
+            _verify_stats["failures"] += 0 if ok else 1
+            _verify_stats["total_ms"] += ms
+            _verify_stats["max_ms"] = max(_verify_stats["max_ms"], ms)
+
+
+def get_claims(token: str) -> dict:
+    """
+    Verified claims of a token. Served from the claims cache while the token is unexpired;
+    otherwise fully verified and cached until its exp. Raises jwt.InvalidTokenError.
+    """
+    key = hashlib.sha256(token.encode("utf-8")).digest()
+    payload = _claims_cache.get(key)
+    if payload is not None:
+        return payload
+    payload = _verify(token)
+    exp = payload.get("exp")
+    if isinstance(exp, (int, float)):
+        remaining = exp - time.time()
+        if remaining > 0:
+            _claims_cache.set(key, payload, expires_at=time.monotonic() + remaining)
+    return payload
+
+
 def get_sub_from_token(credentials: Optional[HTTPAuthorizationCredentials]) -> str:
     """Validate Bearer token and return Auth0 user id (sub). Raises HTTPException if invalid."""
     if not credentials or not credentials.credentials:
@@ -36,21 +158,7 @@ def get_sub_from_token(credentials: Optional[HTTPAuthorizationCredentials]) -> s
         )
     token = credentials.credentials
     try:
-        # If no audience configured, decode without verification (dev only)
-        if not AUTH0_AUDIENCE:
-            payload = jwt.decode(
-                token,
-                options={"verify_signature": False},
-                algorithms=["RS256"],
-            )
-        else:
-            signing_key = _get_jwks_client().get_signing_key_from_jwt(token)
-            payload = jwt.decode(
-                token,
-                signing_key.key,
-                algorithms=["RS256"],
-                audience=AUTH0_AUDIENCE,
-            )
+        payload = get_claims(token)
         sub = payload.get("sub")
         if not sub:
             raise HTTPException(
@@ -63,3 +171,20 @@ def get_sub_from_token(credentials: Optional[HTTPAuthorizationCredentials]) -> s
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or expired token",
         ) from e
+
+
+def stats() -> dict:
+    """Claims cache hit rate, full-verification latency and JWKS fetch counters."""
+    with _verify_lock:
+        verify = {
+            **_verify_stats,
+            "avg_ms": _verify_stats["total_ms"] / _verify_stats["count"] if _verify_stats["count"] else 0.0,
+        }
+    jwks = None
+    if _jwks_client is not None:
+        jwks = {
+            "fetches": _jwks_client.fetches,
+            "fetch_failures": _jwks_client.fetch_failures,
+            "age_s": time.monotonic() - _jwks_client.last_fetch_at if _jwks_client.last_fetch_at else None,
+        }
+    return {"claims_cache": _claims_cache.stats(), "verify": verify, "jwks": jwks}
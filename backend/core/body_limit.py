@@ -0,0 +1,61 @@
+"""ASGI middleware capping request body size per path, enforced while the body is received."""
+from starlette.exceptions import HTTPException
+from starlette.responses import JSONResponse
+
+
+class _BodyTooLarge(HTTPException):
+    """An HTTPException, so FastAPI's form parsing lets it through as a 413 rather than a 400."""
+
+    def __init__(self, limit: int):
+        super().__init__(status_code=413, detail=f"Request body too large (max {limit} bytes)")
+
+
+class BodySizeLimitMiddleware:
+    """
+    Answers 413 once a request to one of `limits`' paths declares (Content-Length) or sends more
+    than its limit in bytes. Counting the received chunks also covers chunked requests, and it
+    happens before FastAPI parses a multipart form, so an oversized upload is never spooled whole.
+    """
+
+    def __init__(self, app, limits: dict[str, int]):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope, receive, send):
+        limit = self.limits.get(scope["path"]) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+        for name, value in scope["headers"]:
+            if name == b"content-length" and value.isdigit() and int(value) > limit:
+                await self._reject(_BodyTooLarge(limit), scope, receive, send)
+                return
+
+        received = 0
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise _BodyTooLarge(limit)
+            return message
+
+        async def tracked_send(message):
+            nonlocal response_started
+            response_started |= message["type"] == "http.response.start"
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracked_send)
+        except _BodyTooLarge as e:
+            # Raised where nothing turned it into a response (e.g. the body read outside a route)
+            if response_started:
+                raise
+            await self._reject(e, scope, receive, send)
+
+    @staticmethod
+    async def _reject(exc: HTTPException, scope, receive, send) -> None:
+        await JSONResponse({"detail": exc.detail}, status_code=exc.status_code)(scope, receive, send)
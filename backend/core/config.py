@@ -7,13 +7,105 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 DATA_DIR = BASE_DIR / "data"
 # MAG id (OpenAlex URL) -> title; lives at backend/mag_id_to_title.json
 MAG_ID_TO_TITLE_PATH = BASE_DIR / "mag_id_to_title.json"
+# Binary title store built from MAG_ID_TO_TITLE_PATH (see services/title_store.py):
+# int64 offsets, shape (num_nodes + 1,); title of node i is blob[offsets[i]:offsets[i + 1]] as UTF-8
+TITLE_OFFSETS_PATH = BASE_DIR / "titles.offsets.i64.npy"
+TITLE_BLOB_PATH = BASE_DIR / "titles.utf8.bin"
 # MAG id -> node index; 1D array in same order as sorted MAG_ID_TO_TITLE_PATH keys
 MAG_TO_NODE_IDX_PATH = BASE_DIR / "mag_to_node_idx.npy"
 # Node index -> paper id (from same mapping as mag_to_node_idx); for for-you recommendations
 NODE_TO_MAG_ID_PATH = BASE_DIR / "node_to_mag_id.npy"
-# L2-normalized paper embeddings, shape (num_nodes, 256); row i = node i
+# Array-backed versions of the two pickled mappings above (plain int64 .npy, memory-mapped; see services/id_mapping.py)
+# Dense node index -> MAG id (-1 where a node has no MAG id)
+NODE_TO_MAG_ARRAY_PATH = BASE_DIR / "node_to_mag.i64.npy"
+# Sorted MAG ids, and the node index of each (searchsorted permutation for MAG id -> node index)
+MAG_SORTED_PATH = BASE_DIR / "mag_sorted.i64.npy"
+MAG_SORTED_NODE_PATH = BASE_DIR / "mag_sorted_node.i64.npy"
+# Paper embeddings, shape (num_nodes, 256); row i = node i
 PAPER_EMBEDDINGS_PATH = BASE_DIR / "paper_embeddings_256d.npy"
+# L2-normalized float32 copy of PAPER_EMBEDDINGS_PATH, written once and memory-mapped read-only by every worker
+PAPER_EMBEDDINGS_NORMALIZED_PATH = BASE_DIR / "paper_embeddings_256d.normalized.npy"
 UPLOAD_DIR = BASE_DIR / "uploads"
+# PDF uploads: streamed in chunks off the event loop, stored as <sha256>.pdf (re-uploads are deduplicated)
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(50 * 2**20)))
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", str(2**20)))
+# Whole /api/upload request body (file + multipart boundaries, part headers, form fields), enforced as it is
+# received, before the form is parsed (core/body_limit.py)
+UPLOAD_MAX_REQUEST_BYTES = UPLOAD_MAX_BYTES + 64 * 2**10
+# Uploaded PDF -> text -> Qwen embedding -> GNN embedding -> nearest papers, run in a process pool
+# (services/pipeline.py). Job state lives in SQLite so any API worker can answer status requests.
+ML_PIPELINE_DIR = BASE_DIR.parent / "ml_pipeline"
+PIPELINE_JOBS_DB_PATH = DATA_DIR / "pipeline_jobs.sqlite3"
+PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", "1"))
+# Jobs queued or running per API worker; further submissions get 503 + Retry-After
+PIPELINE_MAX_PENDING = int(os.getenv("PIPELINE_MAX_PENDING", "8"))
+PIPELINE_RETRY_AFTER_SECONDS = int(os.getenv("PIPELINE_RETRY_AFTER_SECONDS", "30"))
+PIPELINE_NEIGHBOURS = int(os.getenv("PIPELINE_NEIGHBOURS", "20"))
+# Per-node Qwen features of the citation graph (torch tensor (num_nodes, 256) from
+# ml_pipeline/src/embeddings/qwen_embed.generate_qwen_embeddings); zeros if absent
+PIPELINE_NODE_QWEN_EMBEDDINGS_PATH = Path(
+    os.getenv("PIPELINE_NODE_QWEN_EMBEDDINGS_PATH", str(ML_PIPELINE_DIR / "data" / "qwen_embeddings.pt"))
+)
+# Local paper metadata (title, abstract, arxiv_id, pdf_url) keyed by node index; built from the
+# ml_pipeline's arxiv_mag_metadata.json by scripts/ingest_metadata.py. Read before falling back to OpenAlex.
+PAPER_METADATA_DB_PATH = DATA_DIR / "paper_metadata.sqlite3"
+ARXIV_METADATA_JSON_PATH = BASE_DIR.parent / "ml_pipeline" / "arxiv_mag_metadata.json"
+# Local authoritative click history (services/history_store.py), synced to Auth0 user_metadata in the background.
+# Clicks arriving within the flush delay are coalesced into one PATCH per user.
+NODE_HISTORY_DB_PATH = DATA_DIR / "node_history.sqlite3"
+NODE_HISTORY_FLUSH_DELAY_SECONDS = float(os.getenv("NODE_HISTORY_FLUSH_DELAY_SECONDS", "1.0"))
+NODE_HISTORY_RETRY_SECONDS = float(os.getenv("NODE_HISTORY_RETRY_SECONDS", "30"))
+# A worker PATCHing a user's history holds that user for this long, so workers don't overwrite each other's
+# newer PATCH with an older one; must outlast set_node_history (token fetch + PATCH, with its retry)
+NODE_HISTORY_FLUSH_LEASE_SECONDS = float(os.getenv("NODE_HISTORY_FLUSH_LEASE_SECONDS", "60"))
+
+# OpenAlex work lookups: in-process LRU (per worker) in front of a SQLite file shared by workers.
+# Negative results (MAG id unknown to OpenAlex) are cached too, for a shorter time.
+OPENALEX_CACHE_PATH = DATA_DIR / "openalex_cache.sqlite3"
+OPENALEX_CACHE_MEMORY_SIZE = int(os.getenv("OPENALEX_CACHE_MEMORY_SIZE", "20000"))
+OPENALEX_CACHE_TTL_SECONDS = float(os.getenv("OPENALEX_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+OPENALEX_CACHE_NEGATIVE_TTL_SECONDS = float(os.getenv("OPENALEX_CACHE_NEGATIVE_TTL_SECONDS", "3600"))
+
+# Async OpenAlex client (services/openalex_client.py); point OPENALEX_BASE_URL at a stub server for testing
+OPENALEX_BASE_URL = os.getenv("OPENALEX_BASE_URL", "https://api.openalex.org").rstrip("/")
+OPENALEX_MAILTO = os.getenv("OPENALEX_MAILTO", "")  # joins OpenAlex's "polite pool" if set
+OPENALEX_TIMEOUT_SECONDS = float(os.getenv("OPENALEX_TIMEOUT_SECONDS", "10"))
+OPENALEX_MAX_CONNECTIONS = int(os.getenv("OPENALEX_MAX_CONNECTIONS", "20"))
+OPENALEX_MAX_CONCURRENCY = int(os.getenv("OPENALEX_MAX_CONCURRENCY", "10"))
+OPENALEX_MAX_RETRIES = int(os.getenv("OPENALEX_MAX_RETRIES", "2"))
+# MAG ids per multi-id request (filter=ids.mag:a|b|c); OpenAlex allows up to 100 values per filter
+OPENALEX_BATCH_SIZE = int(os.getenv("OPENALEX_BATCH_SIZE", "50"))
+# Max MAG ids accepted by POST /api/papers/paper-info/batch
+PAPER_INFO_BATCH_MAX_IDS = int(os.getenv("PAPER_INFO_BATCH_MAX_IDS", "300"))
+# Circuit breaker: open after this many consecutive failed lookups, probe again after the reset time
+OPENALEX_BREAKER_FAILURE_THRESHOLD = int(os.getenv("OPENALEX_BREAKER_FAILURE_THRESHOLD", "5"))
+OPENALEX_BREAKER_RESET_SECONDS = float(os.getenv("OPENALEX_BREAKER_RESET_SECONDS", "30"))
+
+# Nearest-neighbour engine for the For You feed: "hnsw" or "ivf" (faiss), "exact" (brute force), or a compressed
+# scoring tier with exact float32 re-rank: "int8" (per-row scale), "fp16", "pca" (ANN_PCA_DIM dims).
+# Exact is the default: ~25 ms per query at this corpus size, versus minutes to build HNSW on first start
+ANN_INDEX_KIND = os.getenv("ANN_INDEX_KIND", "exact").lower()
+# Built faiss indexes (hnsw / ivf), written once per configuration and memory-mapped by every worker
+ANN_INDEX_DIR = DATA_DIR / "ann_index"
+ANN_HNSW_M = int(os.getenv("ANN_HNSW_M", "32"))
+ANN_HNSW_EF_CONSTRUCTION = int(os.getenv("ANN_HNSW_EF_CONSTRUCTION", "80"))
+ANN_HNSW_EF_SEARCH = int(os.getenv("ANN_HNSW_EF_SEARCH", "128"))
+ANN_IVF_NLIST = int(os.getenv("ANN_IVF_NLIST", "1024"))
+ANN_IVF_NPROBE = int(os.getenv("ANN_IVF_NPROBE", "16"))
+ANN_PCA_DIM = int(os.getenv("ANN_PCA_DIM", "64"))
+# Candidates from the compressed first pass that are re-scored exactly
+ANN_RERANK_CANDIDATES = int(os.getenv("ANN_RERANK_CANDIDATES", "300"))
+# Concurrent feed queries are scored together: up to SEARCH_BATCH_MAX_SIZE queries arriving within
+# SEARCH_BATCH_WINDOW_MS of the first one share one search_batch call (one GEMM for exact search)
+SEARCH_BATCH_MAX_SIZE = int(os.getenv("SEARCH_BATCH_MAX_SIZE", "32"))
+SEARCH_BATCH_WINDOW_MS = float(os.getenv("SEARCH_BATCH_WINDOW_MS", "2"))
+# For You: per-worker cache of the similarity-ranked part of the feed, keyed by history hash
+FEED_CACHE_SIZE = int(os.getenv("FEED_CACHE_SIZE", "10000"))
+FEED_CACHE_TTL_SECONDS = float(os.getenv("FEED_CACHE_TTL_SECONDS", "600"))
+# Length of that ranking: how far a user can scroll through similar papers
+FEED_MAX_CANDIDATES = int(os.getenv("FEED_MAX_CANDIDATES", "1000"))
+# Lifetime of a pagination cursor; older cursors get 410
+FEED_SESSION_TTL_SECONDS = float(os.getenv("FEED_SESSION_TTL_SECONDS", "1800"))
 
 # Auth0 (optional): for JWT validation and Management API user_metadata)
 AUTH0_DOMAIN = os.getenv("AUTH0_DOMAIN", "").rstrip("/")
@@ -21,3 +113,12 @@ AUTH0_AUDIENCE = os.getenv("AUTH0_AUDIENCE", "")  # API identifier for JWT valid
 AUTH0_M2M_CLIENT_ID = os.getenv("AUTH0_M2M_CLIENT_ID", "")
 AUTH0_M2M_CLIENT_SECRET = os.getenv("AUTH0_M2M_CLIENT_SECRET", "")
 AUTH0_MANAGEMENT_AUDIENCE = f"https://{AUTH0_DOMAIN}/api/v2/" if AUTH0_DOMAIN else ""
+# Outbound Auth0 HTTP (token endpoint + Management API): one pooled keep-alive client per worker
+AUTH0_HTTP_TIMEOUT_SECONDS = float(os.getenv("AUTH0_HTTP_TIMEOUT_SECONDS", "10"))
+AUTH0_HTTP_MAX_CONNECTIONS = int(os.getenv("AUTH0_HTTP_MAX_CONNECTIONS", "20"))
+# Refresh the cached M2M token this many seconds before its expires_in runs out
+AUTH0_TOKEN_REFRESH_MARGIN_SECONDS = float(os.getenv("AUTH0_TOKEN_REFRESH_MARGIN_SECONDS", "60"))
+# Verified JWT claims are cached (keyed by token hash) until the token's exp
+AUTH_CLAIMS_CACHE_SIZE = int(os.getenv("AUTH_CLAIMS_CACHE_SIZE", "10000"))
+# JWKS is fetched at startup and refreshed in the background this often
+AUTH0_JWKS_REFRESH_SECONDS = float(os.getenv("AUTH0_JWKS_REFRESH_SECONDS", "600"))
@@ -1,21 +1,50 @@
 from dotenv import load_dotenv
 load_dotenv()
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from routers import papers, upload, user
+from routers import jobs, papers, upload, user
+from backend.core import auth
+from backend.core.body_limit import BodySizeLimitMiddleware
+from backend.core.config import UPLOAD_MAX_REQUEST_BYTES
+from backend.services import (
+    auth0_storage,
+    embedding_store,
+    history_store,
+    openalex_cache,
+    openalex_client,
+    pipeline,
+)
 import numpy as np
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    auth.start()
+    history_store.start()
+    pipeline.start()
+    papers.warm_up()
+    yield
+    # Shutdown: push pending click history to Auth0, then release pooled outbound connections
+    auth.stop()
+    pipeline.stop()
+    history_store.stop()
+    await openalex_client.aclose_client()
+    auth0_storage.close_http_client()
+
+
 app = FastAPI(
     title="Ariadne API",
     description="Backend for paper discovery and uploads",
+    lifespan=lifespan,
 )
 
-# Load precomputed embeddings (no torch needed!)
-embeddings = np.load("paper_embeddings_256d.npy").astype('float32')
-embeddings = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+# Precomputed, pre-normalized embeddings, memory-mapped read-only (pages shared across workers)
+embeddings = embedding_store.get_embeddings()
 
-print(f"✅ Loaded {embeddings.shape[0]} paper embeddings")
+print(f"✅ Mapped {embeddings.shape[0]} paper embeddings")
 
 # app.add_middleware(
 #     CORSMiddleware,
@@ -37,14 +66,33 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Oversized uploads are cut off as they arrive, not after Starlette has spooled the whole form
+app.add_middleware(BodySizeLimitMiddleware, limits={"/api/upload": UPLOAD_MAX_REQUEST_BYTES})
+
 app.include_router(upload.router)
 app.include_router(papers.router)
 app.include_router(user.router)
+app.include_router(jobs.router)
 
 @app.get("/")
 def read_root():
     return {"message": "Hello, World!"}
 
+
+@app.get("/stats")
+def get_stats():
+    """Per-worker resource usage and cache counters."""
+    return {
+        "embeddings": embedding_store.memory_usage(),
+        "openalex_cache": openalex_cache.get_cache().stats(),
+        "openalex_client": openalex_client.stats(),
+        "auth": auth.stats(),
+        "auth0": auth0_storage.stats(),
+        "node_history": history_store.stats(),
+        "feed_cache": papers.feed_cache_stats(),
+        "pipeline": pipeline.stats(),
+    }
+
 # Keep this endpoint but use precomputed embeddings
 from pydantic import BaseModel
 from typing import List
@@ -0,0 +1,29 @@
+"""Status and results of background pipeline jobs started by PDF uploads."""
+from fastapi import APIRouter, HTTPException
+
+from backend.services import pipeline
+
+router = APIRouter(prefix="/api/jobs", tags=["jobs"])
+
+
+@router.get("/{job_id}")
+def get_job_status(job_id: str):
+    """Job status: queued | running (with the current stage) | done | failed (with the error)."""
+    job = pipeline.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return job
+
+
+@router.get("/{job_id}/result")
+def get_job_result(job_id: str):
+    """
+    Result of a finished job: extracted title/abstract, semantic and GNN embeddings, resolved
+    citations and nearest papers. 409 while the job is not done.
+    """
+    job = pipeline.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    if job["status"] != pipeline.DONE:
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}")
+    return {"job_id": job_id, **pipeline.get_result(job_id)}
@@ -1,84 +1,278 @@
 """Paper-related endpoints: arXiv PDF URL by MAG id, For You feed."""
+import base64
+import hashlib
+import secrets
+import threading
+import time
+from typing import NamedTuple
+
 import numpy as np
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from backend.core.auth import get_sub_from_token, security
+from backend.core.cache import TTLCache
 from backend.core.config import (
-    MAG_TO_NODE_IDX_PATH,
-    NODE_TO_MAG_ID_PATH,
-    PAPER_EMBEDDINGS_PATH,
+    ANN_INDEX_DIR,
+    FEED_CACHE_SIZE,
+    FEED_CACHE_TTL_SECONDS,
+    FEED_MAX_CANDIDATES,
+    FEED_SESSION_TTL_SECONDS,
+    PAPER_INFO_BATCH_MAX_IDS,
 )
-from backend.services import auth0_storage, paper_service
+from backend.services import ann_index, batch_search, embedding_store, history_store, id_mapping, paper_service, title_store
+from backend.services.auth0_storage import NODE_HISTORY_MAX_SIZE
 
 router = APIRouter(prefix="/api/papers", tags=["papers"])
 
-# In-memory click history: node ids (for terminal logging only; Auth0 is source of truth)
+# In-memory click history: node ids (for terminal logging only; history_store is source of truth)
 _click_history: list[int] = []
 
-# mag_to_node dict (paper id -> node idx), loaded from mag_to_node_idx.npy
-_mag_to_node: dict | None = None
-# node_to_mag dict (node idx -> paper id), loaded from node_to_mag_id.npy
-_node_to_mag: dict | None = None
-# L2-normalized embeddings, shape (num_nodes, 256)
-_embeddings: np.ndarray | None = None
+# Sorted node ids that have both a MAG id and a title (the only nodes the feed can serve)
+_servable_nodes: np.ndarray | None = None
+# Nearest-neighbour index over _servable_nodes (ANN_INDEX_KIND), behind a micro-batching executor
+_index: batch_search.BatchedSearcher | None = None
+# Concurrent first requests must not each build an index (and start a collector thread)
+_index_lock = threading.Lock()
 
+# For You feed: every block of 50 items is 35 similar papers followed by 15 random servable papers
+_N_SIMILAR = 35
+_N_RANDOM = 15
+_BLOCK = _N_SIMILAR + _N_RANDOM
 
-def _load_mag_to_node() -> dict:
-    """Load mag_to_node dict from mag_to_node_idx.npy (saved as np.save(dict))."""
-    global _mag_to_node
-    if _mag_to_node is None:
-        if not MAG_TO_NODE_IDX_PATH.exists():
-            raise FileNotFoundError(f"Mapping not found: {MAG_TO_NODE_IDX_PATH}")
-        arr = np.load(MAG_TO_NODE_IDX_PATH, allow_pickle=True)
-        _mag_to_node = arr.item()
-    return _mag_to_node
+# History hash -> (ranked node ids, scores): up to FEED_MAX_CANDIDATES similar papers. The ranking
+# depends only on the history, so a click simply makes the next request use a new key.
+_feed_cache = TTLCache(FEED_CACHE_SIZE, FEED_CACHE_TTL_SECONDS)
+# Ranking for users without usable history (similarity to the corpus mean): (node ids, scores).
+# Constant, so computed once; extra rows leave room to exclude history entries.
+_cold_start: tuple[np.ndarray, np.ndarray] | None = None
 
 
-def _load_node_to_mag() -> dict:
-    """Load node_to_mag dict from node_to_mag_id.npy (saved as np.save(dict))."""
-    global _node_to_mag
-    if _node_to_mag is None:
-        if not NODE_TO_MAG_ID_PATH.exists():
-            raise FileNotFoundError(f"Mapping not found: {NODE_TO_MAG_ID_PATH}")
-        arr = np.load(NODE_TO_MAG_ID_PATH, allow_pickle=True)
-        _node_to_mag = arr.item()
-    return _node_to_mag
+def _load_embeddings() -> np.ndarray:
+    """L2-normalized embeddings, shape (num_nodes, 256), shared read-only via the embedding store."""
+    return embedding_store.get_embeddings()
 
 
-def _load_embeddings() -> np.ndarray:
-    """Load and L2-normalize paper embeddings."""
-    global _embeddings
-    if _embeddings is None:
-        if not PAPER_EMBEDDINGS_PATH.exists():
-            raise FileNotFoundError(f"Embeddings not found: {PAPER_EMBEDDINGS_PATH}")
-        emb = np.load(PAPER_EMBEDDINGS_PATH).astype(np.float32)
-        _embeddings = emb / np.linalg.norm(emb, axis=1, keepdims=True)
-    return _embeddings
+def _load_servable_nodes() -> np.ndarray:
+    """Precompute (once) the sorted node ids that have a MAG id and a title."""
+    global _servable_nodes
+    if _servable_nodes is None:
+        num_nodes = _load_embeddings().shape[0]
+        has_mag = id_mapping.nodes_to_mags(np.arange(num_nodes)) != id_mapping.MISSING
+        has_title = np.zeros(num_nodes, dtype=bool)
+        mask = title_store.has_title_mask()[:num_nodes]
+        has_title[:len(mask)] = mask
+        _servable_nodes = np.flatnonzero(has_mag & has_title).astype(np.int64)
+    return _servable_nodes
+
+
+def _load_index() -> batch_search.BatchedSearcher:
+    """Build (or map the persisted) nearest-neighbour index over embeddings of servable nodes, once."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                embeddings = _load_embeddings()
+                index = ann_index.build_index(embeddings, ids=_load_servable_nodes(), cache_dir=ANN_INDEX_DIR)
+                _index = batch_search.BatchedSearcher(index)
+                print(f"✅ Loaded {index.kind} index over {len(index)} papers")
+    return _index
+
+
+def _load_cold_start() -> tuple[np.ndarray, np.ndarray]:
+    """Exact top servable papers by cosine similarity to the mean embedding, computed once."""
+    global _cold_start
+    if _cold_start is None:
+        embeddings = _load_embeddings()
+        mean = embeddings.mean(axis=0)
+        mean = mean / np.linalg.norm(mean)
+        exact = ann_index.ExactIndex(embeddings, ids=_load_servable_nodes())
+        _cold_start = exact.search(mean, FEED_MAX_CANDIDATES + NODE_HISTORY_MAX_SIZE)
+    return _cold_start
+
+
+def warm_up() -> None:
+    """
+    Load the search index and precompute the cold-start ranking (app startup), so no request pays
+    for an index build or the corpus mean.
+    """
+    _load_index()
+    ids, _ = _load_cold_start()
+    print(f"✅ Precomputed cold-start feed ({len(ids)} papers)")
+
+
+def feed_cache_stats() -> dict:
+    return {
+        "rankings": _feed_cache.stats(),
+        "search": _index.stats() if _index is not None else None,
+    }
+
+
+def _history_hash(history: list[str]) -> str:
+    return hashlib.sha1("\x1f".join(history).encode("utf-8")).hexdigest()
+
+
+def _rank_candidates(history: list[str]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Up to FEED_MAX_CANDIDATES servable papers ranked by cosine similarity to the mean of the
+    history, excluding it. Returns (node ids, scores), best first.
+    """
+    embeddings = _load_embeddings()
+    num_nodes = embeddings.shape[0]
+    node_ids = []
+    for x in history:
+        try:
+            ni = int(x)
+            if 0 <= ni < num_nodes:
+                node_ids.append(ni)
+        except (ValueError, TypeError):
+            continue
+    history_set = {int(x) for x in history if isinstance(x, str) and x.isdigit()}
+
+    if node_ids:
+        avg = embeddings[node_ids].mean(axis=0)
+        avg = avg / np.linalg.norm(avg)
+        # Embeddings are already normalized, so inner product is cosine similarity
+        return _load_index().search(avg, FEED_MAX_CANDIDATES, exclude=history_set)
+
+    top_ids, top_scores = _load_cold_start()
+    if history_set:
+        keep = ~np.isin(top_ids, np.fromiter(history_set, dtype=np.int64, count=len(history_set)))
+        top_ids, top_scores = top_ids[keep], top_scores[keep]
+    return top_ids[:FEED_MAX_CANDIDATES], top_scores[:FEED_MAX_CANDIDATES]
+
+
+def _cached_candidates(history: list[str]) -> tuple[np.ndarray, np.ndarray]:
+    """Ranked candidates for a history, cached in this worker by the history's hash."""
+    key = _history_hash(history)
+    cached = _feed_cache.get(key)
+    if cached is None:
+        cached = _rank_candidates(history)
+        _feed_cache.set(key, cached)
+    return cached
+
+
+class _FeedSession(NamedTuple):
+    similar_ids: np.ndarray
+    similar_scores: np.ndarray
+    random_ids: np.ndarray
+
+    @property
+    def positions(self) -> int:
+        """Length of the feed in positions (whole blocks; trailing slots past either list are empty)."""
+        blocks = max(-(-len(self.similar_ids) // _N_SIMILAR), -(-len(self.random_ids) // _N_RANDOM))
+        return blocks * _BLOCK
+
+
+def _build_feed(history: list[str], seed: int) -> _FeedSession:
+    """
+    The feed for a history: its ranked candidates plus a random sample drawn with seed. Depends
+    only on its arguments (and the shared artifacts), so every worker rebuilds the same feed.
+    """
+    similar_ids, similar_scores = _cached_candidates(history)
+    exclude = {int(x) for x in history if isinstance(x, str) and x.isdigit()}
+    exclude.update(similar_ids.tolist())
+    # Enough random papers to fill the random slots of every block the similar list spans
+    n_random = -(-len(similar_ids) // _N_SIMILAR) * _N_RANDOM
+    random_ids = np.asarray(_sample_random_nodes(n_random, exclude, np.random.default_rng(seed)), dtype=np.int64)
+    return _FeedSession(similar_ids, similar_scores, random_ids)
+
+
+class _Cursor(NamedTuple):
+    """Everything needed to rebuild a feed page on any worker; no server-side session."""
+    issued_at: int  # unix time of the first page; the cursor expires FEED_SESSION_TTL_SECONDS later
+    seed: int  # random-paper sample
+    offset: int
+    user_tag: str  # binds the cursor to its user ("" when anonymous)
+    history: tuple[str, ...]  # node ids the feed was ranked from (frozen at the first page)
+
+
+def _user_tag(sub: str | None) -> str:
+    return hashlib.sha1(sub.encode("utf-8")).hexdigest()[:12] if sub else ""
+
+
+def _encode_cursor(cursor: _Cursor) -> str:
+    raw = f"{cursor.issued_at}:{cursor.seed}:{cursor.offset}:{cursor.user_tag}:{','.join(cursor.history)}"
+    return base64.urlsafe_b64encode(raw.encode("ascii")).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> _Cursor:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("ascii")
+        issued_at, seed, offset, user_tag, history = raw.split(":")
+        decoded = _Cursor(int(issued_at), int(seed), int(offset), user_tag, tuple(history.split(",")) if history else ())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from e
+    if (
+        decoded.offset < 0
+        or decoded.seed < 0
+        or len(decoded.history) > NODE_HISTORY_MAX_SIZE
+        or not all(x.isdigit() for x in decoded.history)
+    ):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return decoded
+
+
+def _page(session: _FeedSession, offset: int, n: int) -> tuple[list[dict], int]:
+    """
+    Feed items [offset, offset + n) of a feed, in O(n): position i is similar paper
+    (i // 50) * 35 + i % 50 if i % 50 < 35, else random paper (i // 50) * 15 + i % 50 - 35.
+    Returns (papers, offset of the next page).
+    """
+    end = min(offset + n, session.positions)
+    papers = []
+    if offset >= end:
+        return papers, end
+    positions = np.arange(offset, end)
+    block, slot = np.divmod(positions, _BLOCK)
+    is_similar = slot < _N_SIMILAR
+    rank = np.where(is_similar, block * _N_SIMILAR + slot, block * _N_RANDOM + slot - _N_SIMILAR)
+    valid = np.where(is_similar, rank < len(session.similar_ids), rank < len(session.random_ids))
+    is_similar, rank = is_similar[valid], rank[valid]
+
+    node_ids = np.empty(len(rank), dtype=np.int64)
+    node_ids[is_similar] = session.similar_ids[rank[is_similar]]
+    node_ids[~is_similar] = session.random_ids[rank[~is_similar]]
+    node_ids = node_ids.tolist()
+    titles = title_store.get_titles(node_ids)
+    for node_id, title, similar, r in zip(node_ids, titles, is_similar.tolist(), rank.tolist()):
+        paper = {"mag_id": _node_id_to_mag_id_url(node_id), "title": title or "—"}
+        if similar:
+            paper["score"] = float(session.similar_scores[r])
+        papers.append(paper)
+    return papers, end
+
+
+def _sample_random_nodes(n: int, exclude: set[int], rng: np.random.Generator) -> list[int]:
+    """Sample up to n distinct servable node ids not in exclude."""
+    servable = _load_servable_nodes()
+    if n <= 0 or len(servable) == 0:
+        return []
+    # Oversample positions so that exclusions and duplicates rarely leave us short
+    positions = rng.integers(0, len(servable), size=2 * (n + len(exclude)))
+    picked: list[int] = []
+    for node_id in dict.fromkeys(servable[positions].tolist()):
+        if node_id not in exclude:
+            picked.append(node_id)
+            if len(picked) >= n:
+                break
+    return picked
 
 
 def _mag_id_to_node_id(mag_id: str) -> int | None:
-    """Resolve MAG id (URL or numeric) to node idx using mag_to_node_idx.npy."""
-    mapping = _load_mag_to_node()
-    numeric = paper_service._mag_id_to_numeric(mag_id)
-    if not numeric.isdigit():
+    """Resolve MAG id (URL or numeric) to node idx."""
+    numeric = paper_service.parse_mag_id(mag_id)
+    if numeric is None:
         return None
-    key_int = int(numeric)
-    if key_int in mapping:
-        return int(mapping[key_int])
-    if numeric in mapping:
-        return int(mapping[numeric])
-    return None
+    return id_mapping.mag_to_node(numeric)
 
 
 def _node_id_to_mag_id_url(node_id: int) -> str | None:
-    """Convert node idx to OpenAlex URL using node_to_mag_id.npy."""
-    mapping = _load_node_to_mag()
-    node_id = int(node_id)
-    if node_id not in mapping:
+    """Convert node idx to OpenAlex URL."""
+    paper_id = id_mapping.node_to_mag(int(node_id))
+    if paper_id is None:
         return None
-    paper_id = mapping[node_id]
     return f"https://openalex.org/W{paper_id}"
 
 
@@ -86,15 +280,29 @@ class ClickRequest(BaseModel):
     mag_id: str
 
 
+class PaperInfoBatchRequest(BaseModel):
+    mag_ids: list[str] = Field(..., min_length=1, max_length=PAPER_INFO_BATCH_MAX_IDS)
+
+
 @router.get("/paper-info")
-def get_paper_info(mag_id: str = Query(..., description="MAG/OpenAlex id")):
+async def get_paper_info(mag_id: str = Query(..., description="MAG/OpenAlex id")):
     """Look up paper title, DOI URL, and abstract by MAG id."""
-    result = paper_service.get_paper_info_by_mag_id(mag_id)
+    result = await paper_service.get_paper_info_by_mag_id(mag_id)
     if result["title"] is None and result["doi_url"] is None:
         raise HTTPException(status_code=404, detail=f"No paper found for MAG id: {mag_id}")
     return result
 
 
+@router.post("/paper-info/batch")
+async def get_paper_info_batch(body: PaperInfoBatchRequest):
+    """
+    Look up title, DOI URL, and abstract for up to PAPER_INFO_BATCH_MAX_IDS MAG ids at once.
+    Returns {"papers": {mag_id: info}} keyed by the ids as sent; unknown ids have null fields.
+    """
+    papers = await paper_service.get_paper_info_batch(body.mag_ids)
+    return {"papers": papers, "count": len(papers)}
+
+
 @router.post("/click")
 def register_click(
     body: ClickRequest,
@@ -109,7 +317,7 @@ def register_click(
         print(f"\n[Click] Unknown MAG id (not in mag_to_node_idx): {body.mag_id!r}\n")
         return {"ok": False, "error": "mag_id not in mapping"}
     sub = get_sub_from_token(credentials)
-    history = auth0_storage.append_node_to_history(sub, str(node_id))
+    history = history_store.append_node(sub, str(node_id))
     _click_history.append(node_id)
     print("\n[Click] Current click history (node ids):")
     for i, nid in enumerate(history, 1):
@@ -121,84 +329,44 @@ def register_click(
 @router.get("/for-you")
 def get_for_you_papers(
     n: int = Query(50, ge=1, le=500, description="Number of papers to return (default 50)"),
+    cursor: str | None = Query(None, description="next_cursor of the previous page; omit for the first page"),
     credentials=Depends(security),
 ):
     """
-    Return papers for the For You page: top 35 by cosine similarity to user's click history
-    (from Auth0), plus 15 random papers (excluding the top 35). Total up to 50.
-    If no Bearer token or invalid token, treats as no history. Random papers have no score.
+    Return papers for the For You page, n at a time. In every block of 50: 35 papers by cosine
+    similarity to the user's click history (history_store), then 15 random papers (excluding the
+    similar ones and the history). Random papers have no score.
+    The first request ranks up to FEED_MAX_CANDIDATES papers; pass the returned next_cursor to get
+    the following page (null when the feed is exhausted). The cursor carries the history the feed
+    was ranked from, its random seed and the offset, so any worker serves the same next page. A
+    cursor older than FEED_SESSION_TTL_SECONDS returns 410; start again without one.
+    If no Bearer token or invalid token, treats as no history.
     """
-    history: list[str] = []
+    sub = None
     if credentials and credentials.credentials:
         try:
             sub = get_sub_from_token(credentials)
-            try:
-                history = auth0_storage.get_node_history(sub)
-            except Exception:
-                pass
         except HTTPException:
             pass
-    embeddings = _load_embeddings()
-    node_to_mag = _load_node_to_mag()
-    num_nodes = embeddings.shape[0]
 
-    # Build average vector from click history (or fallback to random if empty)
-    if history:
-        node_ids = []
-        for x in history:
+    if cursor is None:
+        history: list[str] = []
+        if sub is not None:
             try:
-                ni = int(x)
-                if 0 <= ni < num_nodes:
-                    node_ids.append(ni)
-            except (ValueError, TypeError):
-                continue
-        if node_ids:
-            avg = embeddings[node_ids].mean(axis=0)
-            avg = avg / np.linalg.norm(avg)
-        else:
-            avg = embeddings.mean(axis=0)
-            avg = avg / np.linalg.norm(avg)
+                history = history_store.get_node_history(sub)
+            except Exception:
+                pass
+        position = _Cursor(
+            int(time.time()), secrets.randbits(32), 0, _user_tag(sub), tuple(x for x in history if x.isdigit())
+        )
     else:
-        avg = embeddings.mean(axis=0)
-        avg = avg / np.linalg.norm(avg)
-
-    # Cosine similarity (embeddings already normalized)
-    scores = embeddings @ avg
-    # Descending; exclude nodes we don't have mag_id for, and exclude user's history
-    history_set = {int(x) for x in history if isinstance(x, str) and x.isdigit()}
-    n_similar = 35
-    n_random = 15
-    candidate_nodes = []
-    for idx in np.argsort(-scores):
-        idx_int = int(idx)
-        if idx_int in history_set or idx_int not in node_to_mag:
-            continue
-        mag_url = _node_id_to_mag_id_url(idx_int)
-        if mag_url and paper_service.get_title_by_mag_id(mag_url):
-            candidate_nodes.append(idx_int)
-        if len(candidate_nodes) >= n_similar:
-            break
+        position = _decode_cursor(cursor)
+        if position.user_tag != _user_tag(sub):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        if time.time() - position.issued_at > FEED_SESSION_TTL_SECONDS:
+            raise HTTPException(status_code=410, detail="Feed cursor expired; request the first page again")
 
-    papers = []
-    for node_id in candidate_nodes[:n_similar]:
-        mag_id = _node_id_to_mag_id_url(node_id)
-        if not mag_id:
-            continue
-        title = paper_service.get_title_by_mag_id(mag_id) or "—"
-        papers.append({
-            "mag_id": mag_id,
-            "title": title,
-            "score": float(scores[node_id]),
-        })
-
-    # Add 15 random papers (excluding those already in the top 35)
-    similar_mag_ids = {p["mag_id"] for p in papers}
-    random_candidates = paper_service.get_random_papers(n=80)
-    for p in random_candidates:
-        if len(papers) >= n_similar + n_random:
-            break
-        if p["mag_id"] not in similar_mag_ids:
-            papers.append({"mag_id": p["mag_id"], "title": p["title"]})
-            similar_mag_ids.add(p["mag_id"])
-
-    return {"papers": papers, "count": len(papers)}
+    feed = _build_feed(list(position.history), position.seed)
+    papers, next_offset = _page(feed, position.offset, n)
+    next_cursor = _encode_cursor(position._replace(offset=next_offset)) if next_offset < feed.positions else None
+    return {"papers": papers, "count": len(papers), "next_cursor": next_cursor}
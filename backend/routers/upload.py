@@ -1,10 +1,11 @@
 """File upload endpoint."""
 from pathlib import Path
 
-import shutil
-from fastapi import APIRouter, File, HTTPException, UploadFile, status
+from fastapi import APIRouter, File, Form, HTTPException, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
 
-from backend.core.config import UPLOAD_DIR
+from backend.core.config import PIPELINE_RETRY_AFTER_SECONDS, UPLOAD_DIR, UPLOAD_MAX_BYTES
+from backend.services import paper_service, pipeline, upload_store
 
 router = APIRouter(prefix="/api", tags=["upload"])
 
@@ -12,10 +13,22 @@ UPLOAD_DIR.mkdir(exist_ok=True)
 
 
 @router.post("/upload", status_code=status.HTTP_201_CREATED)
-async def upload_paper(file: UploadFile = File(...)):
-    """Accept a PDF upload and save it to the backend uploads folder.
+async def upload_paper(
+    file: UploadFile = File(...),
+    citations: str | None = Form(None, description="Optional comma-separated MAG ids the paper cites"),
+):
+    """Accept a PDF upload, save it to the backend uploads folder and start processing it.
 
-    Expects a multipart/form-data POST with field name `file`.
+    Expects a multipart/form-data POST with field name `file`. Files are stored by SHA-256 of their
+    content; uploading a file that is already stored returns it with "duplicate": true.
+    Files over UPLOAD_MAX_BYTES are rejected with 413; request bodies over UPLOAD_MAX_REQUEST_BYTES
+    already while they are received (BodySizeLimitMiddleware in main.py), before the form is parsed.
+
+    The returned "job" runs the recommendation pipeline in the background; poll
+    /api/jobs/{job_id} and fetch /api/jobs/{job_id}/result. Citations found in the PDF's
+    references are used; `citations` adds more. When the pipeline queue is full the file is kept
+    and 503 with Retry-After is returned; retrying re-uses the stored file. When the pipeline's
+    dependencies are not installed on this server, 503 is returned before anything is stored.
     """
     if not file.filename:
         raise HTTPException(status_code=400, detail="No file uploaded")
@@ -23,13 +36,43 @@ async def upload_paper(file: UploadFile = File(...)):
     if file.content_type != "application/pdf":
         raise HTTPException(status_code=400, detail="Only PDF files are accepted")
 
+    if not pipeline.available():
+        raise HTTPException(status_code=503, detail="Paper processing is not available on this server")
+
     safe_name = Path(file.filename).name
-    dest_path = UPLOAD_DIR / safe_name
+    citation_ids = []
+    for raw in (citations or "").split(","):
+        numeric = paper_service.parse_mag_id(raw) if raw.strip() else None
+        if numeric is not None:
+            citation_ids.append(numeric)
 
     try:
-        with dest_path.open("wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        # Copy the parsed upload into the store + hash, in a worker thread: disk I/O never blocks the event loop
+        stored = await run_in_threadpool(upload_store.store, file.file)
+    except upload_store.UploadTooLarge:
+        raise HTTPException(status_code=413, detail=f"File too large (max {UPLOAD_MAX_BYTES} bytes)")
     except Exception as exc:
         raise HTTPException(status_code=500, detail=f"Could not save file: {exc}")
+    finally:
+        await file.close()
+
+    try:
+        # Job bookkeeping in SQLite + the process-pool submit: off the event loop
+        job = await run_in_threadpool(pipeline.submit, stored.sha256, stored.path, citation_ids)
+    except pipeline.QueueFull:
+        raise HTTPException(
+            status_code=503,
+            detail="Processing queue is full; the file was saved, retry later",
+            headers={"Retry-After": str(PIPELINE_RETRY_AFTER_SECONDS)},
+        )
+    except pipeline.PipelineUnavailable:
+        raise HTTPException(status_code=503, detail="Paper processing is not available on this server")
 
-    return {"filename": safe_name, "size": dest_path.stat().st_size, "message": "Upload successful"}
+    return {
+        "filename": safe_name,
+        "sha256": stored.sha256,
+        "size": stored.size,
+        "duplicate": stored.duplicate,
+        "message": "Already uploaded" if stored.duplicate else "Upload successful",
+        "job": job,
+    }
@@ -2,7 +2,7 @@
 from fastapi import APIRouter, Depends
 
 from backend.core.auth import get_sub_from_token, security
-from backend.services import auth0_storage
+from backend.services import history_store
 
 router = APIRouter(prefix="/api/user", tags=["user"])
 
@@ -13,9 +13,9 @@ def add_node_to_history(
     credentials=Depends(security),
 ):
     """
-    Add a node id to the current user's history queue (stored in Auth0 user_metadata).
+    Add a node id to the current user's history queue (stored locally, synced to Auth0 user_metadata).
     Queue has max size 5; newest entries are kept. Requires Bearer token.
     """
     sub = get_sub_from_token(credentials)
-    history = auth0_storage.append_node_to_history(sub, node_id)
+    history = history_store.append_node(sub, node_id)
     return {"node_id": node_id, "history": history}
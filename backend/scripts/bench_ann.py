@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Benchmark ANN indexes (HNSW, IVF) and compressed scoring tiers (int8, fp16, PCA + exact re-rank)
+against exact search for the For You feed. Reports build time, scoring-matrix memory, per-query
+latency percentiles, batched throughput (search_batch, as behind the micro-batching executor) and
+recall@k versus the exact path.
+
+  python -m backend.scripts.bench_ann --queries 500 --k 35
+  python -m backend.scripts.bench_ann --kinds int8 fp16 pca
+
+Queries mimic the feed: the normalized mean of 1-5 random paper embeddings.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from backend.core.config import PAPER_EMBEDDINGS_PATH
+from backend.services import ann_index
+
+
+def make_queries(embeddings: np.ndarray, num_queries: int, seed: int = 0) -> np.ndarray:
+    """Random 'click history' queries: mean of 1-5 random rows, L2-normalized."""
+    rng = np.random.default_rng(seed)
+    queries = np.empty((num_queries, embeddings.shape[1]), dtype=np.float32)
+    for i in range(num_queries):
+        rows = rng.integers(0, embeddings.shape[0], size=rng.integers(1, 6))
+        q = embeddings[rows].mean(axis=0)
+        queries[i] = q / np.linalg.norm(q)
+    return queries
+
+
+def time_queries(index, queries: np.ndarray, k: int) -> tuple[list, np.ndarray]:
+    """Run queries one at a time (as the endpoint does); return results and latencies in ms."""
+    results, latencies = [], []
+    for q in queries:
+        start = time.perf_counter()
+        ids, _ = index.search(q, k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append(ids)
+    return results, np.asarray(latencies)
+
+
+def batch_qps(index, queries: np.ndarray, k: int, batch: int) -> float:
+    """Queries per second through search_batch in groups of batch."""
+    start = time.perf_counter()
+    for i in range(0, len(queries), batch):
+        index.search_batch(queries[i:i + batch], k)
+    return len(queries) / (time.perf_counter() - start)
+
+
+def format_mb(nbytes: int | None) -> str:
+    return f"{nbytes / 2**20:.1f}" if nbytes is not None else "-"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Recall@k vs latency for ANN indexes against exact search")
+    parser.add_argument("--embeddings", type=Path, default=PAPER_EMBEDDINGS_PATH, help="Path to embeddings .npy")
+    parser.add_argument("--queries", type=int, default=500, help="Number of queries")
+    parser.add_argument("--k", type=int, default=35, help="Neighbours per query")
+    parser.add_argument("--batch", type=int, default=32, help="Batch size for the throughput column")
+    parser.add_argument("--kinds", nargs="+", default=["hnsw", "ivf"], choices=ann_index.INDEX_KINDS)
+    args = parser.parse_args()
+
+    if not args.embeddings.exists():
+        print(f"Error: {args.embeddings} not found", file=sys.stderr)
+        sys.exit(1)
+
+    emb = np.load(args.embeddings).astype(np.float32)
+    emb /= np.linalg.norm(emb, axis=1, keepdims=True)
+    queries = make_queries(emb, args.queries)
+    print(f"{emb.shape[0]} papers, dim {emb.shape[1]}, {args.queries} queries, k={args.k}\n")
+
+    exact = ann_index.build_index(emb, kind="exact")
+    exact_ids, exact_lat = time_queries(exact, queries, args.k)
+
+    header = f"{'index':<8}{'build s':>10}{'MB':>10}{'p50 ms':>10}{'p99 ms':>10}{'batch qps':>11}{'recall@k':>10}"
+    print(header)
+    print("-" * len(header))
+    print(
+        f"{'exact':<8}{0.0:>10.2f}{format_mb(exact.nbytes):>10}"
+        f"{np.percentile(exact_lat, 50):>10.3f}{np.percentile(exact_lat, 99):>10.3f}"
+        f"{batch_qps(exact, queries, args.k, args.batch):>11.0f}{1.0:>10.4f}"
+    )
+    for kind in args.kinds:
+        start = time.perf_counter()
+        index = ann_index.build_index(emb, kind=kind)
+        build_s = time.perf_counter() - start
+        ids, lat = time_queries(index, queries, args.k)
+        recall = ann_index.recall_at_k(ids, exact_ids)
+        label = kind if index.kind == kind else f"{kind}*"
+        print(
+            f"{label:<8}{build_s:>10.2f}{format_mb(getattr(index, 'nbytes', None)):>10}"
+            f"{np.percentile(lat, 50):>10.3f}{np.percentile(lat, 99):>10.3f}"
+            f"{batch_qps(index, queries, args.k, args.batch):>11.0f}{recall:>10.4f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
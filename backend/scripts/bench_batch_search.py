@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Benchmark micro-batched feed scoring: concurrent callers each searching on their own (one full
+pass over the embeddings per query) versus the BatchedSearcher (one search_batch per window).
+Reports throughput and latency percentiles per concurrency level.
+
+  python -m backend.scripts.bench_batch_search --kind exact --threads 1 8 32 --queries 2000
+
+Queries mimic the feed (see bench_ann.make_queries).
+"""
+import argparse
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+from backend.core.config import PAPER_EMBEDDINGS_PATH, SEARCH_BATCH_MAX_SIZE, SEARCH_BATCH_WINDOW_MS
+from backend.scripts.bench_ann import make_queries
+from backend.services import ann_index, batch_search
+
+
+def run_concurrent(searcher, queries: np.ndarray, k: int, threads: int) -> tuple[float, np.ndarray]:
+    """Split queries over threads that each search one at a time; returns (queries/s, latencies ms)."""
+    latencies = np.empty(len(queries))
+    chunks = np.array_split(np.arange(len(queries)), threads)
+
+    def worker(rows: np.ndarray) -> None:
+        for i in rows:
+            start = time.perf_counter()
+            searcher.search(queries[i], k)
+            latencies[i] = (time.perf_counter() - start) * 1000
+
+    workers = [threading.Thread(target=worker, args=(rows,)) for rows in chunks]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return len(queries) / (time.perf_counter() - start), latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Throughput of micro-batched vs per-request feed scoring")
+    parser.add_argument("--embeddings", type=Path, default=PAPER_EMBEDDINGS_PATH, help="Path to embeddings .npy")
+    parser.add_argument("--kind", default="exact", choices=ann_index.INDEX_KINDS)
+    parser.add_argument("--queries", type=int, default=2000, help="Number of queries")
+    parser.add_argument("--k", type=int, default=35, help="Neighbours per query")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 8, 32], help="Concurrency levels")
+    parser.add_argument("--max-batch", type=int, default=SEARCH_BATCH_MAX_SIZE)
+    parser.add_argument("--window-ms", type=float, default=SEARCH_BATCH_WINDOW_MS)
+    args = parser.parse_args()
+
+    if not args.embeddings.exists():
+        print(f"Error: {args.embeddings} not found", file=sys.stderr)
+        sys.exit(1)
+
+    emb = np.load(args.embeddings).astype(np.float32)
+    emb /= np.linalg.norm(emb, axis=1, keepdims=True)
+    queries = make_queries(emb, args.queries)
+    index = ann_index.build_index(emb, kind=args.kind)
+    print(
+        f"{emb.shape[0]} papers, dim {emb.shape[1]}, {args.queries} queries, k={args.k}, index={index.kind}, "
+        f"max batch {args.max_batch}, window {args.window_ms} ms\n"
+    )
+
+    header = f"{'threads':>8}{'mode':>10}{'qps':>10}{'p50 ms':>10}{'p99 ms':>10}{'avg batch':>11}"
+    print(header)
+    print("-" * len(header))
+    for threads in args.threads:
+        qps, lat = run_concurrent(index, queries, args.k, threads)
+        print(f"{threads:>8}{'direct':>10}{qps:>10.0f}{np.percentile(lat, 50):>10.3f}{np.percentile(lat, 99):>10.3f}{1.0:>11.1f}")
+        searcher = batch_search.BatchedSearcher(index, max_batch=args.max_batch, window_ms=args.window_ms)
+        qps, lat = run_concurrent(searcher, queries, args.k, threads)
+        searcher.close()
+        avg_batch = searcher.stats()["avg_batch"]
+        print(f"{threads:>8}{'batched':>10}{qps:>10.0f}{np.percentile(lat, 50):>10.3f}{np.percentile(lat, 99):>10.3f}{avg_batch:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Build the memory-mapped title store from backend/mag_id_to_title.json (OpenAlex URL -> title).
+
+  python -m backend.scripts.build_title_store [path/to/mag_id_to_title.json]
+
+Output: backend/titles.offsets.i64.npy and backend/titles.utf8.bin, keyed by node index
+(the backend also builds these automatically if they are missing).
+"""
+import argparse
+import sys
+from pathlib import Path
+
+from backend.core.config import MAG_ID_TO_TITLE_PATH, TITLE_BLOB_PATH, TITLE_OFFSETS_PATH
+from backend.services import title_store
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Convert mag_id_to_title.json into the binary title store")
+    parser.add_argument("json_path", type=Path, nargs="?", default=MAG_ID_TO_TITLE_PATH, help="MAG id -> title JSON")
+    args = parser.parse_args()
+
+    try:
+        num_nodes, num_titles = title_store.build_title_store(args.json_path)
+    except FileNotFoundError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"Wrote titles for {num_titles} of {num_nodes} nodes")
+    print(f"  offsets: {TITLE_OFFSETS_PATH} ({TITLE_OFFSETS_PATH.stat().st_size} bytes)")
+    print(f"  blob:    {TITLE_BLOB_PATH} ({TITLE_BLOB_PATH.stat().st_size} bytes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Run the async OpenAlex client against a local stub of the /works endpoint and check its failure
+handling: retries on 5xx, malformed 200 bodies, the circuit breaker (open, half-open probe, close)
+and coalescing of concurrent lookups. Exits non-zero if a check fails.
+
+  python -m backend.scripts.check_openalex_client
+  python -m backend.scripts.check_openalex_client --serve 8766   # only run the stub
+
+The stub answers filter=ids.mag:<id>|<id>... with a work per id; its behaviour is switched per
+scenario (ok, 503, malformed 200, slow).
+"""
+import argparse
+import asyncio
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from backend.services.openalex_client import CircuitBreaker, OpenAlexClient, OpenAlexUnavailable
+
+# Ids the stub has no work for
+UNKNOWN_IDS = {404}
+
+
+class StubState:
+    def __init__(self):
+        self.mode = "ok"  # ok | 503 | malformed | slow
+        self.fail_next = 0  # answer this many requests with 503, then follow mode
+        self.delay = 0.2  # seconds, for "slow"
+        self.requests = 0
+        self.lock = threading.Lock()
+
+
+def make_handler(state: StubState):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status: int, body: bytes, content_type: str = "application/json") -> None:
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            try:
+                self.wfile.write(body)
+            except BrokenPipeError:
+                pass  # the client gave up (the cancelled-probe check)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            with state.lock:
+                state.requests += 1
+                failing = state.fail_next > 0
+                state.fail_next -= failing
+                mode = state.mode
+            if url.path != "/works":
+                return self._send(404, b"{}")
+            if failing or mode == "503":
+                return self._send(503, b'{"error": "unavailable"}')
+            if mode == "malformed":
+                return self._send(200, b"<html>Bad gateway</html>", "text/html")
+            if mode == "slow":
+                time.sleep(state.delay)
+            ids = parse_qs(url.query).get("filter", [""])[0].removeprefix("ids.mag:").split("|")
+            results = [
+                {"ids": {"mag": i}, "doi": f"https://doi.org/10.0/{i}", "abstract_inverted_index": {"stub": [0]}}
+                for i in ids if i.isdigit() and int(i) not in UNKNOWN_IDS
+            ]
+            self._send(200, json.dumps({"results": results}).encode())
+
+    return Handler
+
+
+def start_stub(port: int = 0) -> tuple[ThreadingHTTPServer, StubState]:
+    state = StubState()
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state
+
+
+async def check_client(base_url: str, state: StubState) -> list[tuple[str, bool]]:
+    checks = []
+
+    def client(**kwargs) -> OpenAlexClient:
+        return OpenAlexClient(base_url, timeout=2.0, max_retries=2, **kwargs)
+
+    c = client()
+    work = await c.fetch_work(123)
+    checks.append(("single lookup", work is not None and work["doi"].endswith("/123")))
+    checks.append(("unknown id -> None", await c.fetch_work(404) is None))
+    works = await c.fetch_works([1, 2, 404, 2])
+    checks.append(("multi-id lookup", set(works) == {1, 2, 404} and works[404] is None and works[1] is not None))
+
+    state.fail_next = 2
+    before = c.retries
+    checks.append(("503s retried", await c.fetch_work(7) is not None and c.retries - before == 2))
+
+    state.mode = "malformed"
+    try:
+        await c.fetch_work(8)
+        checks.append(("malformed 200 -> OpenAlexUnavailable", False))
+    except OpenAlexUnavailable:
+        checks.append(("malformed 200 -> OpenAlexUnavailable", True))
+    state.mode = "ok"
+    await c.aclose()
+
+    # Breaker: opens after 2 failed requests, rejects, then one probe closes it again
+    state.mode = "503"
+    c = client(breaker=CircuitBreaker(failure_threshold=2, reset_timeout=0.3))
+    for _ in range(2):
+        try:
+            await c.fetch_work(9)
+        except OpenAlexUnavailable:
+            pass
+    checks.append(("breaker opens", c.breaker.state == "open"))
+    sent = state.requests
+    try:
+        await c.fetch_work(9)
+    except OpenAlexUnavailable:
+        pass
+    checks.append(("open breaker sends nothing", state.requests == sent and c.rejected == 1))
+    state.mode = "ok"
+    await asyncio.sleep(0.35)
+    checks.append(("half-open probe closes it", await c.fetch_work(9) is not None and c.breaker.state == "closed"))
+
+    # A probe that is cancelled mid-request must not leave the breaker stuck half-open
+    c.breaker.record_failure()
+    c.breaker.record_failure()
+    await asyncio.sleep(0.35)
+    state.mode = "slow"
+    task = asyncio.ensure_future(c._get_json("/works", {"filter": "ids.mag:10"}))
+    await asyncio.sleep(0.05)
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+    checks.append(("cancelled probe released", c.breaker.allow()))
+    c.breaker.release_probe()
+    state.mode = "ok"
+    await c.aclose()
+
+    # Coalescing: concurrent lookups for one id share one request
+    state.mode = "slow"
+    c = client()
+    sent = state.requests
+    results = await asyncio.gather(*(c.fetch_work(11) for _ in range(20)))
+    checks.append(("concurrent lookups coalesced", state.requests - sent == 1 and c.coalesced == 19 and all(results)))
+    state.mode = "ok"
+    await c.aclose()
+    return checks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the OpenAlex client against a local stub server")
+    parser.add_argument("--serve", type=int, default=None, help="Only run the stub on this port")
+    args = parser.parse_args()
+
+    if args.serve:
+        server, _ = start_stub(args.serve)
+        print(f"OpenAlex stub on http://127.0.0.1:{args.serve} (set OPENALEX_BASE_URL to it)")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            server.shutdown()
+        return
+
+    server, state = start_stub()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    checks = asyncio.run(check_client(base_url, state))
+    server.shutdown()
+    for name, ok in checks:
+        print(f"{'ok  ' if ok else 'FAIL'}  {name}")
+    print(f"\n{sum(ok for _, ok in checks)}/{len(checks)} checks passed, {state.requests} stub requests")
+    if not all(ok for _, ok in checks):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Convert the pickled dict mappings (backend/node_to_mag_id.npy, backend/mag_to_node_idx.npy)
+into plain int64 arrays that the backend memory-maps without pickle:
+
+  python -m backend.scripts.convert_id_mappings
+
+Output: backend/node_to_mag.i64.npy, backend/mag_sorted.i64.npy, backend/mag_sorted_node.i64.npy
+(the backend also runs this conversion automatically if the arrays are missing).
+"""
+import argparse
+import sys
+from pathlib import Path
+
+from backend.core.config import (
+    MAG_SORTED_NODE_PATH,
+    MAG_SORTED_PATH,
+    MAG_TO_NODE_IDX_PATH,
+    NODE_TO_MAG_ARRAY_PATH,
+    NODE_TO_MAG_ID_PATH,
+)
+from backend.services import id_mapping
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Convert pickled MAG id <-> node index dicts to int64 arrays")
+    parser.add_argument("--node-to-mag", type=Path, default=NODE_TO_MAG_ID_PATH, help="Pickled node -> MAG dict")
+    parser.add_argument("--mag-to-node", type=Path, default=MAG_TO_NODE_IDX_PATH, help="Pickled MAG -> node dict")
+    args = parser.parse_args()
+
+    try:
+        node_to_mag, mag_sorted, _ = id_mapping.convert_legacy_mappings(args.node_to_mag, args.mag_to_node)
+    except FileNotFoundError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    mapped = int((node_to_mag != id_mapping.MISSING).sum())
+    print(f"Wrote {len(node_to_mag)} nodes ({mapped} with a MAG id) to {NODE_TO_MAG_ARRAY_PATH}")
+    print(f"Wrote {len(mag_sorted)} sorted MAG ids to {MAG_SORTED_PATH} and {MAG_SORTED_NODE_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Ingest the ml_pipeline's paper metadata (title, abstract, arxiv_id, pdf_url per MAG id) into the
+backend's local SQLite store, so /api/papers/paper-info is answered without calling OpenAlex.
+
+  python -m backend.scripts.ingest_metadata [path/to/arxiv_mag_metadata.json]
+
+Accepts both formats the ml_pipeline writes (src/arxiv_metadata.py: dict keyed by MAG id;
+scripts/data.py: list of records). Output: backend/data/paper_metadata.sqlite3 (primary key node index).
+Restart the API workers afterwards to pick up a re-ingested store.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from backend.core.config import ARXIV_METADATA_JSON_PATH, PAPER_METADATA_DB_PATH
+from backend.services import metadata_store
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load arxiv_mag_metadata.json into the local metadata store")
+    parser.add_argument("json_path", type=Path, nargs="?", default=ARXIV_METADATA_JSON_PATH, help="Metadata JSON")
+    parser.add_argument("-o", "--output", type=Path, default=PAPER_METADATA_DB_PATH, help="Output SQLite path")
+    args = parser.parse_args()
+
+    if not args.json_path.exists():
+        print(f"Error: {args.json_path} not found", file=sys.stderr)
+        sys.exit(1)
+
+    start = time.perf_counter()
+    ingested, skipped = metadata_store.ingest(metadata_store.iter_metadata_records(args.json_path), args.output)
+    print(f"Ingested {ingested} papers into {args.output} in {time.perf_counter() - start:.1f}s")
+    if skipped:
+        print(f"Skipped {skipped} records whose MAG id is missing, out of range or has no node index")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+"""
+Nearest-neighbour search over paper embeddings: faiss HNSW/IVF, compressed (int8 / float16 / PCA)
+scoring with exact re-rank, and an exact brute-force fallback.
+"""
+import hashlib
+import os
+from pathlib import Path
+
+import numpy as np
+
+from backend.core.config import (
+    ANN_HNSW_EF_CONSTRUCTION,
+    ANN_HNSW_EF_SEARCH,
+    ANN_HNSW_M,
+    ANN_INDEX_KIND,
+    ANN_IVF_NLIST,
+    ANN_IVF_NPROBE,
+    ANN_PCA_DIM,
+    ANN_RERANK_CANDIDATES,
+)
+
+INDEX_KINDS = ("exact", "hnsw", "ivf", "int8", "fp16", "pca")
+QUANTIZED_KINDS = ("int8", "fp16", "pca")
+# Rows converted to float32 at a time when scoring int8/float16 (bounds the temporary copy)
+_SCORE_CHUNK_ROWS = 4096
+
+
+def _exclude_lists(excludes, batch_size: int) -> list[set[int]]:
+    """Normalize per-query exclusions to a list of int sets (one per query)."""
+    if excludes is None:
+        return [set() for _ in range(batch_size)]
+    return [{int(x) for x in ex} if ex else set() for ex in excludes]
+
+
+class ExactIndex:
+    """Brute-force inner-product search. Embeddings are L2-normalized, so scores are cosine similarities."""
+
+    kind = "exact"
+
+    def __init__(self, embeddings: np.ndarray, ids: np.ndarray | None = None):
+        self._embeddings = embeddings
+        # Rows that may be returned; None means every row
+        self._allowed: np.ndarray | None = None
+        if ids is not None:
+            self._allowed = np.zeros(embeddings.shape[0], dtype=bool)
+            self._allowed[np.asarray(ids, dtype=np.int64)] = True
+
+    def __len__(self) -> int:
+        if self._allowed is None:
+            return int(self._embeddings.shape[0])
+        return int(self._allowed.sum())
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes scanned per query (the full float32 matrix)."""
+        return int(self._embeddings.nbytes)
+
+    def search(self, query: np.ndarray, k: int, exclude=None) -> tuple[np.ndarray, np.ndarray]:
+        """Return (node ids, scores) of the top k rows for one query, best first."""
+        ids, scores = self.search_batch(query.reshape(1, -1), k, [exclude])
+        return ids[0], scores[0]
+
+    def search_batch(self, queries: np.ndarray, k: int, excludes=None) -> tuple[list, list]:
+        """Top k for each row of queries (B, d). excludes: optional list of node-id iterables, one per query."""
+        queries = np.asarray(queries, dtype=np.float32)
+        scores = queries @ self._embeddings.T  # (B, N)
+        if self._allowed is not None:
+            scores[:, ~self._allowed] = -np.inf
+        for row, ex in enumerate(_exclude_lists(excludes, len(queries))):
+            if ex:
+                scores[row, np.fromiter(ex, dtype=np.int64, count=len(ex))] = -np.inf
+        k = min(k, scores.shape[1])
+        if k <= 0:
+            empty = np.empty(0, dtype=np.int64)
+            return [empty] * len(queries), [empty.astype(np.float32)] * len(queries)
+        # O(N) partial selection, then sort only the k winners
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+        out_ids, out_scores = [], []
+        for ids_row, scores_row in zip(top, top_scores):
+            keep = np.isfinite(scores_row)
+            out_ids.append(ids_row[keep].astype(np.int64))
+            out_scores.append(scores_row[keep].astype(np.float32))
+        return out_ids, out_scores
+
+
+def index_path(cache_dir: Path, kind: str, embeddings: np.ndarray, ids: np.ndarray) -> Path:
+    """File for a built faiss index, named by a digest of everything the index is built from."""
+    digest = hashlib.blake2b(digest_size=12)
+    params = (kind, embeddings.shape, ANN_HNSW_M, ANN_HNSW_EF_CONSTRUCTION, ANN_IVF_NLIST)
+    digest.update(repr(params).encode())
+    # A rebuilt embeddings file changes the vectors behind the same shape
+    filename = getattr(embeddings, "filename", None)
+    if filename is not None:
+        digest.update(str(os.stat(filename).st_mtime_ns).encode())
+    digest.update(np.ascontiguousarray(ids, dtype=np.int64).tobytes())
+    return cache_dir / f"{kind}-{digest.hexdigest()}.faiss"
+
+
+class FaissIndex:
+    """
+    Approximate inner-product search with faiss (HNSW graph or IVF inverted lists).
+
+    With path, the built index is written there (temp file + rename, so concurrent workers never read
+    a partial one) and read back memory-mapped; an existing file is mapped instead of rebuilding, so
+    workers share one copy of the vectors rather than each holding its own.
+    """
+
+    def __init__(self, embeddings: np.ndarray, kind: str = "hnsw", ids: np.ndarray | None = None,
+                 path: Path | None = None):
+        import faiss
+
+        if kind not in ("hnsw", "ivf"):
+            raise ValueError(f"Unknown faiss index kind: {kind!r}")
+        self.kind = kind
+        if path is not None and path.exists():
+            self._index = self._configure(faiss.read_index(str(path), self._mmap_flags(faiss)))
+            return
+        if ids is None:
+            ids = np.arange(embeddings.shape[0], dtype=np.int64)
+        ids = np.asarray(ids, dtype=np.int64)
+        vectors = np.ascontiguousarray(embeddings[ids], dtype=np.float32)
+        dim = vectors.shape[1]
+
+        if kind == "hnsw":
+            base = faiss.IndexHNSWFlat(dim, ANN_HNSW_M, faiss.METRIC_INNER_PRODUCT)
+            base.hnsw.efConstruction = ANN_HNSW_EF_CONSTRUCTION
+            base.hnsw.efSearch = ANN_HNSW_EF_SEARCH
+            # HNSW cannot store ids itself; the IDMap wrapper translates back to node ids
+            index = faiss.IndexIDMap(base)
+        else:
+            nlist = max(1, min(ANN_IVF_NLIST, len(vectors) // 39))
+            quantizer = faiss.IndexFlatIP(dim)
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist, faiss.METRIC_INNER_PRODUCT)
+            index.train(vectors)
+            index.nprobe = min(ANN_IVF_NPROBE, nlist)
+            # Keep a reference so the quantizer is not garbage-collected under the index
+            self._quantizer = quantizer
+        index.add_with_ids(vectors, ids)
+        self._index = index
+        if path is not None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            try:
+                faiss.write_index(index, str(tmp))
+                os.replace(tmp, path)
+            finally:
+                tmp.unlink(missing_ok=True)
+            # Drop the private build copy for the shared mapping
+            self._index = self._configure(faiss.read_index(str(path), self._mmap_flags(faiss)))
+
+    @staticmethod
+    def _mmap_flags(faiss) -> int:
+        # IO_FLAG_MMAP_IFC (faiss >= 1.8) maps flat vector storage too, not only IVF lists
+        return getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+
+    def _configure(self, index):
+        """Apply the search-time settings (not fixed by the file) to a loaded index."""
+        import faiss
+
+        if self.kind == "hnsw":
+            faiss.downcast_index(index.index).hnsw.efSearch = ANN_HNSW_EF_SEARCH
+        else:
+            index.nprobe = min(ANN_IVF_NPROBE, index.nlist)
+        return index
+
+    def __len__(self) -> int:
+        return int(self._index.ntotal)
+
+    def search(self, query: np.ndarray, k: int, exclude=None) -> tuple[np.ndarray, np.ndarray]:
+        """Return (node ids, scores) of the (approximate) top k rows for one query, best first."""
+        ids, scores = self.search_batch(query.reshape(1, -1), k, [exclude])
+        return ids[0], scores[0]
+
+    def search_batch(self, queries: np.ndarray, k: int, excludes=None) -> tuple[list, list]:
+        """Approximate top k per query. Excluded ids are over-fetched and filtered out afterwards."""
+        queries = np.ascontiguousarray(queries, dtype=np.float32)
+        ex_sets = _exclude_lists(excludes, len(queries))
+        fetch = min(k + max((len(ex) for ex in ex_sets), default=0), len(self))
+        if fetch <= 0:
+            empty = np.empty(0, dtype=np.int64)
+            return [empty] * len(queries), [empty.astype(np.float32)] * len(queries)
+        scores, ids = self._index.search(queries, fetch)
+        out_ids, out_scores = [], []
+        for ids_row, scores_row, ex in zip(ids, scores, ex_sets):
+            # faiss pads with -1 when fewer than `fetch` results are reachable
+            keep = ids_row >= 0
+            if ex:
+                keep &= ~np.isin(ids_row, np.fromiter(ex, dtype=np.int64, count=len(ex)))
+            out_ids.append(ids_row[keep][:k].astype(np.int64))
+            out_scores.append(scores_row[keep][:k].astype(np.float32))
+        return out_ids, out_scores
+
+
+class QuantizedIndex:
+    """
+    Two-pass search: score every row on a compact copy of the embeddings, then re-rank the best
+    ANN_RERANK_CANDIDATES exactly against the float32 rows (read from the shared memmap).
+
+    int8: per-row symmetric scale, 1/4 of the float32 size. fp16: 1/2. pca: projection onto the top
+    ANN_PCA_DIM right singular vectors (uncentered, so inner products are preserved), 64/256 by default.
+    """
+
+    def __init__(self, embeddings: np.ndarray, kind: str = "int8", ids: np.ndarray | None = None):
+        if kind not in QUANTIZED_KINDS:
+            raise ValueError(f"Unknown quantized index kind: {kind!r}")
+        self.kind = kind
+        self._embeddings = embeddings
+        if ids is None:
+            ids = np.arange(embeddings.shape[0], dtype=np.int64)
+        self._ids = np.asarray(ids, dtype=np.int64)
+        self._scale: np.ndarray | None = None
+        self._projection: np.ndarray | None = None
+        if kind == "pca":
+            self._projection = self._fit_projection(embeddings, self._ids, ANN_PCA_DIM)
+        # Encode in chunks so the float32 source rows are never copied whole
+        chunks, scales = [], []
+        for start in range(0, len(self._ids), _SCORE_CHUNK_ROWS):
+            rows = np.asarray(embeddings[self._ids[start:start + _SCORE_CHUNK_ROWS]], dtype=np.float32)
+            if kind == "int8":
+                scale = np.abs(rows).max(axis=1) / 127.0
+                scale[scale == 0] = 1.0
+                chunks.append(np.round(rows / scale[:, None]).astype(np.int8))
+                scales.append(scale.astype(np.float32))
+            elif kind == "fp16":
+                chunks.append(rows.astype(np.float16))
+            else:
+                chunks.append(rows @ self._projection)
+        dim = self._projection.shape[1] if kind == "pca" else embeddings.shape[1]
+        dtype = {"int8": np.int8, "fp16": np.float16, "pca": np.float32}[kind]
+        self._codes = np.concatenate(chunks) if chunks else np.empty((0, dim), dtype=dtype)
+        if kind == "int8":
+            self._scale = np.concatenate(scales) if scales else np.empty(0, dtype=np.float32)
+
+    @staticmethod
+    def _fit_projection(embeddings: np.ndarray, ids: np.ndarray, dim: int, sample: int = 50000) -> np.ndarray:
+        """(d, dim) orthonormal basis of the top singular directions, fitted on a row sample."""
+        rng = np.random.default_rng(0)
+        picked = np.sort(rng.choice(ids, size=min(sample, len(ids)), replace=False))
+        rows = np.asarray(embeddings[picked], dtype=np.float32)
+        _, _, vt = np.linalg.svd(rows, full_matrices=False)
+        return np.ascontiguousarray(vt[:min(dim, vt.shape[0])].T, dtype=np.float32)
+
+    def __len__(self) -> int:
+        return int(len(self._ids))
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes of the compact first-pass matrix (plus scales / projection)."""
+        extra = 0
+        if self._scale is not None:
+            extra += self._scale.nbytes
+        if self._projection is not None:
+            extra += self._projection.nbytes
+        return int(self._codes.nbytes + extra)
+
+    def _approx_scores(self, queries: np.ndarray) -> np.ndarray:
+        """First-pass scores, shape (B, len(self))."""
+        if self.kind == "pca":
+            return (queries @ self._projection) @ self._codes.T
+        scores = np.empty((len(queries), len(self._ids)), dtype=np.float32)
+        for start in range(0, len(self._ids), _SCORE_CHUNK_ROWS):
+            block = self._codes[start:start + _SCORE_CHUNK_ROWS].astype(np.float32)
+            scores[:, start:start + len(block)] = queries @ block.T
+        if self._scale is not None:
+            scores *= self._scale
+        return scores
+
+    def search(self, query: np.ndarray, k: int, exclude=None) -> tuple[np.ndarray, np.ndarray]:
+        """Return (node ids, scores) of the top k rows for one query, best first."""
+        ids, scores = self.search_batch(query.reshape(1, -1), k, [exclude])
+        return ids[0], scores[0]
+
+    def search_batch(self, queries: np.ndarray, k: int, excludes=None) -> tuple[list, list]:
+        """Top k per query; returned scores are exact float32 cosine similarities."""
+        queries = np.ascontiguousarray(queries, dtype=np.float32)
+        ex_sets = _exclude_lists(excludes, len(queries))
+        approx = self._approx_scores(queries)
+        out_ids, out_scores = [], []
+        for query, row, ex in zip(queries, approx, ex_sets):
+            fetch = min(max(ANN_RERANK_CANDIDATES, k) + len(ex), len(row))
+            if fetch <= 0 or k <= 0:
+                out_ids.append(np.empty(0, dtype=np.int64))
+                out_scores.append(np.empty(0, dtype=np.float32))
+                continue
+            candidates = np.sort(self._ids[np.argpartition(-row, fetch - 1)[:fetch]])
+            if ex:
+                candidates = candidates[~np.isin(candidates, np.fromiter(ex, dtype=np.int64, count=len(ex)))]
+            # Exact re-rank on float32 rows; sorted ids keep memmap reads in file order
+            exact = np.asarray(self._embeddings[candidates], dtype=np.float32) @ query
+            top = np.argsort(-exact)[:k]
+            out_ids.append(candidates[top])
+            out_scores.append(exact[top].astype(np.float32))
+        return out_ids, out_scores
+
+
+def build_index(embeddings: np.ndarray, kind: str | None = None, ids: np.ndarray | None = None,
+                cache_dir: Path | None = None):
+    """
+    Build a search index over embeddings (rows restricted to ids if given).
+    kind defaults to ANN_INDEX_KIND; falls back to exact search if faiss is not installed.
+    With cache_dir, faiss indexes are persisted there and memory-mapped (see FaissIndex).
+    """
+    kind = (kind or ANN_INDEX_KIND).lower()
+    if kind not in INDEX_KINDS:
+        raise ValueError(f"Unknown index kind {kind!r}; expected one of {INDEX_KINDS}")
+    if kind == "exact":
+        return ExactIndex(embeddings, ids)
+    if kind in QUANTIZED_KINDS:
+        return QuantizedIndex(embeddings, kind, ids)
+    try:
+        path = None
+        if cache_dir is not None:
+            all_ids = np.arange(embeddings.shape[0], dtype=np.int64) if ids is None else ids
+            path = index_path(cache_dir, kind, embeddings, all_ids)
+        return FaissIndex(embeddings, kind, ids, path=path)
+    except ImportError:
+        print(f"⚠️  faiss not installed; using exact search instead of {kind}")
+        return ExactIndex(embeddings, ids)
+
+
+def recall_at_k(approx_ids, exact_ids) -> float:
+    """Fraction of exact top-k ids recovered by the approximate result (averaged over queries)."""
+    hits, total = 0, 0
+    for a, e in zip(approx_ids, exact_ids):
+        hits += len(set(map(int, a)) & set(map(int, e)))
+        total += len(e)
+    return hits / total if total else 1.0
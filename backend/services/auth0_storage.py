@@ -1,4 +1,6 @@
 """Update Auth0 user_metadata (e.g. node history) via Management API."""
+import threading
+import time
 from typing import List
 from urllib.parse import quote
 
@@ -7,75 +9,195 @@ from fastapi import HTTPException, status
 
 from backend.core.config import (
     AUTH0_DOMAIN,
+    AUTH0_HTTP_MAX_CONNECTIONS,
+    AUTH0_HTTP_TIMEOUT_SECONDS,
     AUTH0_MANAGEMENT_AUDIENCE,
     AUTH0_M2M_CLIENT_ID,
     AUTH0_M2M_CLIENT_SECRET,
+    AUTH0_TOKEN_REFRESH_MARGIN_SECONDS,
 )
 
 NODE_HISTORY_KEY = "node_history"
 NODE_HISTORY_MAX_SIZE = 5
 
+# One pooled keep-alive client shared by every Auth0 call in this worker
+_http_client: httpx.Client | None = None
+_http_client_lock = threading.Lock()
 
-def _get_m2m_token() -> str:
-    if not AUTH0_DOMAIN or not AUTH0_M2M_CLIENT_ID or not AUTH0_M2M_CLIENT_SECRET:
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="Auth0 Management API not configured (AUTH0_DOMAIN, AUTH0_M2M_CLIENT_ID, AUTH0_M2M_CLIENT_SECRET)",
-        )
-    url = f"https://{AUTH0_DOMAIN}/oauth/token"
-    payload = {
-        "grant_type": "client_credentials",
-        "client_id": AUTH0_M2M_CLIENT_ID,
-        "client_secret": AUTH0_M2M_CLIENT_SECRET,
-        "audience": AUTH0_MANAGEMENT_AUDIENCE,
-    }
-    with httpx.Client() as client:
-        resp = client.post(url, json=payload)
-        resp.raise_for_status()
-        data = resp.json()
-    access_token = data.get("access_token")
-    if not access_token:
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="Failed to obtain Auth0 Management API token",
-        )
-    return access_token
+# Outbound call latency per operation: name -> {count, errors, total_ms, max_ms}
+_latency: dict[str, dict] = {}
+_latency_lock = threading.Lock()
 
 
-def _get_user_metadata(user_id: str, token: str) -> dict:
-    """Get user record; return user_metadata dict (empty if missing)."""
-    encoded_id = quote(user_id, safe="")
-    url = f"https://{AUTH0_DOMAIN}/api/v2/users/{encoded_id}"
-    with httpx.Client() as client:
-        resp = client.get(
-            url,
-            headers={"Authorization": f"Bearer {token}"},
-        )
-        if resp.status_code == 404:
+def _get_http_client() -> httpx.Client:
+    global _http_client
+    if _http_client is None:
+        with _http_client_lock:
+            if _http_client is None:
+                _http_client = httpx.Client(
+                    timeout=AUTH0_HTTP_TIMEOUT_SECONDS,
+                    limits=httpx.Limits(
+                        max_connections=AUTH0_HTTP_MAX_CONNECTIONS,
+                        max_keepalive_connections=AUTH0_HTTP_MAX_CONNECTIONS,
+                    ),
+                )
+    return _http_client
+
+
+def close_http_client() -> None:
+    """Close the pooled client (app shutdown)."""
+    global _http_client
+    with _http_client_lock:
+        if _http_client is not None:
+            _http_client.close()
+            _http_client = None
+
+
+def _record_latency(name: str, seconds: float, ok: bool) -> None:
+    ms = seconds * 1000
+    with _latency_lock:
+        entry = _latency.setdefault(name, {"count": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0})
+        entry["count"] += 1
+        entry["errors"] += 0 if ok else 1
+        entry["total_ms"] += ms
+        entry["max_ms"] = max(entry["max_ms"], ms)
+
+
+def _request(name: str, method: str, url: str, **kwargs) -> httpx.Response:
+    """Send one request on the pooled client and record its latency under name."""
+    start = time.perf_counter()
+    ok = False
+    try:
+        resp = _get_http_client().request(method, url, **kwargs)
+        ok = resp.status_code < 500
+        return resp
+    finally:
+        _record_latency(name, time.perf_counter() - start, ok)
+
+
+def stats() -> dict:
+    """Outbound Auth0 latency per operation, plus token cache state."""
+    with _latency_lock:
+        calls = {
+            name: {**entry, "avg_ms": entry["total_ms"] / entry["count"] if entry["count"] else 0.0}
+            for name, entry in _latency.items()
+        }
+    return {"calls": calls, "token": _token_manager.stats()}
+
+
+class _M2MTokenManager:
+    """
+    Caches the Management API token until AUTH0_TOKEN_REFRESH_MARGIN_SECONDS before it expires.
+    Refreshes are single-flight: concurrent callers wait for one client_credentials exchange.
+    """
+
+    def __init__(self):
+        self._token: str | None = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+        self.mints = 0
+
+    def _valid(self) -> bool:
+        return self._token is not None and time.monotonic() < self._expires_at
+
+    def get(self) -> str:
+        if self._valid():
+            return self._token
+        with self._lock:
+            if not self._valid():
+                self._token, expires_in = self._mint()
+                self._expires_at = time.monotonic() + max(0.0, expires_in - AUTH0_TOKEN_REFRESH_MARGIN_SECONDS)
+                self.mints += 1
+            return self._token
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._token = None
+            self._expires_at = 0.0
+
+    def stats(self) -> dict:
+        return {
+            "cached": self._valid(),
+            "expires_in_s": max(0.0, self._expires_at - time.monotonic()) if self._token else 0.0,
+            "mints": self.mints,
+        }
+
+    @staticmethod
+    def _mint() -> tuple[str, float]:
+        if not AUTH0_DOMAIN or not AUTH0_M2M_CLIENT_ID or not AUTH0_M2M_CLIENT_SECRET:
             raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="User not found",
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Auth0 Management API not configured (AUTH0_DOMAIN, AUTH0_M2M_CLIENT_ID, AUTH0_M2M_CLIENT_SECRET)",
             )
+        url = f"https://{AUTH0_DOMAIN}/oauth/token"
+        payload = {
+            "grant_type": "client_credentials",
+            "client_id": AUTH0_M2M_CLIENT_ID,
+            "client_secret": AUTH0_M2M_CLIENT_SECRET,
+            "audience": AUTH0_MANAGEMENT_AUDIENCE,
+        }
+        resp = _request("oauth_token", "POST", url, json=payload)
         resp.raise_for_status()
         data = resp.json()
-    return data.get("user_metadata") or {}
+        access_token = data.get("access_token")
+        if not access_token:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Failed to obtain Auth0 Management API token",
+            )
+        return access_token, float(data.get("expires_in") or 0)
+
+
+_token_manager = _M2MTokenManager()
 
 
-def _patch_user_metadata(user_id: str, token: str, user_metadata: dict) -> None:
+def _get_m2m_token() -> str:
+    return _token_manager.get()
+
+
+def _management_request(name: str, method: str, user_id: str, **kwargs) -> httpx.Response:
+    """Management API call for one user; on 401 the cached token is dropped and the call retried once."""
     encoded_id = quote(user_id, safe="")
     url = f"https://{AUTH0_DOMAIN}/api/v2/users/{encoded_id}"
-    with httpx.Client() as client:
-        resp = client.patch(
-            url,
-            headers={"Authorization": f"Bearer {token}", "Content-Type": "application/json"},
-            json={"user_metadata": user_metadata},
+    extra_headers = kwargs.pop("headers", {})
+    for attempt in range(2):
+        headers = {"Authorization": f"Bearer {_get_m2m_token()}", **extra_headers}
+        resp = _request(name, method, url, headers=headers, **kwargs)
+        if resp.status_code != 401 or attempt:
+            break
+        _token_manager.invalidate()
+    if resp.status_code == 404:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found",
         )
-        if resp.status_code == 404:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="User not found",
-            )
-        resp.raise_for_status()
+    resp.raise_for_status()
+    return resp
+
+
+def _get_user_metadata(user_id: str) -> dict:
+    """Get user record; return user_metadata dict (empty if missing)."""
+    data = _management_request("get_user", "GET", user_id).json()
+    return data.get("user_metadata") or {}
+
+
+def _patch_user_metadata(user_id: str, user_metadata: dict) -> None:
+    _management_request(
+        "patch_user",
+        "PATCH",
+        user_id,
+        headers={"Content-Type": "application/json"},
+        json={"user_metadata": user_metadata},
+    )
+
+
+def fetch_node_history(user_id: str) -> List[str]:
+    """Return the user's node_history from Auth0 user_metadata (max 5, newest last). Raises on any error."""
+    meta = _get_user_metadata(user_id)
+    history = meta.get(NODE_HISTORY_KEY) or []
+    if not isinstance(history, list):
+        return []
+    return [str(x) for x in history if x is not None][-NODE_HISTORY_MAX_SIZE:]
 
 
 def get_node_history(user_id: str) -> List[str]:
@@ -84,26 +206,28 @@ def get_node_history(user_id: str) -> List[str]:
     Returns [] if not set or Auth0 not configured.
     """
     try:
-        token = _get_m2m_token()
-        meta = _get_user_metadata(user_id, token)
-        history = list(meta.get(NODE_HISTORY_KEY) or [])
-        if not isinstance(history, list):
-            return []
-        return [str(x) for x in history if x is not None][-NODE_HISTORY_MAX_SIZE:]
+        return fetch_node_history(user_id)
     except HTTPException:
         raise
     except Exception:
         return []
 
 
+def set_node_history(user_id: str, history: List[str]) -> None:
+    """
+    Overwrite node_history in the user's user_metadata with a single PATCH.
+    Auth0 merges top-level user_metadata keys, so other keys are left untouched.
+    """
+    _patch_user_metadata(user_id, {NODE_HISTORY_KEY: [str(x) for x in history]})
+
+
 def append_node_to_history(user_id: str, node_id: str) -> List[str]:
     """
     Append node_id to the user's node_history in Auth0 user_metadata.
     Keeps at most NODE_HISTORY_MAX_SIZE (5) entries, newest last.
     Returns the updated history list.
     """
-    token = _get_m2m_token()
-    meta = _get_user_metadata(user_id, token)
+    meta = _get_user_metadata(user_id)
     history: List[str] = list(meta.get(NODE_HISTORY_KEY) or [])
     if not isinstance(history, list):
         history = []
@@ -114,5 +238,5 @@ def append_node_to_history(user_id: str, node_id: str) -> List[str]:
     history.append(str(node_id))
     history = history[-NODE_HISTORY_MAX_SIZE:]
     meta[NODE_HISTORY_KEY] = history
-    _patch_user_metadata(user_id, token, meta)
+    _patch_user_metadata(user_id, meta)
     return history
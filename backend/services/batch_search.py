@@ -0,0 +1,136 @@
+"""
+Micro-batching in front of a search index: queries arriving within a short window are scored together
+with one search_batch call (a single matrix-matrix product for exact search) instead of one full
+pass over the embedding matrix per request.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from backend.core.config import SEARCH_BATCH_MAX_SIZE, SEARCH_BATCH_WINDOW_MS
+
+# Queue sentinel: stop the collector
+_STOP = object()
+
+
+class BatchedSearcher:
+    """
+    Same search(query, k, exclude) interface as the indexes in ann_index. Callers block on a Future
+    while a collector thread gathers up to max_batch queries, waiting at most window_ms after the
+    first one, runs index.search_batch once and fans the results back out.
+    """
+
+    def __init__(self, index, max_batch: int = SEARCH_BATCH_MAX_SIZE, window_ms: float = SEARCH_BATCH_WINDOW_MS):
+        self.index = index
+        self.kind = index.kind
+        self.max_batch = max(1, max_batch)
+        self.window = window_ms / 1000
+        self._queue: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self.batches = 0
+        self.queries = 0
+        self.max_batch_seen = 0
+        self.busy_ms = 0.0
+        self._thread = threading.Thread(target=self._run, name="batch-search", daemon=True)
+        self._thread.start()
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def search(self, query: np.ndarray, k: int, exclude=None) -> tuple[np.ndarray, np.ndarray]:
+        """Return (node ids, scores) of the top k rows for one query, best first."""
+        future: Future = Future()
+        # Checked and enqueued under the lock close() takes to stop, so nothing lands behind _STOP
+        with self._lock:
+            closed = self._closed
+            if not closed:
+                self._queue.put((np.asarray(query, dtype=np.float32).reshape(-1), k, exclude, future))
+        if closed:
+            return self.index.search(query, k, exclude=exclude)
+        return future.result()
+
+    def search_batch(self, queries: np.ndarray, k: int, excludes=None) -> tuple[list, list]:
+        # Already a batch: no point queueing it
+        return self.index.search_batch(queries, k, excludes)
+
+    def _collect(self, first) -> tuple[list, bool]:
+        """Gather a batch starting with first; returns (batch, stop requested)."""
+        batch = [first]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _score(self, batch: list) -> None:
+        start = time.perf_counter()
+        k = max(item[1] for item in batch)
+        try:
+            ids, scores = self.index.search_batch(
+                np.stack([item[0] for item in batch]), k, [item[2] for item in batch]
+            )
+        except BaseException as e:
+            for item in batch:
+                item[3].set_exception(e)
+            return
+        for (_, item_k, _, future), row_ids, row_scores in zip(batch, ids, scores):
+            future.set_result((row_ids[:item_k], row_scores[:item_k]))
+        with self._lock:
+            self.batches += 1
+            self.queries += len(batch)
+            self.max_batch_seen = max(self.max_batch_seen, len(batch))
+            self.busy_ms += (time.perf_counter() - start) * 1000
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            batch, stop = self._collect(item)
+            self._score(batch)
+            if stop:
+                return
+
+    def close(self) -> None:
+        """Stop the collector after the queries already queued; later calls search directly."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+        self._thread.join()
+        # Nothing can be queued any more; whatever the collector left (e.g. it died) is answered here
+        leftover = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                leftover.append(item)
+        if leftover:
+            self._score(leftover)
+        for item in leftover:
+            if not item[3].done():
+                item[3].set_exception(RuntimeError("BatchedSearcher closed before the query was answered"))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "kind": self.kind,
+                "batches": self.batches,
+                "queries": self.queries,
+                "avg_batch": self.queries / self.batches if self.batches else 0.0,
+                "max_batch": self.max_batch_seen,
+                "busy_ms": self.busy_ms,
+            }
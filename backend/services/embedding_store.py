@@ -0,0 +1,90 @@
+"""Shared paper embedding store: one pre-normalized float32 file, memory-mapped read-only by every worker."""
+import os
+from pathlib import Path
+
+import numpy as np
+
+from backend.core.config import PAPER_EMBEDDINGS_NORMALIZED_PATH, PAPER_EMBEDDINGS_PATH
+
+# Rows normalized per step when building the artifact (bounds peak memory)
+_BUILD_CHUNK_ROWS = 16384
+
+# Read-only memmap of PAPER_EMBEDDINGS_NORMALIZED_PATH, shape (num_nodes, 256)
+_embeddings: np.ndarray | None = None
+
+
+def build_normalized_embeddings(src: Path | None = None, dst: Path | None = None) -> Path:
+    """
+    Write an L2-normalized float32 copy of src (default PAPER_EMBEDDINGS_PATH) to dst, chunk by chunk.
+    Written to a temp file and renamed, so concurrent workers never map a partial file.
+    """
+    src = src or PAPER_EMBEDDINGS_PATH
+    dst = dst or PAPER_EMBEDDINGS_NORMALIZED_PATH
+    if not src.exists():
+        raise FileNotFoundError(f"Embeddings not found: {src}")
+    raw = np.load(src, mmap_mode="r")
+    tmp = dst.with_name(f"{dst.name}.{os.getpid()}.tmp")
+    out = np.lib.format.open_memmap(tmp, mode="w+", dtype=np.float32, shape=raw.shape)
+    try:
+        for start in range(0, raw.shape[0], _BUILD_CHUNK_ROWS):
+            block = np.asarray(raw[start:start + _BUILD_CHUNK_ROWS], dtype=np.float32)
+            norms = np.linalg.norm(block, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            out[start:start + len(block)] = block / norms
+        out.flush()
+    except BaseException:
+        del out
+        tmp.unlink(missing_ok=True)
+        raise
+    del out
+    os.replace(tmp, dst)
+    return dst
+
+
+def _needs_build(src: Path, dst: Path) -> bool:
+    if not dst.exists():
+        return True
+    return src.exists() and src.stat().st_mtime > dst.stat().st_mtime
+
+
+def get_embeddings() -> np.ndarray:
+    """Return the shared read-only (num_nodes, 256) memmap, building the normalized artifact if needed."""
+    global _embeddings
+    if _embeddings is None:
+        if _needs_build(PAPER_EMBEDDINGS_PATH, PAPER_EMBEDDINGS_NORMALIZED_PATH):
+            build_normalized_embeddings()
+        _embeddings = np.load(PAPER_EMBEDDINGS_NORMALIZED_PATH, mmap_mode="r")
+    return _embeddings
+
+
+def memory_usage() -> dict:
+    """
+    Report mapped size and resident memory of the embedding mapping in this process.
+    rss counts resident pages; pss splits shared pages across the processes mapping them.
+    Both are None where /proc/self/smaps is unavailable (non-Linux).
+    """
+    path = str(PAPER_EMBEDDINGS_NORMALIZED_PATH.resolve())
+    usage = {
+        "path": path,
+        "mapped_bytes": int(_embeddings.nbytes) if _embeddings is not None else 0,
+        "rss_bytes": None,
+        "pss_bytes": None,
+    }
+    try:
+        with open("/proc/self/smaps", encoding="utf-8") as f:
+            lines = f.readlines()
+    except OSError:
+        return usage
+    rss_kb, pss_kb, in_mapping = 0, 0, False
+    for line in lines:
+        fields = line.split()
+        # Mapping header lines start with an address range, e.g. "7f..-7f.. r--s 0000 08:01 123 /path"
+        if fields and "-" in fields[0] and not fields[0].endswith(":"):
+            in_mapping = len(fields) >= 6 and fields[-1] == path
+        elif in_mapping and fields[0] == "Rss:":
+            rss_kb += int(fields[1])
+        elif in_mapping and fields[0] == "Pss:":
+            pss_kb += int(fields[1])
+    usage["rss_bytes"] = rss_kb * 1024
+    usage["pss_bytes"] = pss_kb * 1024
+    return usage
@@ -0,0 +1,288 @@
+"""
+Local authoritative click history (SQLite shared by workers), written behind to Auth0 user_metadata.
+
+Clicks update the local row immediately; a background thread PATCHes node_history to Auth0 after
+NODE_HISTORY_FLUSH_DELAY_SECONDS, so several clicks from one user coalesce into a single PATCH.
+Users seen for the first time are seeded from Auth0 once.
+"""
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from typing import List
+
+from fastapi import HTTPException
+
+from backend.core.config import (
+    NODE_HISTORY_DB_PATH,
+    NODE_HISTORY_FLUSH_DELAY_SECONDS,
+    NODE_HISTORY_FLUSH_LEASE_SECONDS,
+    NODE_HISTORY_RETRY_SECONDS,
+)
+from backend.services import auth0_storage
+from backend.services.auth0_storage import NODE_HISTORY_MAX_SIZE
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS node_history (
+    user_id TEXT PRIMARY KEY,
+    history TEXT NOT NULL,            -- JSON list of node ids (str), newest last
+    version INTEGER NOT NULL,         -- bumped on every click
+    synced_version INTEGER NOT NULL,  -- last version PATCHed to Auth0
+    updated_at REAL NOT NULL,
+    flush_lease_until REAL NOT NULL DEFAULT 0  -- wall time until which one worker owns the PATCH
+)
+"""
+
+# Striped locks serialize clicks per user within a worker (BEGIN IMMEDIATE does it across workers)
+_LOCK_STRIPES = 64
+_user_locks = [threading.Lock() for _ in range(_LOCK_STRIPES)]
+
+_local = threading.local()
+
+# user id -> monotonic time its Auth0 flush is due; guarded by _cond
+_pending: dict[str, float] = {}
+_cond = threading.Condition()
+_flusher: threading.Thread | None = None
+_stopping = False
+
+_stats = {"appends": 0, "flushes": 0, "coalesced": 0, "flush_failures": 0, "seeded": 0, "lease_busy": 0}
+# Request threads and the flusher both count
+_stats_lock = threading.Lock()
+
+
+def _connect() -> sqlite3.Connection:
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        NODE_HISTORY_DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+        # isolation_level=None: transactions are explicit (BEGIN IMMEDIATE below)
+        conn = sqlite3.connect(NODE_HISTORY_DB_PATH, timeout=5.0, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(_SCHEMA)
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(node_history)")}
+        if "flush_lease_until" not in columns:
+            # Store created before the flush lease
+            try:
+                conn.execute("ALTER TABLE node_history ADD COLUMN flush_lease_until REAL NOT NULL DEFAULT 0")
+            except sqlite3.OperationalError:
+                pass  # another worker added it first
+        _local.conn = conn
+    return conn
+
+
+def _count(name: str) -> None:
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def _user_lock(user_id: str) -> threading.Lock:
+    return _user_locks[zlib.crc32(user_id.encode("utf-8")) % _LOCK_STRIPES]
+
+
+def _read(conn: sqlite3.Connection, user_id: str) -> tuple[List[str], int, int] | None:
+    row = conn.execute(
+        "SELECT history, version, synced_version FROM node_history WHERE user_id = ?", (user_id,)
+    ).fetchone()
+    if row is None:
+        return None
+    return json.loads(row[0]), row[1], row[2]
+
+
+def _seed_from_auth0(conn: sqlite3.Connection, user_id: str) -> List[str]:
+    """Import the user's existing Auth0 history once. Raises if Auth0 cannot be read."""
+    history = auth0_storage.fetch_node_history(user_id)
+    conn.execute(
+        "INSERT OR IGNORE INTO node_history (user_id, history, version, synced_version, updated_at)"
+        " VALUES (?, ?, 0, 0, ?)",
+        (user_id, json.dumps(history), time.time()),
+    )
+    _count("seeded")
+    return history
+
+
+def get_node_history(user_id: str) -> List[str]:
+    """Return the user's history (max 5, newest last) from the local store; [] if it cannot be determined."""
+    conn = _connect()
+    row = _read(conn, user_id)
+    if row is not None:
+        return row[0]
+    with _user_lock(user_id):
+        row = _read(conn, user_id)
+        if row is not None:
+            return row[0]
+        try:
+            return _seed_from_auth0(conn, user_id)
+        except HTTPException:
+            raise
+        except Exception:
+            # Auth0 unreachable: answer empty but do not persist the guess
+            return []
+
+
+def _appended(history: List[str], node_id: str) -> List[str]:
+    """Move/append node_id to the end, keeping at most NODE_HISTORY_MAX_SIZE entries."""
+    history = [x for x in history if x != node_id]
+    history.append(node_id)
+    return history[-NODE_HISTORY_MAX_SIZE:]
+
+
+def append_node(user_id: str, node_id: str) -> List[str]:
+    """
+    Record a click locally and schedule the Auth0 sync. Returns the updated history.
+    Raises if the user is new and their existing Auth0 history cannot be read.
+    """
+    node_id = str(node_id)
+    conn = _connect()
+    with _user_lock(user_id):
+        if _read(conn, user_id) is None:
+            _seed_from_auth0(conn, user_id)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            history, version, _ = _read(conn, user_id)
+            history = _appended(history, node_id)
+            conn.execute(
+                "UPDATE node_history SET history = ?, version = ?, updated_at = ? WHERE user_id = ?",
+                (json.dumps(history), version + 1, time.time(), user_id),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+    _count("appends")
+    _schedule_flush(user_id, NODE_HISTORY_FLUSH_DELAY_SECONDS)
+    return history
+
+
+def _schedule_flush(user_id: str, delay: float) -> None:
+    with _cond:
+        if user_id in _pending:
+            # Already queued: this click rides along with the pending PATCH
+            _count("coalesced")
+        else:
+            _pending[user_id] = time.monotonic() + delay
+        _cond.notify()
+    _ensure_flusher()
+
+
+def _claim_flush(conn: sqlite3.Connection, user_id: str) -> tuple[List[str], int] | None:
+    """
+    (history, version) to PATCH, with the user's flush lease taken; None if already in sync or
+    another worker holds the lease. Under BEGIN IMMEDIATE, so only one worker at a time can PATCH a
+    user and a PATCH of an older version can never land after a newer one.
+    """
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        row = conn.execute(
+            "SELECT history, version, synced_version, flush_lease_until FROM node_history WHERE user_id = ?",
+            (user_id,),
+        ).fetchone()
+        if row is None or row[1] <= row[2]:
+            conn.execute("COMMIT")
+            return None
+        if row[3] > now:
+            conn.execute("COMMIT")
+            _count("lease_busy")
+            if not _stopping:
+                # The holder may have read the history before this worker's clicks: check again shortly
+                _schedule_flush(user_id, NODE_HISTORY_FLUSH_DELAY_SECONDS)
+            return None
+        conn.execute(
+            "UPDATE node_history SET flush_lease_until = ? WHERE user_id = ?",
+            (now + NODE_HISTORY_FLUSH_LEASE_SECONDS, user_id),
+        )
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    return json.loads(row[0]), row[1]
+
+
+def _flush_user(user_id: str) -> None:
+    """PATCH the user's current local history to Auth0 if it is ahead of the last sync."""
+    conn = _connect()
+    claimed = _claim_flush(conn, user_id)
+    if claimed is None:
+        return
+    history, version = claimed
+    try:
+        auth0_storage.set_node_history(user_id, history)
+    except Exception as e:
+        conn.execute("UPDATE node_history SET flush_lease_until = 0 WHERE user_id = ?", (user_id,))
+        _count("flush_failures")
+        if _stopping:
+            # Left unsynced in SQLite; start() queues it again on the next boot
+            print(f"[History] Auth0 sync failed for {user_id!r} during shutdown: {e}")
+        else:
+            print(f"[History] Auth0 sync failed for {user_id!r}, retrying in {NODE_HISTORY_RETRY_SECONDS}s: {e}")
+            _schedule_flush(user_id, NODE_HISTORY_RETRY_SECONDS)
+        return
+    conn.execute(
+        "UPDATE node_history SET synced_version = MAX(synced_version, ?), flush_lease_until = 0 WHERE user_id = ?",
+        (version, user_id),
+    )
+    _count("flushes")
+
+
+def _run_flusher() -> None:
+    while True:
+        with _cond:
+            while True:
+                now = time.monotonic()
+                due = [u for u, t in _pending.items() if t <= now or _stopping]
+                if due or _stopping:
+                    break
+                timeout = min(_pending.values()) - now if _pending else None
+                _cond.wait(timeout)
+            for user_id in due:
+                del _pending[user_id]
+        for user_id in due:
+            try:
+                _flush_user(user_id)
+            except Exception as e:
+                # e.g. "database is locked" under contention: keep the thread and the rest of the batch
+                _count("flush_failures")
+                print(f"[History] Flush of {user_id!r} failed, retrying in {NODE_HISTORY_RETRY_SECONDS}s: {e}")
+                if not _stopping:
+                    _schedule_flush(user_id, NODE_HISTORY_RETRY_SECONDS)
+        if _stopping and not due:
+            return
+
+
+def _ensure_flusher() -> None:
+    global _flusher
+    if _flusher is None or not _flusher.is_alive():
+        with _cond:
+            if _stopping:
+                return
+            if _flusher is None or not _flusher.is_alive():
+                _flusher = threading.Thread(target=_run_flusher, name="history-flusher", daemon=True)
+                _flusher.start()
+
+
+def start() -> None:
+    """Start the background sync and queue users whose history was not yet synced (e.g. before a restart)."""
+    global _stopping
+    _stopping = False
+    rows = _connect().execute("SELECT user_id FROM node_history WHERE version > synced_version").fetchall()
+    for (user_id,) in rows:
+        _schedule_flush(user_id, 0.0)
+    _ensure_flusher()
+
+
+def stop(timeout: float = 10.0) -> None:
+    """Flush everything pending to Auth0 now and stop the background thread."""
+    global _stopping
+    with _cond:
+        _stopping = True
+        _cond.notify()
+    if _flusher is not None:
+        _flusher.join(timeout)
+
+
+def stats() -> dict:
+    with _cond:
+        pending = len(_pending)
+    with _stats_lock:
+        return {**_stats, "pending": pending}
@@ -0,0 +1,139 @@
+"""Array-backed MAG id <-> node index mappings (memory-mapped int64 .npy, vectorized lookups)."""
+import os
+from pathlib import Path
+
+import numpy as np
+
+from backend.core.config import (
+    MAG_SORTED_NODE_PATH,
+    MAG_SORTED_PATH,
+    MAG_TO_NODE_IDX_PATH,
+    NODE_TO_MAG_ARRAY_PATH,
+    NODE_TO_MAG_ID_PATH,
+)
+
+# Marker for "no mapping" in both directions
+MISSING = -1
+# Ids are stored as int64; anything outside this range cannot be in the mapping
+INT64_MIN = -(2**63)
+INT64_MAX = 2**63 - 1
+
+# Dense node index -> MAG id, shape (num_nodes,)
+_node_to_mag: np.ndarray | None = None
+# Sorted MAG ids and the node index of each, shape (num_mapped,)
+_mag_sorted: np.ndarray | None = None
+_mag_sorted_node: np.ndarray | None = None
+
+
+def _save_atomic(path: Path, arr: np.ndarray) -> None:
+    """np.save to a temp file and rename, so readers never map a partial file."""
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        np.save(f, arr)
+    os.replace(tmp, path)
+
+
+def convert_legacy_mappings(
+    node_to_mag_path: Path | None = None,
+    mag_to_node_path: Path | None = None,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Convert the pickled dict mappings (node_to_mag_id.npy, mag_to_node_idx.npy) into
+    NODE_TO_MAG_ARRAY_PATH, MAG_SORTED_PATH and MAG_SORTED_NODE_PATH. Returns the three arrays.
+    """
+    node_to_mag_path = node_to_mag_path or NODE_TO_MAG_ID_PATH
+    mag_to_node_path = mag_to_node_path or MAG_TO_NODE_IDX_PATH
+    for path in (node_to_mag_path, mag_to_node_path):
+        if not path.exists():
+            raise FileNotFoundError(f"Mapping not found: {path}")
+    node_to_mag_dict = np.load(node_to_mag_path, allow_pickle=True).item()
+    mag_to_node_dict = np.load(mag_to_node_path, allow_pickle=True).item()
+
+    nodes = np.fromiter((int(k) for k in node_to_mag_dict), dtype=np.int64, count=len(node_to_mag_dict))
+    mags = np.fromiter((int(v) for v in node_to_mag_dict.values()), dtype=np.int64, count=len(node_to_mag_dict))
+    node_to_mag = np.full(int(nodes.max()) + 1 if len(nodes) else 0, MISSING, dtype=np.int64)
+    node_to_mag[nodes] = mags
+
+    keys = np.fromiter((int(k) for k in mag_to_node_dict), dtype=np.int64, count=len(mag_to_node_dict))
+    values = np.fromiter((int(v) for v in mag_to_node_dict.values()), dtype=np.int64, count=len(mag_to_node_dict))
+    order = np.argsort(keys, kind="stable")
+    mag_sorted = keys[order]
+    mag_sorted_node = values[order]
+
+    _save_atomic(NODE_TO_MAG_ARRAY_PATH, node_to_mag)
+    _save_atomic(MAG_SORTED_PATH, mag_sorted)
+    _save_atomic(MAG_SORTED_NODE_PATH, mag_sorted_node)
+    return node_to_mag, mag_sorted, mag_sorted_node
+
+
+def _load() -> None:
+    """Memory-map the three arrays, converting from the pickled mappings on first run."""
+    global _node_to_mag, _mag_sorted, _mag_sorted_node
+    if _node_to_mag is not None:
+        return
+    paths = (NODE_TO_MAG_ARRAY_PATH, MAG_SORTED_PATH, MAG_SORTED_NODE_PATH)
+    if not all(p.exists() for p in paths):
+        convert_legacy_mappings()
+    _mag_sorted = np.load(MAG_SORTED_PATH, mmap_mode="r")
+    _mag_sorted_node = np.load(MAG_SORTED_NODE_PATH, mmap_mode="r")
+    _node_to_mag = np.load(NODE_TO_MAG_ARRAY_PATH, mmap_mode="r")
+
+
+def node_to_mag_array() -> np.ndarray:
+    """Dense read-only node index -> MAG id array (MISSING where unmapped)."""
+    _load()
+    return _node_to_mag
+
+
+def nodes_to_mags(node_ids) -> np.ndarray:
+    """Vectorized node index -> MAG id; MISSING for out-of-range or unmapped nodes."""
+    _load()
+    nodes, fits = _as_int64(node_ids)
+    out = np.full(nodes.shape, MISSING, dtype=np.int64)
+    valid = (nodes >= 0) & (nodes < len(_node_to_mag))
+    if fits is not None:
+        valid &= fits
+    out[valid] = _node_to_mag[nodes[valid]]
+    return out
+
+
+def _as_int64(values) -> tuple[np.ndarray, np.ndarray | None]:
+    """
+    values as int64 plus a mask of the ones that fit (None: all of them). User-supplied ids can
+    exceed int64, which np.asarray rejects with OverflowError; those become 0 and are masked out.
+    """
+    try:
+        return np.asarray(values, dtype=np.int64), None
+    except OverflowError:
+        ints = [int(v) for v in values]
+        fits = np.fromiter((INT64_MIN <= v <= INT64_MAX for v in ints), dtype=bool, count=len(ints))
+        arr = np.fromiter((v if ok else 0 for v, ok in zip(ints, fits)), dtype=np.int64, count=len(ints))
+        return arr, fits
+
+
+def mags_to_nodes(mag_ids) -> np.ndarray:
+    """
+    Vectorized MAG id -> node index via binary search over the sorted MAG ids; MISSING if unknown
+    (including ids outside the int64 range).
+    """
+    _load()
+    mags, fits = _as_int64(mag_ids)
+    if len(_mag_sorted) == 0:
+        return np.full(mags.shape, MISSING, dtype=np.int64)
+    pos = np.minimum(np.searchsorted(_mag_sorted, mags), len(_mag_sorted) - 1)
+    found = _mag_sorted[pos] == mags
+    if fits is not None:
+        found &= fits
+    return np.where(found, _mag_sorted_node[pos], MISSING).astype(np.int64)
+
+
+def node_to_mag(node_id: int) -> int | None:
+    """Single node index -> MAG id, or None."""
+    mag = int(nodes_to_mags([node_id])[0])
+    return None if mag == MISSING else mag
+
+
+def mag_to_node(mag_id: int) -> int | None:
+    """Single MAG id -> node index, or None."""
+    node = int(mags_to_nodes([mag_id])[0])
+    return None if node == MISSING else node
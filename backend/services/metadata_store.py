@@ -0,0 +1,134 @@
+"""Local paper metadata store: SQLite keyed by node index, ingested from arxiv_mag_metadata.json."""
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import numpy as np
+
+from backend.core.config import PAPER_METADATA_DB_PATH
+from backend.services import id_mapping
+
+COLUMNS = ("node_idx", "mag_id", "title", "abstract", "arxiv_id", "pdf_url", "doi")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS papers (
+    node_idx INTEGER PRIMARY KEY,
+    mag_id INTEGER NOT NULL UNIQUE,
+    title TEXT,
+    abstract TEXT,
+    arxiv_id TEXT,
+    pdf_url TEXT,
+    doi TEXT
+)
+"""
+
+# SQLite caps bound parameters per statement; stay well below it
+_MAX_IN_PARAMS = 500
+
+_local = threading.local()
+
+
+def iter_metadata_records(path: Path) -> Iterator[dict]:
+    """
+    Yield records from either metadata format the ml_pipeline writes:
+    a dict MAG id -> record (src/arxiv_metadata.py) or a list of records (scripts/data.py).
+    """
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        for mag_id, record in data.items():
+            if isinstance(record, dict):
+                yield {**record, "mag_id": record.get("mag_id") or mag_id}
+    elif isinstance(data, list):
+        for record in data:
+            if isinstance(record, dict):
+                yield record
+
+
+def ingest(records: Iterable[dict], db_path: Path | None = None) -> tuple[int, int]:
+    """
+    (Re)build the store from metadata records. Records whose MAG id is not numeric, does not fit
+    the int64 column, or has no node index are skipped. Written to a temp file and renamed, so
+    readers never see a half-built database. Returns (ingested, skipped).
+    """
+    db_path = db_path or PAPER_METADATA_DB_PATH
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    total = 0
+    valid = []
+    for r in records:
+        total += 1
+        mag = str(r.get("mag_id") or "").strip()
+        if mag.isdigit() and int(mag) <= id_mapping.INT64_MAX:
+            valid.append((r, int(mag)))
+    records = [r for r, _ in valid]
+    mags = np.fromiter((mag for _, mag in valid), dtype=np.int64, count=len(valid))
+    nodes = id_mapping.mags_to_nodes(mags).tolist()
+
+    tmp = db_path.with_name(f"{db_path.name}.{os.getpid()}.tmp")
+    tmp.unlink(missing_ok=True)
+    conn = sqlite3.connect(tmp)
+    try:
+        conn.execute(_SCHEMA)
+        rows = [
+            (
+                node,
+                int(mag),
+                r.get("title"),
+                r.get("abstract") or None,
+                r.get("arxiv_id") or None,
+                r.get("pdf_url") or None,
+                r.get("doi") or None,
+            )
+            for r, mag, node in zip(records, mags.tolist(), nodes)
+            if node != id_mapping.MISSING
+        ]
+        with conn:
+            conn.executemany(f"INSERT OR REPLACE INTO papers VALUES ({', '.join('?' * len(COLUMNS))})", rows)
+    finally:
+        conn.close()
+    os.replace(tmp, db_path)
+    return len(rows), total - len(rows)
+
+
+def _connect() -> sqlite3.Connection | None:
+    """Per-thread read-only connection, or None while the store has not been ingested."""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        if not PAPER_METADATA_DB_PATH.exists():
+            return None
+        conn = sqlite3.connect(f"file:{PAPER_METADATA_DB_PATH}?mode=ro", uri=True, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        _local.conn = conn
+    return conn
+
+
+def get_by_node(node_id: int) -> dict | None:
+    """Metadata record for one node index (primary-key lookup), or None."""
+    conn = _connect()
+    if conn is None:
+        return None
+    row = conn.execute("SELECT * FROM papers WHERE node_idx = ?", (int(node_id),)).fetchone()
+    return dict(row) if row is not None else None
+
+
+def get_by_mag_id(mag_id: int) -> dict | None:
+    node_id = id_mapping.mag_to_node(mag_id)
+    return get_by_node(node_id) if node_id is not None else None
+
+
+def get_many_by_nodes(node_ids) -> dict[int, dict]:
+    """Records for many node indices, keyed by node index (missing nodes are absent)."""
+    conn = _connect()
+    if conn is None:
+        return {}
+    nodes = [int(n) for n in dict.fromkeys(node_ids) if int(n) != id_mapping.MISSING]
+    found: dict[int, dict] = {}
+    for i in range(0, len(nodes), _MAX_IN_PARAMS):
+        chunk = nodes[i:i + _MAX_IN_PARAMS]
+        placeholders = ", ".join("?" * len(chunk))
+        for row in conn.execute(f"SELECT * FROM papers WHERE node_idx IN ({placeholders})", chunk):
+            found[row["node_idx"]] = dict(row)
+    return found
@@ -0,0 +1,119 @@
+"""Two-tier cache for OpenAlex works keyed by numeric MAG id: in-process LRU + TTL over a shared SQLite file."""
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from backend.core.cache import TTLCache
+from backend.core.config import (
+    OPENALEX_CACHE_MEMORY_SIZE,
+    OPENALEX_CACHE_NEGATIVE_TTL_SECONDS,
+    OPENALEX_CACHE_PATH,
+    OPENALEX_CACHE_TTL_SECONDS,
+)
+
+# Sentinel for "not in the memory tier" (None is a cached negative result)
+_MISS = object()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS openalex_works (
+    mag_id INTEGER PRIMARY KEY,
+    work TEXT,               -- JSON of the selected OpenAlex fields; NULL = OpenAlex has no such work
+    fetched_at REAL NOT NULL -- unix time
+)
+"""
+
+
+class WorkCache:
+    """
+    get(mag_id) -> (found, work). found=False means the caller must fetch from OpenAlex;
+    found=True with work=None is a cached negative result.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        memory_size: int = OPENALEX_CACHE_MEMORY_SIZE,
+        ttl: float = OPENALEX_CACHE_TTL_SECONDS,
+        negative_ttl: float = OPENALEX_CACHE_NEGATIVE_TTL_SECONDS,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.memory = TTLCache(memory_size, ttl)
+        self.disk_hits = 0
+        self.disk_misses = 0
+        self.negative_hits = 0
+        # sqlite3 connections must not be shared across threads (FastAPI runs sync handlers in a pool)
+        self._local = threading.local()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _ttl_for(self, work: dict | None) -> float:
+        return self.ttl if work is not None else self.negative_ttl
+
+    def get(self, mag_id: int) -> tuple[bool, dict | None]:
+        work = self.memory.get(mag_id, _MISS)
+        if work is not _MISS:
+            if work is None:
+                self.negative_hits += 1
+            return True, work
+
+        row = self._connect().execute(
+            "SELECT work, fetched_at FROM openalex_works WHERE mag_id = ?", (mag_id,)
+        ).fetchone()
+        if row is not None:
+            work = json.loads(row[0]) if row[0] is not None else None
+            remaining = row[1] + self._ttl_for(work) - time.time()
+            if remaining > 0:
+                self.disk_hits += 1
+                if work is None:
+                    self.negative_hits += 1
+                # Promote to memory, expiring no later than the disk entry
+                self.memory.set(mag_id, work, ttl=remaining)
+                return True, work
+        self.disk_misses += 1
+        return False, None
+
+    def put(self, mag_id: int, work: dict | None) -> None:
+        """Store a fetched work (or None for "OpenAlex has no such work") in both tiers."""
+        self.memory.set(mag_id, work, ttl=self._ttl_for(work))
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO openalex_works (mag_id, work, fetched_at) VALUES (?, ?, ?)",
+                (mag_id, json.dumps(work) if work is not None else None, time.time()),
+            )
+
+    def stats(self) -> dict:
+        return {
+            "memory": self.memory.stats(),
+            "disk_hits": self.disk_hits,
+            "disk_misses": self.disk_misses,
+            "negative_hits": self.negative_hits,
+        }
+
+
+_cache: WorkCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> WorkCache:
+    """Process-wide WorkCache at OPENALEX_CACHE_PATH."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = WorkCache(OPENALEX_CACHE_PATH)
+    return _cache
@@ -0,0 +1,264 @@
+"""
+Async OpenAlex client: one keep-alive connection pool per worker, bounded concurrency, retries with
+jittered backoff, coalescing of concurrent lookups for the same MAG id, and a circuit breaker.
+"""
+import asyncio
+import random
+import time
+
+import httpx
+
+from backend.core.config import (
+    OPENALEX_BASE_URL,
+    OPENALEX_BATCH_SIZE,
+    OPENALEX_BREAKER_FAILURE_THRESHOLD,
+    OPENALEX_BREAKER_RESET_SECONDS,
+    OPENALEX_MAILTO,
+    OPENALEX_MAX_CONCURRENCY,
+    OPENALEX_MAX_CONNECTIONS,
+    OPENALEX_MAX_RETRIES,
+    OPENALEX_TIMEOUT_SECONDS,
+)
+
+USER_AGENT = "AriadneBackend/1.0 (mailto:optional@example.com)"
+# Fields the backend needs from a work
+WORK_FIELDS = "ids,doi,abstract_inverted_index"
+_RETRY_STATUSES = {429, 500, 502, 503, 504}
+_BACKOFF_BASE_SECONDS = 0.25
+_BACKOFF_MAX_SECONDS = 4.0
+
+
+class OpenAlexUnavailable(Exception):
+    """OpenAlex could not be reached: circuit open, retries exhausted, or a non-retryable error."""
+
+
+class CircuitBreaker:
+    """
+    Closed: requests flow. After failure_threshold consecutive failures it opens and rejects
+    requests for reset_timeout seconds, then lets a single probe through (half-open).
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._opened_at = None
+        self._probe_in_flight = False
+
+    def release_probe(self) -> None:
+        """A request ended without recording a result (e.g. cancelled): let the next one probe."""
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        self._probe_in_flight = False
+        if self._opened_at is not None or self._failures >= self.failure_threshold:
+            # (Re)open: a failed half-open probe restarts the reset timer
+            self._opened_at = time.monotonic()
+
+
+class OpenAlexClient:
+    """Must be created and used inside one running event loop (the worker's)."""
+
+    def __init__(
+        self,
+        base_url: str = OPENALEX_BASE_URL,
+        *,
+        timeout: float = OPENALEX_TIMEOUT_SECONDS,
+        max_connections: int = OPENALEX_MAX_CONNECTIONS,
+        max_concurrency: int = OPENALEX_MAX_CONCURRENCY,
+        max_retries: int = OPENALEX_MAX_RETRIES,
+        breaker: CircuitBreaker | None = None,
+    ):
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            headers={"User-Agent": USER_AGENT},
+        )
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.max_retries = max_retries
+        self.breaker = breaker or CircuitBreaker(
+            OPENALEX_BREAKER_FAILURE_THRESHOLD, OPENALEX_BREAKER_RESET_SECONDS
+        )
+        # MAG id -> in-flight lookup task shared by every concurrent caller
+        self._inflight: dict[int, asyncio.Task] = {}
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self.coalesced = 0
+        self.rejected = 0
+
+    async def _get_json(self, path: str, params: dict) -> dict:
+        """GET with bounded concurrency and retries; raises OpenAlexUnavailable on failure."""
+        if not self.breaker.allow():
+            self.rejected += 1
+            raise OpenAlexUnavailable("OpenAlex circuit breaker is open")
+        try:
+            return await self._get_json_attempts(path, params)
+        finally:
+            # Whatever escaped (cancellation, an unexpected error), a half-open probe must not stay
+            # in flight forever; after record_success/record_failure this is a no-op
+            self.breaker.release_probe()
+
+    async def _get_json_attempts(self, path: str, params: dict) -> dict:
+        if OPENALEX_MAILTO:
+            params = {**params, "mailto": OPENALEX_MAILTO}
+        last_error: Exception | None = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self.retries += 1
+                # Full jitter: spreads retries from concurrent callers apart
+                cap = min(_BACKOFF_MAX_SECONDS, _BACKOFF_BASE_SECONDS * 2 ** attempt)
+                await asyncio.sleep(random.uniform(0, cap))
+            self.requests += 1
+            try:
+                async with self._semaphore:
+                    resp = await self._client.get(path, params=params)
+            except (httpx.TransportError, httpx.DecodingError) as e:
+                last_error = e
+                continue
+            if resp.status_code in _RETRY_STATUSES:
+                last_error = httpx.HTTPStatusError(
+                    f"OpenAlex returned {resp.status_code}", request=resp.request, response=resp
+                )
+                continue
+            if resp.status_code != 200:
+                # Not worth retrying (bad filter etc.), but OpenAlex itself is up
+                self.breaker.record_success()
+                raise OpenAlexUnavailable(f"OpenAlex returned {resp.status_code}")
+            try:
+                data = resp.json()
+            except ValueError as e:
+                # Truncated / non-JSON 200 (e.g. a proxy error page): retry like a 5xx
+                last_error = e
+                continue
+            if not isinstance(data, dict):
+                last_error = ValueError(f"OpenAlex returned {type(data).__name__}, expected an object")
+                continue
+            self.breaker.record_success()
+            return data
+        self.failures += 1
+        self.breaker.record_failure()
+        raise OpenAlexUnavailable(f"OpenAlex request failed after {self.max_retries + 1} attempts") from last_error
+
+    async def _request_work(self, mag_id: int) -> dict | None:
+        data = await self._get_json(
+            "/works",
+            {"filter": f"ids.mag:{mag_id}", "select": WORK_FIELDS, "per_page": 1},
+        )
+        results = data.get("results", [])
+        return results[0] if results else None
+
+    async def fetch_work(self, mag_id: int) -> dict | None:
+        """
+        Return the OpenAlex work for a numeric MAG id, or None if OpenAlex has none.
+        Concurrent calls for the same id share one upstream request.
+        """
+        task = self._inflight.get(mag_id)
+        if task is None:
+            task = asyncio.ensure_future(self._request_work(mag_id))
+            self._inflight[mag_id] = task
+
+            def _forget(t: asyncio.Task, key: int = mag_id) -> None:
+                if self._inflight.get(key) is t:
+                    del self._inflight[key]
+
+            task.add_done_callback(_forget)
+        else:
+            self.coalesced += 1
+        # shield: one caller being cancelled must not cancel the lookup for the others
+        return await asyncio.shield(task)
+
+    async def _request_works(self, mag_ids: list[int]) -> dict[int, dict | None]:
+        data = await self._get_json(
+            "/works",
+            {
+                "filter": "ids.mag:" + "|".join(str(m) for m in mag_ids),
+                "select": WORK_FIELDS,
+                "per_page": len(mag_ids),
+            },
+        )
+        found: dict[int, dict | None] = {m: None for m in mag_ids}
+        for work in data.get("results", []):
+            mag = str((work.get("ids") or {}).get("mag") or "")
+            if mag.isdigit() and int(mag) in found:
+                found[int(mag)] = work
+        return found
+
+    async def fetch_works(self, mag_ids: list[int]) -> dict[int, dict | None]:
+        """
+        Look up many numeric MAG ids with multi-id filters (OPENALEX_BATCH_SIZE per request, run
+        concurrently). Ids OpenAlex does not know map to None; ids from failed requests are omitted.
+        """
+        unique = list(dict.fromkeys(mag_ids))
+        chunks = [unique[i:i + OPENALEX_BATCH_SIZE] for i in range(0, len(unique), OPENALEX_BATCH_SIZE)]
+        results = await asyncio.gather(*(self._request_works(c) for c in chunks), return_exceptions=True)
+        works: dict[int, dict | None] = {}
+        for result in results:
+            if isinstance(result, OpenAlexUnavailable):
+                continue
+            if isinstance(result, BaseException):
+                raise result
+            works.update(result)
+        return works
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "failures": self.failures,
+            "coalesced": self.coalesced,
+            "rejected": self.rejected,
+            "in_flight": len(self._inflight),
+            "breaker": self.breaker.state,
+        }
+
+
+_client: OpenAlexClient | None = None
+
+
+def get_client() -> OpenAlexClient:
+    """Process-wide client, created lazily inside the running event loop."""
+    global _client
+    if _client is None:
+        _client = OpenAlexClient()
+    return _client
+
+
+def stats() -> dict | None:
+    """Counters of the shared client, or None if it has not been created in this worker."""
+    return _client.stats() if _client is not None else None
+
+
+async def aclose_client() -> None:
+    """Close the shared client's connection pool (app shutdown)."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
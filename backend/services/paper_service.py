@@ -1,16 +1,14 @@
 """Paper lookup and PDF URL resolution via OpenAlex + arXiv fallback."""
-import json
 import random
-import urllib.request
 from pathlib import Path
 
 import arxiv
-from backend.core.config import MAG_ID_TO_TITLE_PATH
+import numpy as np
+from fastapi.concurrency import run_in_threadpool
 
-# In-memory cache: OpenAlex ID -> title
-_mag_id_to_title: dict[str, str] | None = None
+from backend.services import id_mapping, metadata_store, openalex_cache, openalex_client, title_store
 
-OPENALEX_WORKS_URL = "https://api.openalex.org/works"
+ARXIV_DOI_PREFIX = "https://doi.org/10.48550/arXiv."
 
 
 def _normalize_mag_id(mag_id: str) -> str:
@@ -35,21 +33,30 @@ def _mag_id_to_numeric(mag_id: str) -> str:
     return s
 
 
-def _load_mag_id_to_title() -> dict[str, str]:
-    global _mag_id_to_title
-    if _mag_id_to_title is None:
-        if not MAG_ID_TO_TITLE_PATH.exists():
-            raise FileNotFoundError(f"MAG title mapping not found: {MAG_ID_TO_TITLE_PATH}")
-        with open(MAG_ID_TO_TITLE_PATH, encoding="utf-8") as f:
-            _mag_id_to_title = json.load(f)
-    return _mag_id_to_title
+def parse_mag_id(mag_id: str) -> int | None:
+    """
+    Numeric MAG id of a MAG/OpenAlex id (digits, W..., or OpenAlex URL), or None if it is not
+    numeric or does not fit the int64 ids used by the mappings, caches and SQLite.
+    """
+    numeric = _mag_id_to_numeric(mag_id)
+    if not numeric.isdigit():
+        return None
+    value = int(numeric)
+    return value if value <= id_mapping.INT64_MAX else None
+
+
+def get_title_by_node_id(node_id: int) -> str | None:
+    """Return paper title for a node index from the memory-mapped title store, or None."""
+    return title_store.get_title(node_id)
 
 
 def get_title_by_mag_id(mag_id: str) -> str | None:
-    """Return paper title for a given MAG/OpenAlex id from backend/mag_id_to_title.json, or None."""
-    mapping = _load_mag_id_to_title()
-    key = _normalize_mag_id(mag_id)
-    return mapping.get(key)
+    """Return paper title for a given MAG/OpenAlex id from the title store, or None."""
+    numeric = parse_mag_id(mag_id)
+    if numeric is None:
+        return None
+    node_id = id_mapping.mag_to_node(numeric)
+    return title_store.get_title(node_id) if node_id is not None else None
 
 
 def _abstract_inverted_index_to_text(inverted: dict | None) -> str | None:
@@ -70,53 +77,153 @@ def _abstract_inverted_index_to_text(inverted: dict | None) -> str | None:
     return " ".join(w for (_, w) in pairs)
 
 
-def _fetch_openalex_work_by_mag_id(mag_id: str) -> dict | None:
-    """Query OpenAlex API by MAG id; return first work with doi and abstract_inverted_index selected."""
-    numeric_id = _mag_id_to_numeric(mag_id)
-    if not numeric_id:
+async def _fetch_openalex_work_by_mag_id(mag_id: str) -> dict | None:
+    """
+    Return the OpenAlex work for a MAG id through the two-tier cache, querying OpenAlex (via the
+    shared async client) on a miss. Returns None if OpenAlex has no such work or is unavailable.
+    """
+    # None also for ids beyond int64: SQLite (WorkCache) cannot bind them and no such work exists
+    numeric_id = parse_mag_id(mag_id)
+    if numeric_id is None:
         return None
-    url = f"{OPENALEX_WORKS_URL}?filter=ids.mag:{numeric_id}&select=doi,abstract_inverted_index&per_page=1"
-    req = urllib.request.Request(url, headers={"User-Agent": "AriadneBackend/1.0 (mailto:optional@example.com)"})
+    cache = openalex_cache.get_cache()
+    # The cache's disk tier is SQLite (blocking, up to its busy timeout): off the event loop
+    found, work = await run_in_threadpool(cache.get, numeric_id)
+    if found:
+        return work
     try:
-        with urllib.request.urlopen(req, timeout=15) as resp:
-            data = json.loads(resp.read().decode())
-    except Exception:
+        work = await openalex_client.get_client().fetch_work(numeric_id)
+    except openalex_client.OpenAlexUnavailable:
+        # Transient: not cached
         return None
-    results = data.get("results", [])
-    return results[0] if results else None
+    await run_in_threadpool(cache.put, numeric_id, work)
+    return work
 
 
-def get_doi_for_mag_id(mag_id: str) -> str | None:
+async def get_doi_for_mag_id(mag_id: str) -> str | None:
     """Query OpenAlex API by MAG id to get DOI URL for the work."""
-    work = _fetch_openalex_work_by_mag_id(mag_id)
+    work = await _fetch_openalex_work_by_mag_id(mag_id)
     return work.get("doi") if work else None
 
 
-def get_abstract_for_mag_id(mag_id: str) -> str | None:
+async def get_abstract_for_mag_id(mag_id: str) -> str | None:
     """Query OpenAlex API by MAG id and return abstract as plain text, or None."""
-    work = _fetch_openalex_work_by_mag_id(mag_id)
+    work = await _fetch_openalex_work_by_mag_id(mag_id)
     if not work:
         return None
     inv = work.get("abstract_inverted_index")
     return _abstract_inverted_index_to_text(inv)
 
 
-def get_paper_info_by_mag_id(mag_id: str) -> dict:
-    """Return title (from backend/mag_id_to_title.json), DOI URL, and abstract from OpenAlex."""
+def _info_from_record(normalized: str, title: str | None, record: dict) -> dict:
+    """Paper info from a local metadata record; arXiv papers get their arXiv DOI if no DOI is stored."""
+    doi_url = record.get("doi")
+    if not doi_url and record.get("arxiv_id"):
+        doi_url = f"{ARXIV_DOI_PREFIX}{record['arxiv_id']}"
+    return {
+        "mag_id": normalized,
+        "title": title or record.get("title"),
+        "doi_url": doi_url,
+        "abstract": record.get("abstract"),
+    }
+
+
+def _local_info(mag_id: str) -> tuple[str | None, dict | None]:
+    """Title-store title and metadata-store record (blocking reads: call from a threadpool)."""
+    numeric_id = parse_mag_id(mag_id)
+    record = metadata_store.get_by_mag_id(numeric_id) if numeric_id is not None else None
+    return get_title_by_mag_id(mag_id), record
+
+
+async def get_paper_info_by_mag_id(mag_id: str) -> dict:
+    """
+    Return title (from the title store), DOI URL, and abstract. Reads the local metadata store
+    first and only falls back to OpenAlex for papers it does not have.
+    """
     normalized = _normalize_mag_id(mag_id)
-    title = get_title_by_mag_id(mag_id)
-    work = _fetch_openalex_work_by_mag_id(mag_id)
+    title, record = await run_in_threadpool(_local_info, mag_id)
+    if record is not None:
+        return _info_from_record(normalized, title, record)
+    work = await _fetch_openalex_work_by_mag_id(mag_id)
     doi_url = work.get("doi") if work else None
     abstract = _abstract_inverted_index_to_text(work.get("abstract_inverted_index")) if work else None
     return {"mag_id": normalized, "title": title, "doi_url": doi_url, "abstract": abstract}
 
 
+def _local_info_batch(valid: list[int]) -> tuple[dict, dict, dict, list[int]]:
+    """
+    (titles, records, works, missing) for numeric MAG ids: titles and metadata records by id, cached
+    OpenAlex works for the ids without a record, and the ids still to fetch. Blocking.
+    """
+    nodes = id_mapping.mags_to_nodes(valid)
+    titles = dict(zip(valid, title_store.get_titles(nodes)))
+    by_node = metadata_store.get_many_by_nodes(nodes)
+    records = {mag: by_node[node] for mag, node in zip(valid, nodes.tolist()) if node in by_node}
+
+    cache = openalex_cache.get_cache()
+    works: dict[int, dict | None] = {}
+    missing: list[int] = []
+    for numeric in dict.fromkeys(m for m in valid if m not in records):
+        found, work = cache.get(numeric)
+        if found:
+            works[numeric] = work
+        else:
+            missing.append(numeric)
+    return titles, records, works, missing
+
+
+def _cache_works(works: dict[int, dict | None]) -> None:
+    cache = openalex_cache.get_cache()
+    for numeric, work in works.items():
+        cache.put(numeric, work)
+
+
+async def get_paper_info_batch(mag_ids: list[str]) -> dict[str, dict]:
+    """
+    Paper info for many MAG ids, keyed by the id as given. Titles come from the title store in one
+    bulk lookup. Papers in the local metadata store are answered from it; for the rest DOI and
+    abstract come from the cache, and the misses from as few multi-id OpenAlex requests as possible.
+    """
+    # None for ids that are not numeric or do not fit int64 (they would overflow the lookups)
+    keys = [parse_mag_id(m) for m in mag_ids]
+    valid = [k for k in keys if k is not None]
+    # Title store, metadata store and the cache's SQLite tier all block: one trip to the threadpool
+    titles, records, works, missing = await run_in_threadpool(_local_info_batch, valid)
+    if missing:
+        try:
+            fetched = await openalex_client.get_client().fetch_works(missing)
+        except openalex_client.OpenAlexUnavailable:
+            fetched = {}
+        # Only ids OpenAlex actually answered for; failed chunks are left uncached
+        await run_in_threadpool(_cache_works, fetched)
+        works.update(fetched)
+
+    results: dict[str, dict] = {}
+    for mag_id, key in zip(mag_ids, keys):
+        if key in records:
+            results[mag_id] = _info_from_record(_normalize_mag_id(mag_id), titles.get(key), records[key])
+            continue
+        work = works.get(key) if key is not None else None
+        results[mag_id] = {
+            "mag_id": _normalize_mag_id(mag_id),
+            "title": titles.get(key) if key is not None else None,
+            "doi_url": work.get("doi") if work else None,
+            "abstract": _abstract_inverted_index_to_text(work.get("abstract_inverted_index")) if work else None,
+        }
+    return results
+
+
 def get_random_papers(n: int = 50) -> list[dict]:
-    """Return n random papers (mag_id, title) from the mapping. For 'For You' placeholder."""
-    mapping = _load_mag_id_to_title()
-    keys = list(mapping.keys())
-    if n >= len(keys):
-        chosen = keys
+    """Return n random papers (mag_id, title) that have a title. For 'For You' placeholder."""
+    titled = np.flatnonzero(title_store.has_title_mask())
+    if n >= len(titled):
+        chosen = titled.tolist()
     else:
-        chosen = random.sample(keys, n)
-    return [{"mag_id": k, "title": mapping[k]} for k in chosen]
\ No newline at end of file
+        chosen = random.sample(titled.tolist(), n)
+    mags = id_mapping.nodes_to_mags(chosen)
+    titles = title_store.get_titles(chosen)
+    return [
+        {"mag_id": f"https://openalex.org/W{m}", "title": t}
+        for m, t in zip(mags.tolist(), titles)
+        if m != id_mapping.MISSING
+    ]
\ No newline at end of file
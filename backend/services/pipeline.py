@@ -0,0 +1,255 @@
+"""
+Background processing of uploaded PDFs: a bounded job queue in front of a process pool running
+services/pipeline_worker.py (text extraction, Qwen embedding, GNN embedding, nearest papers).
+
+The API process only records jobs and hands them to the pool; models are loaded and run in the
+worker processes, never on the event loop or the request threadpool. Job rows live in SQLite
+(PIPELINE_JOBS_DB_PATH) so every API worker can report status, and identical submissions
+(same PDF hash and citations) reuse the existing job.
+"""
+import importlib.util
+import json
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+from backend.core.config import PIPELINE_JOBS_DB_PATH, PIPELINE_MAX_PENDING, PIPELINE_WORKERS
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pipeline_jobs (
+    job_id TEXT PRIMARY KEY,
+    sha256 TEXT NOT NULL,          -- content hash of the uploaded PDF (services/upload_store.py)
+    citations TEXT NOT NULL,       -- JSON list of MAG ids supplied with the upload, sorted
+    status TEXT NOT NULL,          -- queued | running | done | failed
+    stage TEXT,                    -- current / last pipeline stage
+    result TEXT,                   -- JSON, once done
+    error TEXT,
+    owner_pid INTEGER NOT NULL,    -- API worker whose pool runs the job
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS pipeline_jobs_input ON pipeline_jobs (sha256, citations);
+"""
+
+
+class QueueFull(Exception):
+    """PIPELINE_MAX_PENDING jobs are already queued or running in this API worker."""
+
+
+class PipelineUnavailable(Exception):
+    """The worker's dependencies (torch, torch_geometric, ...) are not installed in this environment."""
+
+
+# Top-level modules pipeline_worker.init_worker and run_job import; checked once by start()
+_WORKER_MODULES = ("torch", "torch_geometric", "ogb", "sentence_transformers", "pypdf")
+
+
+_local = threading.local()
+
+_executor: ProcessPoolExecutor | None = None
+_inflight: dict[str, Future] = {}
+_lock = threading.Lock()
+_stats = {"submitted": 0, "reused": 0, "rejected": 0, "unavailable": 0, "done": 0, "failed": 0}
+_missing_modules: list[str] = []
+
+
+def _connect() -> sqlite3.Connection:
+    """Per-thread connection (also used from the pool's worker processes)."""
+    conn = getattr(_local, "conn", None)
+    if conn is None or getattr(_local, "pid", None) != os.getpid():
+        PIPELINE_JOBS_DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(PIPELINE_JOBS_DB_PATH, timeout=5.0)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        _local.conn = conn
+        _local.pid = os.getpid()
+    return conn
+
+
+def _update(job_id: str, **fields) -> None:
+    fields["updated_at"] = time.time()
+    assignments = ", ".join(f"{name} = ?" for name in fields)
+    conn = _connect()
+    with conn:
+        conn.execute(f"UPDATE pipeline_jobs SET {assignments} WHERE job_id = ?", (*fields.values(), job_id))
+
+
+def set_stage(job_id: str, stage: str) -> None:
+    """Called by the worker process as it moves through the pipeline."""
+    _update(job_id, status=RUNNING, stage=stage)
+
+
+def _row_to_job(row: sqlite3.Row) -> dict:
+    return {
+        "job_id": row["job_id"],
+        "sha256": row["sha256"],
+        "citations": json.loads(row["citations"]),
+        "status": row["status"],
+        "stage": row["stage"],
+        "error": row["error"],
+        "created_at": row["created_at"],
+        "updated_at": row["updated_at"],
+    }
+
+
+def get_job(job_id: str) -> dict | None:
+    """Job status (without the result), or None if unknown."""
+    row = _connect().execute("SELECT * FROM pipeline_jobs WHERE job_id = ?", (job_id,)).fetchone()
+    return _row_to_job(row) if row is not None else None
+
+
+def get_result(job_id: str) -> dict | None:
+    """Result of a finished job, or None if the job is unknown or not done."""
+    row = _connect().execute(
+        "SELECT result FROM pipeline_jobs WHERE job_id = ? AND status = ?", (job_id, DONE)
+    ).fetchone()
+    return json.loads(row["result"]) if row is not None else None
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        from backend.services import pipeline_worker
+
+        # spawn: the API process has threads (and torch does not survive fork well)
+        _executor = ProcessPoolExecutor(
+            max_workers=PIPELINE_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=pipeline_worker.init_worker,
+        )
+    return _executor
+
+
+def _on_done(job_id: str, future: Future) -> None:
+    global _executor
+    with _lock:
+        _inflight.pop(job_id, None)
+    if future.cancelled():
+        _update(job_id, status=FAILED, error="cancelled (server shutting down)")
+        with _lock:
+            _stats["failed"] += 1
+        return
+    error = future.exception()
+    if isinstance(error, BrokenProcessPool):
+        # A worker died (e.g. out of memory); the pool cannot take new work, so the next submit starts a fresh one
+        with _lock:
+            _executor = None
+    if error is not None:
+        _update(job_id, status=FAILED, error=f"{type(error).__name__}: {error}")
+        with _lock:
+            _stats["failed"] += 1
+        return
+    _update(job_id, status=DONE, stage=None, result=json.dumps(future.result()))
+    with _lock:
+        _stats["done"] += 1
+
+
+def available() -> bool:
+    """False if start() found worker dependencies missing; jobs would only fail in the pool."""
+    return not _missing_modules
+
+
+def submit(sha256: str, pdf_path: Path, citation_mag_ids: list[int]) -> dict:
+    """
+    Queue the pipeline for a stored PDF and return the job. A queued, running or finished job for
+    the same PDF and citations is returned instead of starting another. Raises QueueFull, or
+    PipelineUnavailable if the worker's dependencies are missing.
+    """
+    from backend.services import pipeline_worker
+
+    citations = json.dumps(sorted(set(int(m) for m in citation_mag_ids)))
+    conn = _connect()
+    row = conn.execute(
+        "SELECT * FROM pipeline_jobs WHERE sha256 = ? AND citations = ? AND status != ?"
+        " ORDER BY created_at DESC LIMIT 1",
+        (sha256, citations, FAILED),
+    ).fetchone()
+    if row is not None:
+        with _lock:
+            _stats["reused"] += 1
+        return _row_to_job(row)
+
+    with _lock:
+        if _missing_modules:
+            _stats["unavailable"] += 1
+            raise PipelineUnavailable(f"missing modules: {', '.join(_missing_modules)}")
+        if len(_inflight) >= PIPELINE_MAX_PENDING:
+            _stats["rejected"] += 1
+            raise QueueFull(f"{len(_inflight)} jobs pending")
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with conn:
+            conn.execute(
+                "INSERT INTO pipeline_jobs (job_id, sha256, citations, status, owner_pid, created_at, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, sha256, citations, QUEUED, os.getpid(), now, now),
+            )
+        future = _get_executor().submit(pipeline_worker.run_job, job_id, str(pdf_path), json.loads(citations))
+        _inflight[job_id] = future
+        _stats["submitted"] += 1
+    future.add_done_callback(lambda f, job_id=job_id: _on_done(job_id, f))
+    return get_job(job_id)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def start() -> None:
+    """
+    Check once that the worker's dependencies are importable (see available()), and fail jobs
+    left queued/running by API workers that no longer exist (e.g. before a restart).
+    """
+    _missing_modules[:] = [name for name in _WORKER_MODULES if importlib.util.find_spec(name) is None]
+    if _missing_modules:
+        print(
+            f"⚠️  Upload pipeline disabled, missing modules: {', '.join(_missing_modules)}"
+            " (install backend/requirements.txt)"
+        )
+    conn = _connect()
+    rows = conn.execute(
+        "SELECT job_id, owner_pid FROM pipeline_jobs WHERE status IN (?, ?)", (QUEUED, RUNNING)
+    ).fetchall()
+    for row in rows:
+        if row["owner_pid"] != os.getpid() and not _pid_alive(row["owner_pid"]):
+            _update(row["job_id"], status=FAILED, error="interrupted (server restarted); upload again")
+
+
+def stop() -> None:
+    """Cancel queued jobs and shut the pool down without waiting for running ones."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def stats() -> dict:
+    with _lock:
+        counters = dict(_stats)
+        pending = len(_inflight)
+    return {
+        **counters,
+        "available": available(),
+        "pending": pending,
+        "max_pending": PIPELINE_MAX_PENDING,
+        "workers": PIPELINE_WORKERS,
+    }
@@ -0,0 +1,191 @@
+"""
+Runs inside the pipeline's worker processes (see services/pipeline.py): uploaded PDF -> text ->
+Qwen semantic embedding (ml_pipeline/src/hf_embed.py) -> GNN embedding from the papers it cites
+(ml_pipeline/src/gnn_embed_new.endpoint) -> nearest papers in the backend's embedding space.
+
+Importing this module is cheap; torch, the models and the citation graph are loaded by
+init_worker, once per worker process.
+"""
+import os
+import re
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+
+from backend.core.config import ML_PIPELINE_DIR, PIPELINE_NEIGHBOURS, PIPELINE_NODE_QWEN_EMBEDDINGS_PATH, PIPELINE_WORKERS
+from backend.services import ann_index, embedding_store, id_mapping, pipeline, title_store
+
+QWEN_DIM = 256
+# Text sent to the semantic model: "title. abstract", as in qwen_embed.generate_qwen_embeddings
+_MAX_ABSTRACT_CHARS = 3000
+# Shorter titles match too much ordinary reference text
+_MIN_TITLE_WORDS = 4
+
+_ABSTRACT_RE = re.compile(
+    r"\babstract\b[\s.:—-]*(.+?)(?:\n\s*(?:1|I)?\.?\s*introduction\b|\Z)", re.IGNORECASE | re.DOTALL
+)
+_REFERENCES_RE = re.compile(r"\n\s*(?:references|bibliography)\s*\n", re.IGNORECASE)
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+# Set by init_worker
+_hf_embed = None
+_gnn = None
+_graph = None
+_index = None
+# Normalized title ("word word ...") -> node index, and the word counts that occur
+_title_index: dict[str, int] = {}
+_title_lengths: list[int] = []
+
+
+def _words(text: str) -> list[str]:
+    return _WORD_RE.findall(text.lower())
+
+
+def _load_graph():
+    """ogbn-arxiv citation graph with the GNN's input features: 128 original + 256 Qwen per node."""
+    import torch
+    from torch_geometric.data import Data
+    from src.data_loader import unsafe_load_ogbn_arxiv
+
+    graph_dict, _ = unsafe_load_ogbn_arxiv()[0]
+    x = torch.tensor(graph_dict["node_feat"], dtype=torch.float)
+    if PIPELINE_NODE_QWEN_EMBEDDINGS_PATH.exists():
+        qwen = torch.load(PIPELINE_NODE_QWEN_EMBEDDINGS_PATH, map_location="cpu").float()
+    else:
+        print(f"⚠️  {PIPELINE_NODE_QWEN_EMBEDDINGS_PATH} not found; GNN runs with zero Qwen features")
+        qwen = torch.zeros(x.shape[0], QWEN_DIM)
+    return Data(
+        x=torch.cat([x, qwen], dim=1),
+        edge_index=torch.tensor(graph_dict["edge_index"], dtype=torch.long),
+        num_nodes=graph_dict["num_nodes"],
+    )
+
+
+def _build_title_index() -> None:
+    global _title_lengths
+    num_nodes = title_store.num_nodes()
+    for node_id, title in enumerate(title_store.get_titles(np.arange(num_nodes))):
+        if title:
+            words = _words(title)
+            if len(words) >= _MIN_TITLE_WORDS:
+                _title_index.setdefault(" ".join(words), node_id)
+    _title_lengths = sorted({key.count(" ") + 1 for key in _title_index})
+
+
+def init_worker() -> None:
+    """Process-pool initializer: load models, graph, title index and search index once."""
+    global _hf_embed, _gnn, _graph, _index
+    start = time.perf_counter()
+    # ml_pipeline modules import each other as `src.*`
+    sys.path.insert(0, str(ML_PIPELINE_DIR))
+    from src import gnn_embed_new, hf_embed, model_registry
+
+    _hf_embed, _gnn = hf_embed, gnn_embed_new
+    # PIPELINE_WORKERS processes share the machine: split the cores rather than oversubscribe them
+    model_registry.configure_threads(max(1, (os.cpu_count() or 1) // PIPELINE_WORKERS))
+    models = model_registry.warmup(["qwen", "gnn"])["models"]
+    # CSR index of the citation graph, built once; endpoint() samples neighbourhoods from it
+    _graph = gnn_embed_new.prepare_graph(_load_graph())
+    _build_title_index()
+    embeddings = embedding_store.get_embeddings()
+    num_nodes = embeddings.shape[0]
+    has_mag = id_mapping.nodes_to_mags(np.arange(num_nodes)) != id_mapping.MISSING
+    has_title = np.zeros(num_nodes, dtype=bool)
+    mask = title_store.has_title_mask()[:num_nodes]
+    has_title[:len(mask)] = mask
+    _index = ann_index.ExactIndex(embeddings, ids=np.flatnonzero(has_mag & has_title))
+    loads = ", ".join(f"{name} {m['load_s']}s/{m['rss_delta_mb']} MB" for name, m in models.items())
+    print(f"✅ Pipeline worker {os.getpid()} ready in {time.perf_counter() - start:.1f}s ({loads})")
+
+
+def extract_text(pdf_path: Path) -> dict:
+    """Title (first line), abstract and references section of a PDF."""
+    from pypdf import PdfReader
+
+    reader = PdfReader(pdf_path)
+    pages = [page.extract_text() or "" for page in reader.pages]
+    text = "\n".join(pages)
+    if not text.strip():
+        raise ValueError("No extractable text in PDF (scanned document?)")
+
+    first_lines = [line.strip() for line in pages[0].splitlines() if line.strip()] if pages else []
+    title = first_lines[0][:300] if first_lines else ""
+    match = _ABSTRACT_RE.search(text)
+    abstract = match.group(1) if match else text[len(title):]
+    abstract = " ".join(abstract.split())[:_MAX_ABSTRACT_CHARS]
+    # The last "References" heading, in case the word also appears in the body
+    ref_starts = [m.end() for m in _REFERENCES_RE.finditer(text)]
+    references = text[ref_starts[-1]:] if ref_starts else ""
+    return {"title": title, "abstract": abstract, "references": references, "num_pages": len(pages)}
+
+
+def resolve_citations(references: str) -> list[int]:
+    """Node indices of graph papers whose exact (normalized) title appears in the references text."""
+    words = _words(references)
+    found: dict[int, None] = {}
+    for i in range(len(words)):
+        for length in _title_lengths:
+            if i + length > len(words):
+                break
+            node_id = _title_index.get(" ".join(words[i:i + length]))
+            if node_id is not None:
+                found[node_id] = None
+    return list(found)
+
+
+@contextmanager
+def _stage(job_id: str, name: str, timings: dict):
+    pipeline.set_stage(job_id, name)
+    start = time.perf_counter()
+    yield
+    timings[name] = round((time.perf_counter() - start) * 1000, 1)
+
+
+def _paper(node_id: int, score: float | None = None) -> dict:
+    mag = id_mapping.node_to_mag(node_id)
+    paper = {"mag_id": f"https://openalex.org/W{mag}" if mag is not None else None, "title": title_store.get_title(node_id)}
+    if score is not None:
+        paper["score"] = score
+    return paper
+
+
+def run_job(job_id: str, pdf_path: str, citation_mag_ids: list[int]) -> dict:
+    """Run the whole pipeline for one PDF; the return value is stored as the job result."""
+    timings: dict[str, float] = {}
+    with _stage(job_id, "extract_text", timings):
+        doc = extract_text(Path(pdf_path))
+
+    with _stage(job_id, "semantic_embedding", timings):
+        text = f"{doc['title']}. {doc['abstract']}"
+        semantic = np.asarray(_hf_embed.get_semantic_embed(text, truncate_dim=QWEN_DIM), dtype=np.float32)
+
+    with _stage(job_id, "citations", timings):
+        cited = resolve_citations(doc["references"])
+        supplied = id_mapping.mags_to_nodes(np.asarray(citation_mag_ids, dtype=np.int64)).tolist()
+        cited = list(dict.fromkeys(cited + [n for n in supplied if n != id_mapping.MISSING]))
+
+    result = {
+        "title": doc["title"],
+        "abstract": doc["abstract"],
+        "num_pages": doc["num_pages"],
+        "semantic_embedding": semantic.tolist(),
+        "citations": [_paper(n) for n in cited],
+        "gnn_embedding": None,
+        "neighbours": [],
+        "timings_ms": timings,
+    }
+    if not cited:
+        result["warning"] = "No cited papers found in the citation graph; upload again with citation MAG ids"
+        return result
+
+    with _stage(job_id, "gnn_embedding", timings):
+        gnn = _gnn.endpoint(_graph, cited).detach().cpu().numpy().astype(np.float32)
+    with _stage(job_id, "neighbours", timings):
+        query = gnn / np.linalg.norm(gnn)
+        ids, scores = _index.search(query, PIPELINE_NEIGHBOURS, exclude=set(cited))
+    result["gnn_embedding"] = gnn.tolist()
+    result["neighbours"] = [_paper(n, s) for n, s in zip(ids.tolist(), scores.tolist())]
+    return result
@@ -0,0 +1,106 @@
+"""Memory-mapped paper titles keyed by node index: an int64 offsets array plus one UTF-8 blob."""
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+from backend.core.config import MAG_ID_TO_TITLE_PATH, TITLE_BLOB_PATH, TITLE_OFFSETS_PATH
+from backend.services import id_mapping
+
+# offsets[i]:offsets[i + 1] is node i's title in _blob; equal offsets mean no title
+_offsets: np.ndarray | None = None
+_blob: np.ndarray | None = None
+
+
+def _mag_url_to_int(key: str) -> int:
+    """'https://openalex.org/W123' / 'W123' / '123' -> 123; -1 if not numeric."""
+    s = key.strip().rsplit("/", 1)[-1]
+    if s.startswith("W"):
+        s = s[1:]
+    return int(s) if s.isdigit() else id_mapping.MISSING
+
+
+def build_title_store(json_path: Path | None = None) -> tuple[int, int]:
+    """
+    Convert mag_id_to_title.json (OpenAlex URL -> title) into TITLE_OFFSETS_PATH + TITLE_BLOB_PATH.
+    Titles whose MAG id has no node index are dropped. Returns (num_nodes, num_titles).
+    """
+    json_path = json_path or MAG_ID_TO_TITLE_PATH
+    if not json_path.exists():
+        raise FileNotFoundError(f"MAG title mapping not found: {json_path}")
+    with open(json_path, encoding="utf-8") as f:
+        mapping: dict[str, str] = json.load(f)
+
+    mags = np.fromiter((_mag_url_to_int(k) for k in mapping), dtype=np.int64, count=len(mapping))
+    nodes = id_mapping.mags_to_nodes(mags)
+    num_nodes = len(id_mapping.node_to_mag_array())
+    encoded: list[bytes] = [b""] * num_nodes
+    for node_id, title in zip(nodes.tolist(), mapping.values()):
+        if node_id != id_mapping.MISSING and title:
+            encoded[node_id] = str(title).encode("utf-8")
+
+    offsets = np.zeros(num_nodes + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+
+    blob_tmp = TITLE_BLOB_PATH.with_name(f"{TITLE_BLOB_PATH.name}.{os.getpid()}.tmp")
+    with open(blob_tmp, "wb") as f:
+        f.write(b"".join(encoded))
+    offsets_tmp = TITLE_OFFSETS_PATH.with_name(f"{TITLE_OFFSETS_PATH.name}.{os.getpid()}.tmp")
+    with open(offsets_tmp, "wb") as f:
+        np.save(f, offsets)
+    # Blob first: a reader that sees the new offsets must also see the new blob
+    os.replace(blob_tmp, TITLE_BLOB_PATH)
+    os.replace(offsets_tmp, TITLE_OFFSETS_PATH)
+    return num_nodes, int((np.diff(offsets) > 0).sum())
+
+
+def _load() -> None:
+    """Memory-map offsets and blob, building them from the JSON mapping on first run."""
+    global _offsets, _blob
+    if _offsets is not None:
+        return
+    if not (TITLE_OFFSETS_PATH.exists() and TITLE_BLOB_PATH.exists()):
+        build_title_store()
+    if TITLE_BLOB_PATH.stat().st_size:
+        _blob = np.memmap(TITLE_BLOB_PATH, dtype=np.uint8, mode="r")
+    else:
+        _blob = np.zeros(0, dtype=np.uint8)  # np.memmap cannot map an empty file
+    _offsets = np.load(TITLE_OFFSETS_PATH, mmap_mode="r")
+
+
+def num_nodes() -> int:
+    _load()
+    return len(_offsets) - 1
+
+
+def has_title_mask() -> np.ndarray:
+    """Boolean array, shape (num_nodes,): True where the node has a non-empty title."""
+    _load()
+    return np.diff(_offsets) > 0
+
+
+def get_title(node_id: int) -> str | None:
+    """Title of one node in O(1), or None."""
+    _load()
+    node_id = int(node_id)
+    if not 0 <= node_id < len(_offsets) - 1:
+        return None
+    start, end = int(_offsets[node_id]), int(_offsets[node_id + 1])
+    if start == end:
+        return None
+    return _blob[start:end].tobytes().decode("utf-8")
+
+
+def get_titles(node_ids) -> list[str | None]:
+    """Titles for many nodes; offsets are gathered in one vectorized step."""
+    _load()
+    nodes = np.asarray(node_ids, dtype=np.int64)
+    valid = (nodes >= 0) & (nodes < len(_offsets) - 1)
+    safe = np.where(valid, nodes, 0)
+    starts = np.where(valid, _offsets[safe], 0)
+    ends = np.where(valid, _offsets[safe + 1], 0)
+    return [
+        _blob[s:e].tobytes().decode("utf-8") if e > s else None
+        for s, e in zip(starts.tolist(), ends.tolist())
+    ]
@@ -0,0 +1,55 @@
+"""Content-addressed PDF storage: uploads are streamed to disk in chunks, hashed on the way, stored as <sha256>.pdf."""
+import hashlib
+import os
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO
+
+from backend.core.config import UPLOAD_CHUNK_BYTES, UPLOAD_DIR, UPLOAD_MAX_BYTES
+
+
+class UploadTooLarge(Exception):
+    """The upload exceeded UPLOAD_MAX_BYTES; nothing was stored."""
+
+
+@dataclass(frozen=True)
+class StoredUpload:
+    sha256: str
+    path: Path
+    size: int
+    duplicate: bool  # an identical file was already stored; the new copy was discarded
+
+
+def path_for(sha256: str) -> Path:
+    return UPLOAD_DIR / f"{sha256}.pdf"
+
+
+def store(src: BinaryIO, max_bytes: int = UPLOAD_MAX_BYTES) -> StoredUpload:
+    """
+    Copy src to the store in UPLOAD_CHUNK_BYTES chunks, hashing as it goes. Blocking: call it off
+    the event loop. Raises UploadTooLarge (and removes the partial file) past max_bytes.
+    """
+    UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = UPLOAD_DIR / f".{uuid.uuid4().hex}.part"
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with tmp.open("wb") as out:
+            while chunk := src.read(UPLOAD_CHUNK_BYTES):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge(f"Upload exceeds {max_bytes} bytes")
+                digest.update(chunk)
+                out.write(chunk)
+        sha256 = digest.hexdigest()
+        dest = path_for(sha256)
+        if dest.exists():
+            tmp.unlink()
+            return StoredUpload(sha256, dest, size, duplicate=True)
+        # Atomic: concurrent uploads of the same file both end with one complete copy
+        os.replace(tmp, dest)
+        return StoredUpload(sha256, dest, size, duplicate=False)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
@@ -0,0 +1,48 @@
+"""Shared fixtures: services are pointed at files under tmp_path instead of backend/ and backend/data/."""
+import json
+
+import numpy as np
+import pytest
+
+from backend.services import id_mapping
+
+# node index -> MAG id of the small graph the fixtures build
+NODE_TO_MAG = {0: 1001, 1: 1002, 2: 1003, 4: 1005, 5: 2**62}
+
+
+@pytest.fixture
+def mapping(tmp_path, monkeypatch):
+    """id_mapping over NODE_TO_MAG, converted from legacy pickled dicts in tmp_path on first use."""
+    node_to_mag_path = tmp_path / "node_to_mag_id.npy"
+    mag_to_node_path = tmp_path / "mag_to_node_idx.npy"
+    np.save(node_to_mag_path, NODE_TO_MAG, allow_pickle=True)
+    np.save(mag_to_node_path, {mag: node for node, mag in NODE_TO_MAG.items()}, allow_pickle=True)
+    monkeypatch.setattr(id_mapping, "NODE_TO_MAG_ID_PATH", node_to_mag_path)
+    monkeypatch.setattr(id_mapping, "MAG_TO_NODE_IDX_PATH", mag_to_node_path)
+    monkeypatch.setattr(id_mapping, "NODE_TO_MAG_ARRAY_PATH", tmp_path / "node_to_mag.i64.npy")
+    monkeypatch.setattr(id_mapping, "MAG_SORTED_PATH", tmp_path / "mag_sorted.i64.npy")
+    monkeypatch.setattr(id_mapping, "MAG_SORTED_NODE_PATH", tmp_path / "mag_sorted_node.i64.npy")
+    for name in ("_node_to_mag", "_mag_sorted", "_mag_sorted_node"):
+        monkeypatch.setattr(id_mapping, name, None)
+    return id_mapping
+
+
+@pytest.fixture
+def titles(mapping, tmp_path, monkeypatch):
+    """title_store over a mag_id_to_title.json in tmp_path (node 1 and node 3 have no title)."""
+    from backend.services import title_store
+
+    json_path = tmp_path / "mag_id_to_title.json"
+    json_path.write_text(json.dumps({
+        "https://openalex.org/W1001": "Graph Attention Networks",
+        "W1003": "Ünïcode — títle",
+        "1005": "",
+        "https://openalex.org/W999": "No node for this one",
+        "https://openalex.org/W4611686018427387904": "Large id",
+    }), encoding="utf-8")
+    monkeypatch.setattr(title_store, "MAG_ID_TO_TITLE_PATH", json_path)
+    monkeypatch.setattr(title_store, "TITLE_OFFSETS_PATH", tmp_path / "titles.offsets.i64.npy")
+    monkeypatch.setattr(title_store, "TITLE_BLOB_PATH", tmp_path / "titles.utf8.bin")
+    monkeypatch.setattr(title_store, "_offsets", None)
+    monkeypatch.setattr(title_store, "_blob", None)
+    return title_store
@@ -0,0 +1,108 @@
+import time
+
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.core.cache import TTLCache
+from backend.routers import papers
+from backend.services import history_store, title_store
+
+NUM_NODES = 600
+# Nodes without a MAG id or title: never served
+UNSERVABLE = {3, 10, 11, 500}
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    rng = np.random.default_rng(0)
+    embeddings = rng.standard_normal((NUM_NODES, 16)).astype(np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    servable = np.array([i for i in range(NUM_NODES) if i not in UNSERVABLE], dtype=np.int64)
+
+    monkeypatch.setattr(papers, "_load_embeddings", lambda: embeddings)
+    monkeypatch.setattr(papers, "_servable_nodes", servable)
+    monkeypatch.setattr(papers, "_index", None)
+    monkeypatch.setattr(papers, "_cold_start", None)
+    monkeypatch.setattr(papers, "_feed_cache", TTLCache(100, 600))
+    monkeypatch.setattr(papers, "FEED_MAX_CANDIDATES", 200)
+    monkeypatch.setattr(papers, "ANN_INDEX_DIR", tmp_path / "ann_index")
+    monkeypatch.setattr(papers, "_node_id_to_mag_id_url", lambda node: f"https://openalex.org/W{node}")
+    monkeypatch.setattr(title_store, "get_titles", lambda nodes: [f"Paper {n}" for n in nodes])
+    # The bearer token is the user id; user-a has clicked nodes 1 and 2
+    monkeypatch.setattr(papers, "get_sub_from_token", lambda credentials: credentials.credentials)
+    monkeypatch.setattr(history_store, "get_node_history", lambda sub: {"user-a": ["1", "2"]}.get(sub, []))
+
+    app = FastAPI()
+    app.include_router(papers.router)
+    yield TestClient(app)
+    if papers._index is not None:
+        papers._index.close()
+
+
+def _all_pages(client, n, headers=None):
+    """Mag ids of the whole feed, and the cursor of every page after the first."""
+    items, cursors, cursor = [], [], None
+    while True:
+        params = {"n": n} if cursor is None else {"n": n, "cursor": cursor}
+        response = client.get("/api/papers/for-you", params=params, headers=headers)
+        assert response.status_code == 200
+        body = response.json()
+        items += [p["mag_id"] for p in body["papers"]]
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return items, cursors
+        cursors.append(cursor)
+
+
+@pytest.mark.parametrize("headers", [None, {"Authorization": "Bearer user-a"}])
+def test_pages_have_no_duplicates(client, headers):
+    items, _ = _all_pages(client, 37, headers)
+    assert len(items) == len(set(items))
+    served = {int(m.rsplit("W", 1)[1]) for m in items}
+    assert not served & UNSERVABLE
+    if headers:
+        assert not served & {1, 2}  # the history itself is never recommended
+    # 200 similar + 15 random per block of 35 similar
+    assert len(items) == 200 + -(-200 // 35) * 15
+
+
+def test_any_worker_serves_the_next_page(client):
+    """The cursor alone determines its page: a worker without the cached ranking serves the same one."""
+    headers = {"Authorization": "Bearer user-a"}
+    items, cursors = _all_pages(client, 50, headers)
+    refetched = items[:50]
+    for cursor in cursors:
+        papers._feed_cache.clear()
+        body = client.get("/api/papers/for-you", params={"n": 50, "cursor": cursor}, headers=headers).json()
+        refetched += [p["mag_id"] for p in body["papers"]]
+    assert refetched == items
+
+
+def test_bad_cursor_is_rejected(client):
+    first = client.get("/api/papers/for-you", params={"n": 10}).json()["next_cursor"]
+    position = papers._decode_cursor(first)
+    bad = [
+        "not a cursor!",
+        papers._encode_cursor(position)[:-3],
+        papers._encode_cursor(position._replace(offset=-5)),
+        papers._encode_cursor(position._replace(history=("1", "x"))),
+        papers._encode_cursor(position._replace(history=("1",) * 50)),
+    ]
+    for cursor in bad:
+        assert client.get("/api/papers/for-you", params={"cursor": cursor}).status_code == 400, cursor
+
+
+def test_cursor_is_bound_to_its_user(client):
+    cursor = client.get("/api/papers/for-you", params={"n": 10}).json()["next_cursor"]
+    response = client.get("/api/papers/for-you", params={"cursor": cursor}, headers={"Authorization": "Bearer user-a"})
+    assert response.status_code == 400
+
+
+def test_expired_cursor_is_gone(client):
+    cursor = client.get("/api/papers/for-you", params={"n": 10}).json()["next_cursor"]
+    position = papers._decode_cursor(cursor)
+    expired = position._replace(issued_at=int(time.time() - papers.FEED_SESSION_TTL_SECONDS - 5))
+    response = client.get("/api/papers/for-you", params={"cursor": papers._encode_cursor(expired)})
+    assert response.status_code == 410
@@ -0,0 +1,104 @@
+import threading
+import time
+
+import pytest
+
+from backend.services import auth0_storage, history_store
+
+
+def _wait_for(condition, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not reached in time")
+        time.sleep(0.01)
+
+
+class FakeAuth0:
+    """fetch/set_node_history against a dict; set fails while fail_next > 0."""
+
+    def __init__(self):
+        self.stored: dict[str, list[str]] = {}
+        self.patches: list[tuple[str, list[str]]] = []
+        self.fail_next = 0
+        self.lock = threading.Lock()
+
+    def fetch_node_history(self, user_id):
+        return list(self.stored.get(user_id, []))
+
+    def set_node_history(self, user_id, history):
+        with self.lock:
+            if self.fail_next:
+                self.fail_next -= 1
+                raise RuntimeError("Auth0 unavailable")
+            self.patches.append((user_id, list(history)))
+            self.stored[user_id] = list(history)
+
+
+@pytest.fixture
+def auth0(tmp_path, monkeypatch):
+    fake = FakeAuth0()
+    monkeypatch.setattr(auth0_storage, "fetch_node_history", fake.fetch_node_history)
+    monkeypatch.setattr(auth0_storage, "set_node_history", fake.set_node_history)
+    monkeypatch.setattr(history_store, "NODE_HISTORY_DB_PATH", tmp_path / "node_history.sqlite3")
+    monkeypatch.setattr(history_store, "NODE_HISTORY_FLUSH_DELAY_SECONDS", 0.2)
+    monkeypatch.setattr(history_store, "NODE_HISTORY_RETRY_SECONDS", 0.05)
+    monkeypatch.setattr(history_store, "_local", threading.local())
+    monkeypatch.setattr(history_store, "_pending", {})
+    monkeypatch.setattr(history_store, "_flusher", None)
+    monkeypatch.setattr(history_store, "_stopping", False)
+    monkeypatch.setattr(history_store, "_stats", dict.fromkeys(history_store._stats, 0))
+    history_store.start()
+    yield fake
+    history_store.stop()
+
+
+def test_clicks_coalesce_into_one_patch(auth0):
+    auth0.stored["u1"] = ["7"]
+    for node in ("1", "2", "3"):
+        history_store.append_node("u1", node)
+    assert history_store.get_node_history("u1") == ["7", "1", "2", "3"]
+
+    _wait_for(lambda: auth0.patches)
+    time.sleep(0.1)
+    assert auth0.patches == [("u1", ["7", "1", "2", "3"])]
+    stats = history_store.stats()
+    assert stats["seeded"] == 1 and stats["appends"] == 3 and stats["coalesced"] == 2 and stats["pending"] == 0
+
+
+def test_failed_patch_is_retried(auth0):
+    auth0.fail_next = 1
+    history_store.append_node("u1", "1")
+
+    _wait_for(lambda: auth0.patches)
+    assert auth0.patches == [("u1", ["1"])]
+    assert history_store.stats()["flush_failures"] == 1
+    # Synced now: nothing left to flush on the next start
+    assert history_store._claim_flush(history_store._connect(), "u1") is None
+
+
+def test_flusher_survives_an_unexpected_error(auth0, monkeypatch):
+    claim = history_store._claim_flush
+    calls = []
+
+    def flaky_claim(conn, user_id):
+        calls.append(user_id)
+        if len(calls) == 1:
+            raise history_store.sqlite3.OperationalError("database is locked")
+        return claim(conn, user_id)
+
+    monkeypatch.setattr(history_store, "_claim_flush", flaky_claim)
+    history_store.append_node("u1", "1")
+
+    _wait_for(lambda: auth0.patches)
+    assert auth0.patches == [("u1", ["1"])]
+    assert history_store._flusher.is_alive()
+    assert history_store.stats()["flush_failures"] == 1
+
+
+def test_stop_flushes_pending_clicks(auth0, monkeypatch):
+    monkeypatch.setattr(history_store, "NODE_HISTORY_FLUSH_DELAY_SECONDS", 60.0)
+    history_store.append_node("u1", "1")
+    history_store.append_node("u1", "2")
+    history_store.stop()
+    assert auth0.patches == [("u1", ["1", "2"])]
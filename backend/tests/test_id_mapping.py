@@ -0,0 +1,36 @@
+import numpy as np
+
+from backend.services import id_mapping
+from backend.tests.conftest import NODE_TO_MAG
+
+
+def test_round_trip(mapping):
+    for node, mag in NODE_TO_MAG.items():
+        assert mapping.node_to_mag(node) == mag
+        assert mapping.mag_to_node(mag) == node
+    nodes = np.array(sorted(NODE_TO_MAG))
+    assert mapping.mags_to_nodes(mapping.nodes_to_mags(nodes)).tolist() == nodes.tolist()
+
+
+def test_converts_legacy_mappings_once(mapping, tmp_path):
+    mapping.node_to_mag_array()
+    assert (tmp_path / "node_to_mag.i64.npy").exists()
+    # Node 3 has no MAG id: a hole in the dense array
+    assert mapping.node_to_mag_array().tolist() == [1001, 1002, 1003, id_mapping.MISSING, 1005, 2**62]
+
+
+def test_unknown_ids_are_missing(mapping):
+    assert mapping.node_to_mag(3) is None
+    assert mapping.node_to_mag(-1) is None
+    assert mapping.node_to_mag(100) is None
+    assert mapping.mag_to_node(999) is None
+    assert mapping.mags_to_nodes([999, 1002, 0]).tolist() == [id_mapping.MISSING, 1, id_mapping.MISSING]
+
+
+def test_ids_outside_int64_are_missing(mapping):
+    assert mapping.mag_to_node(2**63) is None
+    assert mapping.mag_to_node(-(2**63) - 1) is None
+    assert mapping.node_to_mag(2**64) is None
+    # One overflowing id doesn't spoil the lookup of the others
+    assert mapping.mags_to_nodes([1003, 2**70, 2**62]).tolist() == [2, id_mapping.MISSING, 5]
+    assert mapping.nodes_to_mags([2**70, 1]).tolist() == [id_mapping.MISSING, 1002]
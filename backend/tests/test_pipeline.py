@@ -0,0 +1,29 @@
+import threading
+
+import pytest
+
+from backend.services import pipeline
+
+
+@pytest.fixture
+def jobs_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(pipeline, "PIPELINE_JOBS_DB_PATH", tmp_path / "pipeline_jobs.sqlite3")
+    monkeypatch.setattr(pipeline, "_local", threading.local())
+    monkeypatch.setattr(pipeline, "_missing_modules", [])
+    monkeypatch.setattr(pipeline, "_stats", dict.fromkeys(pipeline._stats, 0))
+
+
+def test_missing_worker_modules_disable_submit(jobs_db, monkeypatch, tmp_path):
+    monkeypatch.setattr(pipeline, "_WORKER_MODULES", ("json", "no_such_module_for_the_pipeline"))
+    pipeline.start()
+    assert not pipeline.available()
+    with pytest.raises(pipeline.PipelineUnavailable, match="no_such_module_for_the_pipeline"):
+        pipeline.submit("0" * 64, tmp_path / "paper.pdf", [1])
+    stats = pipeline.stats()
+    assert stats["available"] is False and stats["unavailable"] == 1 and stats["submitted"] == 0
+
+
+def test_installed_worker_modules_keep_it_available(jobs_db, monkeypatch):
+    monkeypatch.setattr(pipeline, "_WORKER_MODULES", ("json", "sqlite3"))
+    pipeline.start()
+    assert pipeline.available()
@@ -0,0 +1,32 @@
+from backend.services import paper_service
+
+
+def test_lookup_by_node(titles):
+    assert titles.get_title(0) == "Graph Attention Networks"
+    assert titles.get_title(2) == "Ünïcode — títle"
+    assert titles.get_title(5) == "Large id"
+    assert titles.num_nodes() == 6
+
+
+def test_nodes_without_title(titles):
+    assert titles.get_title(1) is None
+    assert titles.get_title(3) is None
+    assert titles.get_title(4) is None  # empty title in the JSON
+    assert titles.get_title(-1) is None
+    assert titles.get_title(6) is None
+    assert titles.has_title_mask().tolist() == [True, False, True, False, False, True]
+
+
+def test_batch_lookup_matches_single(titles):
+    nodes = [5, -3, 0, 1, 2, 99, 0]
+    assert titles.get_titles(nodes) == [titles.get_title(n) for n in nodes]
+
+
+def test_lookup_by_mag_id(titles):
+    assert paper_service.get_title_by_mag_id("1001") == "Graph Attention Networks"
+    assert paper_service.get_title_by_mag_id("W1003") == "Ünïcode — títle"
+    assert paper_service.get_title_by_mag_id("https://openalex.org/W1001") == "Graph Attention Networks"
+    assert paper_service.get_title_by_mag_id("999") is None
+    assert paper_service.get_title_by_mag_id("not-an-id") is None
+    # Beyond int64: no lookup rather than an OverflowError
+    assert paper_service.get_title_by_mag_id(str(2**64)) is None
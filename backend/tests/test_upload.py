@@ -0,0 +1,100 @@
+import hashlib
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.core.body_limit import BodySizeLimitMiddleware
+from backend.routers import upload
+from backend.services import pipeline, upload_store
+
+LIMIT = 4096
+PDF = b"%PDF-1.4\n" + b"x" * 1000
+
+
+@pytest.fixture
+def submitted(tmp_path, monkeypatch):
+    """Jobs the upload endpoint submitted, as (sha256, path, citations); the pool is never started."""
+    jobs = []
+
+    def submit(sha256, path, citations):
+        jobs.append((sha256, path, citations))
+        return {"job_id": f"job-{len(jobs)}", "status": pipeline.QUEUED}
+
+    monkeypatch.setattr(upload_store, "UPLOAD_DIR", tmp_path / "uploads")
+    monkeypatch.setattr(pipeline, "submit", submit)
+    monkeypatch.setattr(pipeline, "available", lambda: True)
+    return jobs
+
+
+@pytest.fixture
+def client(submitted):
+    app = FastAPI()
+    app.include_router(upload.router)
+    app.add_middleware(BodySizeLimitMiddleware, limits={"/api/upload": LIMIT})
+    return TestClient(app)
+
+
+def _post(client, content=PDF, **data):
+    return client.post("/api/upload", files={"file": ("paper.pdf", content, "application/pdf")}, data=data)
+
+
+def test_upload_is_stored_by_sha256(client, submitted, tmp_path):
+    response = _post(client, citations="W1001, 1002,not-an-id")
+    assert response.status_code == 201
+    body = response.json()
+    sha256 = hashlib.sha256(PDF).hexdigest()
+    assert body["sha256"] == sha256 and body["size"] == len(PDF) and not body["duplicate"]
+    assert (tmp_path / "uploads" / f"{sha256}.pdf").read_bytes() == PDF
+    assert submitted == [(sha256, tmp_path / "uploads" / f"{sha256}.pdf", [1001, 1002])]
+
+
+def test_same_content_is_deduplicated(client, tmp_path):
+    first = _post(client).json()
+    second = client.post("/api/upload", files={"file": ("renamed.pdf", PDF, "application/pdf")}).json()
+    assert second["duplicate"] and second["sha256"] == first["sha256"]
+    assert [p.name for p in (tmp_path / "uploads").iterdir()] == [f"{first['sha256']}.pdf"]
+
+
+def test_body_over_the_limit_is_413(client, submitted, tmp_path):
+    response = _post(client, content=b"%PDF-1.4\n" + b"x" * LIMIT)
+    assert response.status_code == 413
+    assert submitted == []
+    assert not list((tmp_path / "uploads").glob("*.pdf"))
+
+
+def test_chunked_body_over_the_limit_is_413(client, submitted):
+    """No Content-Length to go by: the middleware counts the chunks as they arrive."""
+    boundary = "b0undary"
+    head = (
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"paper.pdf\"\r\n"
+        "Content-Type: application/pdf\r\n\r\n"
+    ).encode()
+
+    def body():
+        yield head
+        for _ in range(LIMIT // 512 + 1):
+            yield b"x" * 512
+        yield f"\r\n--{boundary}--\r\n".encode()
+
+    response = client.post(
+        "/api/upload", content=body(), headers={"Content-Type": f"multipart/form-data; boundary={boundary}"}
+    )
+    assert response.status_code == 413
+    assert submitted == []
+
+
+def test_store_rejects_files_over_max_bytes(tmp_path, monkeypatch):
+    monkeypatch.setattr(upload_store, "UPLOAD_DIR", tmp_path)
+    with open(tmp_path / "src.bin", "wb") as f:
+        f.write(b"x" * 100)
+    with open(tmp_path / "src.bin", "rb") as src, pytest.raises(upload_store.UploadTooLarge):
+        upload_store.store(src, max_bytes=99)
+    assert [p.name for p in tmp_path.iterdir()] == ["src.bin"]
+
+
+def test_unavailable_pipeline_is_503(client, submitted, monkeypatch, tmp_path):
+    monkeypatch.setattr(pipeline, "available", lambda: False)
+    assert _post(client).status_code == 503
+    assert submitted == []
+    assert not (tmp_path / "uploads").exists()
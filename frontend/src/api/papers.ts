@@ -1,12 +1,14 @@
 const API_BASE = import.meta.env.VITE_API_URL ?? 'http://localhost:8000';
 
 export type ForYouPaper = { mag_id: string; title: string; score?: number };
-export type ForYouResponse = { papers: ForYouPaper[]; count: number };
+export type ForYouResponse = { papers: ForYouPaper[]; count: number; next_cursor: string | null };
 
 export type PaperInfo = { mag_id: string; title: string | null; doi_url: string | null; abstract: string | null };
 
-export async function fetchForYou(n: number = 50, accessToken?: string): Promise<ForYouResponse> {
-  const res = await fetch(`${API_BASE}/api/papers/for-you?n=${n}`, {
+export async function fetchForYou(n: number = 50, accessToken?: string, cursor?: string): Promise<ForYouResponse> {
+  const params = new URLSearchParams({ n: String(n) });
+  if (cursor) params.set('cursor', cursor);
+  const res = await fetch(`${API_BASE}/api/papers/for-you?${params}`, {
     headers: accessToken ? { Authorization: `Bearer ${accessToken}` } : {},
   });
   if (!res.ok) throw new Error('Failed to fetch For You papers');
@@ -23,6 +25,17 @@ export async function fetchPaperInfo(magId: string): Promise<PaperInfo> {
   return res.json();
 }
 
+export async function fetchPaperInfoBatch(magIds: string[]): Promise<Record<string, PaperInfo>> {
+  const res = await fetch(`${API_BASE}/api/papers/paper-info/batch`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ mag_ids: magIds }),
+  });
+  if (!res.ok) throw new Error('Failed to fetch paper info');
+  const data: { papers: Record<string, PaperInfo> } = await res.json();
+  return data.papers;
+}
+
 export async function registerPaperClick(magId: string, accessToken?: string): Promise<void> {
   const headers: HeadersInit = { 'Content-Type': 'application/json' };
   if (accessToken) headers['Authorization'] = `Bearer ${accessToken}`;
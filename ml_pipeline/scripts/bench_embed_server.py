@@ -0,0 +1,91 @@
+"""
+Benchmark the dynamic-batching embedding server (src/embed_server.py) on CPU: concurrent callers
+each running model.encode on their own text vs EmbeddingBatcher at several max batch sizes.
+Reports texts/s, latency percentiles and the average batch actually formed.
+
+    python scripts/bench_embed_server.py --texts 512 --threads 1 16 --max-batch 8 32 64
+
+Texts are "title. abstract" from a metadata JSON (as for generate_qwen_embeddings) when --input is
+given, otherwise synthetic with a long-tailed length distribution.
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+_SCRIPT_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(_SCRIPT_DIR.parent))
+from src import hf_embed, model_registry
+from src.embed_server import MAX_WAIT_MS, EmbeddingBatcher
+
+_VOCAB = "graph neural network citation embedding model paper learning node transformer attention language".split()
+
+
+def load_texts(input_file: Path | None, n: int, rng: np.random.Generator) -> list[str]:
+    if input_file is not None:
+        with open(input_file) as f:
+            data = json.load(f)
+        picked = rng.choice(len(data), min(n, len(data)), replace=False)
+        return [f"{data[i].get('title', '')}. {data[i].get('abstract', '')}" for i in picked]
+    # Word counts roughly like titles + abstracts: most around 150, a tail of long ones
+    lengths = np.clip(rng.lognormal(5.0, 0.6, n), 5, 600).astype(int)
+    return [" ".join(rng.choice(_VOCAB, length)) for length in lengths]
+
+
+def run_concurrent(embed, texts: list[str], threads: int) -> tuple[float, np.ndarray]:
+    """Split texts over threads that each embed one at a time; returns (texts/s, latencies ms)."""
+    latencies = np.empty(len(texts))
+    chunks = np.array_split(np.arange(len(texts)), threads)
+
+    def worker(rows: np.ndarray) -> None:
+        for i in rows:
+            start = time.perf_counter()
+            embed(texts[i])
+            latencies[i] = (time.perf_counter() - start) * 1000
+
+    workers = [threading.Thread(target=worker, args=(rows,)) for rows in chunks]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return len(texts) / (time.perf_counter() - start), latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput / latency of dynamic-batched vs per-call embedding")
+    parser.add_argument("--input", type=Path, default=None, help="Metadata JSON (list of {title, abstract})")
+    parser.add_argument("--texts", type=int, default=512)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 16], help="Concurrency levels")
+    parser.add_argument("--max-batch", type=int, nargs="+", default=[8, 32, 64])
+    parser.add_argument("--max-wait-ms", type=float, default=MAX_WAIT_MS)
+    args = parser.parse_args()
+
+    texts = load_texts(args.input, args.texts, np.random.default_rng(0))
+    model_registry.warmup(["qwen"])
+    model = hf_embed.get_model()
+    print(f"{len(texts)} texts, {model_registry.NUM_THREADS} torch threads, max wait {args.max_wait_ms} ms\n")
+
+    header = f"{'threads':>8}{'mode':>12}{'texts/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'avg batch':>11}"
+    print(header)
+    print("-" * len(header))
+    for threads in args.threads:
+        direct = lambda text: model.encode([text], show_progress_bar=False)
+        qps, lat = run_concurrent(direct, texts, threads)
+        p50, p95, p99 = np.percentile(lat, [50, 95, 99])
+        print(f"{threads:>8}{'direct':>12}{qps:>10.1f}{p50:>10.1f}{p95:>10.1f}{p99:>10.1f}{1.0:>11.1f}")
+        for max_batch in args.max_batch:
+            batcher = EmbeddingBatcher(hf_embed.get_model, max_batch=max_batch, max_wait_ms=args.max_wait_ms)
+            qps, lat = run_concurrent(batcher.embed, texts, threads)
+            batcher.close()
+            p50, p95, p99 = np.percentile(lat, [50, 95, 99])
+            avg_batch = batcher.stats()["avg_batch"]
+            print(f"{threads:>8}{f'batch {max_batch}':>12}{qps:>10.1f}{p50:>10.1f}{p95:>10.1f}{p99:>10.1f}{avg_batch:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Fake OpenRouter embeddings server + benchmark of the batched Gemini client against it.
+
+The fake server answers POST /embeddings like the real one. Each embedding is a deterministic
+function of its text, so results can be checked row by row. It returns data items shuffled (with
+their index), adds latency per request, answers 429 + Retry-After above --server-rps, fails
+a fraction of requests with 503, and answers a fraction with a 200 that has no embeddings (an
+"error" object or a non-JSON body), as OpenRouter does for some upstream failures.
+
+    python scripts/bench_gemini_client.py --texts 5000 --batch_size 64 --concurrency 8 --rps 20
+    python scripts/bench_gemini_client.py --serve 8765     # only run the fake server
+"""
+import argparse
+import asyncio
+import hashlib
+import random
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from aiohttp import web
+
+# Allow importing from ml_pipeline.src when running from scripts/
+_SCRIPT_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(_SCRIPT_DIR.parent))
+from src.embeddings.gemini_client import GeminiEmbeddingClient
+
+
+def fake_embedding(text: str, dimensions: int) -> np.ndarray:
+    seed = int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), "little")
+    return np.random.default_rng(seed).standard_normal(dimensions).astype(np.float32)
+
+
+def make_app(server_rps: float, fail_rate: float, latency_ms: float, bad_body_rate: float = 0.0,
+             max_inputs: int = 2048) -> web.Application:
+    window = {"start": time.monotonic(), "count": 0}
+    counts = {"requests": 0, "rate_limited": 0, "failed": 0, "bad_body": 0}
+
+    async def embeddings(request: web.Request) -> web.Response:
+        counts["requests"] += 1
+        now = time.monotonic()
+        if now - window["start"] >= 1.0:
+            window["start"], window["count"] = now, 0
+        window["count"] += 1
+        if window["count"] > server_rps:
+            counts["rate_limited"] += 1
+            return web.json_response({"error": "rate limited"}, status=429, headers={"Retry-After": "1"})
+        if random.random() < fail_rate:
+            counts["failed"] += 1
+            return web.json_response({"error": "unavailable"}, status=503)
+        if random.random() < bad_body_rate:
+            counts["bad_body"] += 1
+            if random.random() < 0.5:
+                return web.json_response({"error": {"message": "upstream error", "code": 502}})
+            return web.Response(text="<html>upstream error</html>", content_type="text/html")
+        body = await request.json()
+        inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        if len(inputs) > max_inputs:
+            return web.json_response({"error": "too many inputs"}, status=400)
+        await asyncio.sleep(latency_ms / 1000 * random.uniform(0.5, 1.5))
+        data = [{"index": i, "embedding": fake_embedding(t, body["dimensions"]).tolist()} for i, t in enumerate(inputs)]
+        random.shuffle(data)
+        return web.json_response({"data": data, "model": body["model"]})
+
+    app = web.Application(client_max_size=64 * 2**20)
+    app.router.add_post("/embeddings", embeddings)
+    app["counts"] = counts
+    return app
+
+
+async def run(args) -> None:
+    app = make_app(args.server_rps, args.fail_rate, args.latency_ms, args.bad_body_rate)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", args.serve or 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    base_url = f"http://127.0.0.1:{port}"
+    if args.serve:
+        print(f"Fake embeddings server on {base_url}/embeddings")
+        await asyncio.Event().wait()
+
+    texts = [f"paper {i}: " + " ".join(random.choices(["graph", "citation", "embedding", "model"], k=50)) for i in range(args.texts)]
+    expected = np.stack([fake_embedding(t, args.dimensions) for t in texts])
+    print(f"{args.texts} texts, server: {args.server_rps} req/s, {args.fail_rate:.0%} 503s, "
+          f"{args.bad_body_rate:.0%} 200s without data, ~{args.latency_ms} ms latency\n")
+    header = f"{'mode':<22}{'texts/s':>10}{'seconds':>9}{'requests':>10}{'retries':>9}{'429s':>7}{'correct':>9}"
+    print(header)
+    print("-" * len(header))
+    modes = [
+        # Roughly the old path: one text per request, one at a time (timed on a prefix)
+        ("1 per request, serial", texts[:args.serial_texts], dict(batch_size=1, max_concurrency=1)),
+        (f"batch {args.batch_size} x {args.concurrency}", texts, dict(batch_size=args.batch_size, max_concurrency=args.concurrency)),
+    ]
+    for name, mode_texts, kwargs in modes:
+        client = GeminiEmbeddingClient("fake-key", dimensions=args.dimensions, base_url=base_url,
+                                       requests_per_second=args.rps, use_cache=False, **kwargs)
+        async with client:
+            start = time.perf_counter()
+            out = await client.embed(mode_texts)
+            elapsed = time.perf_counter() - start
+        correct = np.allclose(out, expected[:len(mode_texts)])
+        s = client.stats
+        print(f"{name:<22}{len(mode_texts) / elapsed:>10.0f}{elapsed:>9.2f}{s['requests']:>10}{s['retries']:>9}{s['rate_limited']:>7}{str(correct):>9}")
+    await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batched Gemini embedding client vs a fake OpenRouter server.")
+    parser.add_argument("--texts", type=int, default=5000)
+    parser.add_argument("--serial_texts", type=int, default=200, help="Texts for the one-per-request baseline.")
+    parser.add_argument("--dimensions", type=int, default=768)
+    parser.add_argument("--batch_size", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rps", type=float, default=20.0, help="Client token-bucket rate.")
+    parser.add_argument("--server_rps", type=float, default=25.0, help="Fake server's limit before it answers 429.")
+    parser.add_argument("--fail_rate", type=float, default=0.05, help="Fraction of fake 503s.")
+    parser.add_argument("--bad_body_rate", type=float, default=0.02, help="Fraction of fake 200s without embeddings.")
+    parser.add_argument("--latency_ms", type=float, default=150.0, help="Fake server latency per request.")
+    parser.add_argument("--serve", type=int, default=None, help="Only run the fake server on this port.")
+
+    asyncio.run(run(parser.parse_args()))
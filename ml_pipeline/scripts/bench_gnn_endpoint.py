@@ -0,0 +1,100 @@
+"""
+Benchmark new-paper GNN inference: build_query_graph (full edge scans, full-graph concat) vs the
+CSR sampler with a virtual query node (gnn_embed_new.endpoint), then bulk throughput of an
+endpoint() loop vs gnn_embed_new.batch_endpoint (disjoint-union mini-batches).
+
+    python ml_pipeline/scripts/bench_gnn_endpoint.py --queries 50 --citations 15 --bulk 2000 --batch-sizes 64 256
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import torch
+from torch_geometric.data import Data
+
+_SCRIPT_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(_SCRIPT_DIR.parent))
+from src import gnn_embed_new
+from src.data_loader import unsafe_load_ogbn_arxiv
+
+
+def load_graph() -> Data:
+    dataset = unsafe_load_ogbn_arxiv()
+    graph_dict, _ = dataset[0]
+    data = Data(
+        x=torch.tensor(graph_dict['node_feat'], dtype=torch.float),
+        edge_index=torch.tensor(graph_dict['edge_index'], dtype=torch.long),
+        num_nodes=graph_dict['num_nodes'],
+    )
+    # Add to feature dimension to simulate the reembedded graph (as in gnn_embed_new.__main__)
+    data.x = torch.cat([data.x, torch.zeros(data.num_nodes, 256)], dim=1)
+    return data
+
+
+def legacy_endpoint(graph, citation_ids):
+    """endpoint() as it was before the CSR sampler."""
+    neighbourhood_graph, _ = gnn_embed_new.build_query_graph(graph, citation_ids)
+    with torch.no_grad():
+        return gnn_embed_new.get_model()(neighbourhood_graph.x, neighbourhood_graph.edge_index)[0]
+
+
+def time_calls(fn, graph, queries):
+    latencies = []
+    for citation_ids in queries:
+        start = time.perf_counter()
+        fn(graph, citation_ids)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return np.asarray(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="endpoint() latency before/after the CSR sampler")
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--citations", type=int, default=15, help="Citations per simulated new paper")
+    parser.add_argument("--legacy-queries", type=int, default=10, help="The legacy path is slow; time fewer calls")
+    parser.add_argument("--bulk", type=int, default=2000, help="New papers in the loop vs batch comparison")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[64, 256])
+    args = parser.parse_args()
+
+    gnn_embed_new.model_registry.warmup(["gnn"])
+    graph = load_graph()
+    rng = np.random.default_rng(0)
+    queries = [rng.choice(graph.num_nodes, args.citations, replace=False).tolist() for _ in range(args.queries)]
+
+    start = time.perf_counter()
+    gnn_embed_new.prepare_graph(graph)
+    print(f"{graph.num_nodes} nodes, {graph.edge_index.shape[1]} edges; CSR index built in {time.perf_counter() - start:.2f}s\n")
+
+    header = f"{'path':<10}{'calls':>8}{'p50 ms':>10}{'p99 ms':>10}"
+    print(header)
+    print("-" * len(header))
+    for name, fn, n in (
+        ("legacy", legacy_endpoint, args.legacy_queries),
+        ("csr", gnn_embed_new.endpoint, args.queries),
+    ):
+        lat = time_calls(fn, graph, queries[:n])
+        print(f"{name:<10}{len(lat):>8}{np.percentile(lat, 50):>10.1f}{np.percentile(lat, 99):>10.1f}")
+
+    bulk = [rng.choice(graph.num_nodes, args.citations, replace=False).tolist() for _ in range(args.bulk)]
+    print(f"\nBulk: {args.bulk} new papers\n")
+    header = f"{'mode':<14}{'papers/s':>10}{'total s':>10}{'max |diff|':>12}"
+    print(header)
+    print("-" * len(header))
+    # Same seed for every mode: identical neighbourhoods, so the embeddings must match the loop's
+    start = time.perf_counter()
+    loop_rng = np.random.default_rng(1)
+    reference = torch.stack([gnn_embed_new.endpoint(graph, ids, rng=loop_rng) for ids in bulk])
+    elapsed = time.perf_counter() - start
+    print(f"{'loop':<14}{args.bulk / elapsed:>10.0f}{elapsed:>10.2f}{0.0:>12.2e}")
+    for batch_size in args.batch_sizes:
+        start = time.perf_counter()
+        out = gnn_embed_new.batch_endpoint(graph, bulk, batch_size=batch_size, rng=np.random.default_rng(1))
+        elapsed = time.perf_counter() - start
+        diff = (out - reference).abs().max().item()
+        print(f"{f'batch {batch_size}':<14}{args.bulk / elapsed:>10.0f}{elapsed:>10.2f}{diff:>12.2e}")
+
+
+if __name__ == "__main__":
+    main()
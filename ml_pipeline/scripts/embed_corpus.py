@@ -0,0 +1,46 @@
+import argparse
+import sys
+from pathlib import Path
+
+# Allow importing from ml_pipeline.src when running from scripts/
+_SCRIPT_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(_SCRIPT_DIR.parent))
+from src.embeddings.qwen_embed import count_records, generate_qwen_embeddings, merge_shards, shard_range
+
+
+def shard_output(output: Path, shard: int, num_shards: int) -> Path:
+    return output.with_name(f"{output.stem}.shard{shard}of{num_shards}.npy")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Qwen embeddings of the paper metadata, streamed into a .npy memmap (resumable, shardable).",
+        epilog="Shard across processes: run `generate --shard i --num_shards n` for each i, then "
+               "`merge --num_shards n` with the same --input/--output. Re-running a command resumes it.",
+    )
+    parser.add_argument("command", choices=["generate", "merge"])
+    parser.add_argument("--input", type=str, default="arxiv_mag_metadata.json",
+                        help="Metadata JSON array (scripts/data.py output) or JSON lines.")
+    parser.add_argument("--output", type=str, default="qwen_embeddings.pt",
+                        help=".npy, or .pt to also write the torch tensor once complete.")
+    parser.add_argument("--dim", type=int, default=256, help="Truncated embedding dimension.")
+    parser.add_argument("--chunk_size", type=int, default=4096, help="Rows per encode / write / checkpoint.")
+    parser.add_argument("--shard", type=int, default=None, help="This process's shard index.")
+    parser.add_argument("--num_shards", type=int, default=1)
+
+    args = parser.parse_args()
+    output = Path(args.output)
+
+    if args.command == "generate" and args.shard is None:
+        generate_qwen_embeddings(args.input, output, args.dim, chunk_size=args.chunk_size)
+        sys.exit(0)
+
+    # Every shard counts the same input, so they agree on the ranges
+    num_rows = count_records(args.input)
+    if args.command == "generate":
+        start, end = shard_range(num_rows, args.shard, args.num_shards)
+        generate_qwen_embeddings(args.input, shard_output(output, args.shard, args.num_shards), args.dim,
+                                 start=start, end=end, chunk_size=args.chunk_size, num_rows=num_rows)
+    else:
+        shards = [shard_output(output, i, args.num_shards) for i in range(args.num_shards)]
+        merge_shards(shards, output, num_rows=num_rows)
@@ -0,0 +1,111 @@
+# CSR (compressed sparse row) neighbour sampling for new-paper GNN inference.
+# Replaces the O(E) edge scans in gnn_embed_new.get_cluster / build_query_graph: the adjacency is
+# indexed once, and a new paper is a virtual node overlaid on the graph instead of being
+# concatenated onto the full feature matrix and edge list.
+
+import numpy as np
+import torch
+from torch_geometric.data import Data
+
+
+class CSRGraph:
+    """
+    Out-adjacency of a directed graph in CSR form: the neighbours of node u are
+    indices[indptr[u]:indptr[u + 1]] (same direction as data.edge_index[0] -> data.edge_index[1]).
+    Holds a reference to the node features; nothing is copied per query.
+    """
+
+    def __init__(self, edge_index, num_nodes: int, x: torch.Tensor):
+        edge_index = np.asarray(edge_index.cpu() if torch.is_tensor(edge_index) else edge_index, dtype=np.int64)
+        src, dst = edge_index
+        # Stable sort keeps each node's neighbours in edge_index order
+        order = np.argsort(src, kind="stable")
+        self.indices = dst[order]
+        self.indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=num_nodes), out=self.indptr[1:])
+        self.num_nodes = num_nodes
+        self.x = x
+
+    @classmethod
+    def from_data(cls, data: Data) -> "CSRGraph":
+        return cls(data.edge_index, data.num_nodes, data.x)
+
+    def degrees(self, nodes: np.ndarray) -> np.ndarray:
+        return self.indptr[nodes + 1] - self.indptr[nodes]
+
+    def out_edges(self, nodes: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """All out-edges of nodes as (src, dst) arrays."""
+        starts = self.indptr[nodes]
+        degs = self.indptr[nodes + 1] - starts
+        # Position of every edge: start of its node's row + offset within the row
+        offsets = np.arange(degs.sum()) - np.repeat(np.cumsum(degs) - degs, degs)
+        return np.repeat(nodes, degs), self.indices[np.repeat(starts, degs) + offsets]
+
+
+def _sample_segments(values: np.ndarray, seg_lengths: np.ndarray, k: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Up to k values per segment, without replacement (segments with <= k values keep all of them).
+    values is the concatenation of the segments. Vectorized: one random key per value, sorted within
+    each segment, keeping the first k.
+    """
+    seg = np.repeat(np.arange(len(seg_lengths)), seg_lengths)
+    order = np.lexsort((rng.random(len(values)), seg))
+    rank = np.arange(len(values)) - np.repeat(np.cumsum(seg_lengths) - seg_lengths, seg_lengths)
+    return values[order[rank < k]]
+
+
+def sample_query_graph(graph: CSRGraph, cited_node_ids, num_neighbors=[10, 10, 5], rng=None):
+    """
+    Same sampling as build_query_graph(graph, cited_node_ids, num_neighbors), without touching the
+    full graph tensors: the new paper is a virtual node whose only edges are new -> cited.
+
+    Args:
+        graph: CSRGraph of the full citation graph
+        cited_node_ids: List of node IDs the new paper cites
+        num_neighbors: Sampling strategy per hop
+        rng: numpy Generator (default: fresh, unseeded)
+
+    Returns:
+        subgraph_data (with the new paper at index 0, features zeroed; the model masks it anyway),
+        original_node_ids (index 0 is the virtual id graph.num_nodes)
+    """
+    rng = rng or np.random.default_rng()
+    cited = np.asarray(cited_node_ids, dtype=np.int64)
+    assert len(cited) == 0 or (cited.min() >= 0 and cited.max() < graph.num_nodes), "Cited node IDs out of range"
+    virtual_id = graph.num_nodes
+
+    # Hop 1 from the virtual node samples its citation list; later hops come from the CSR rows.
+    # Nothing points at the virtual node, so it never reappears in a frontier.
+    frontier = _sample_segments(cited, np.array([len(cited)]), num_neighbors[0], rng) if num_neighbors else cited[:0]
+    visited = [frontier]
+    for n_sample in num_neighbors[1:]:
+        if len(frontier) == 0:
+            break
+        nodes = np.unique(frontier)
+        _, neighbours = graph.out_edges(nodes)
+        frontier = _sample_segments(neighbours, graph.degrees(nodes), n_sample, rng)
+        visited.append(frontier)
+    subset = np.unique(np.concatenate(visited))  # sorted real node ids
+    placeholder = torch.zeros(1, graph.x.shape[1], dtype=graph.x.dtype)
+    if len(subset) == 0:
+        return Data(x=placeholder, edge_index=torch.empty(2, 0, dtype=torch.long), num_nodes=1), torch.tensor([virtual_id])
+
+    def local_ids(nodes: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """(mask of nodes that are in subset, their local ids: subset[i] -> i + 1, the virtual node is 0)."""
+        pos = np.minimum(np.searchsorted(subset, nodes), len(subset) - 1)
+        return subset[pos] == nodes, pos + 1
+
+    # Induced edges among subset, then the virtual node's edges to the cited papers that were sampled
+    # (edge order as in build_query_graph: original edges first, new ones last)
+    src, dst = graph.out_edges(subset)
+    keep, local_dst = local_ids(dst)
+    _, local_src = local_ids(src[keep])
+    cited_in, local_cited = local_ids(cited)
+    edge_index = torch.from_numpy(np.stack([
+        np.concatenate([local_src, np.zeros(int(cited_in.sum()), dtype=np.int64)]),
+        np.concatenate([local_dst[keep], local_cited[cited_in]]),
+    ]))
+
+    x = torch.cat([placeholder, graph.x[torch.from_numpy(subset)]], dim=0)
+    orig_ids = torch.from_numpy(np.concatenate([[virtual_id], subset]))
+    return Data(x=x, edge_index=edge_index, num_nodes=len(subset) + 1), orig_ids
@@ -0,0 +1,211 @@
+"""
+Content-addressed, persistent cache of text embeddings, shared by hf_embed, embeddings/qwen_embed
+and embeddings/gemini_embed: identical text (after normalization) is never encoded or paid for twice.
+
+One cache per (model, dim), in EMBED_CACHE_DIR:
+    <model>-<dim>.f32   append-only float32 rows, read through np.memmap
+    <model>-<dim>.keys  append-only 16-byte keys, row i of the .f32 file belongs to key i
+A key is blake2b(model, dim, normalized text). In memory the index is the keys' first 8 bytes as a
+sorted uint64 array (plus a dict of rows appended since the last merge); the full 16 bytes are
+checked on every hit. Appends take an flock, so several processes can share a cache.
+"""
+
+import fcntl
+import hashlib
+import os
+import re
+import threading
+import unicodedata
+from pathlib import Path
+
+import numpy as np
+
+# ml_pipeline/data/embed_cache (next to data_loader.DATA_DIR; not imported from there to keep torch out)
+EMBED_CACHE_DIR = Path(os.getenv("EMBED_CACHE_DIR", str(Path(__file__).resolve().parent.parent / "data" / "embed_cache")))
+KEY_BYTES = 16
+# Rows kept in the delta dict before they are merged into the sorted index
+_MERGE_EVERY = 4096
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Unicode NFC, whitespace collapsed, stripped. Case is kept: the models are case-sensitive."""
+    return _WHITESPACE_RE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+def cache_key(model: str, dim: int, text: str) -> bytes:
+    return hashlib.blake2b(f"{model}\0{dim}\0{normalize_text(text)}".encode(), digest_size=KEY_BYTES).digest()
+
+
+class EmbeddingCache:
+    """
+    Args:
+        model: Model name (part of the key and the file name)
+        dim: Embedding dimension stored (e.g. the truncate_dim)
+        cache_dir: Directory of the cache files
+    """
+
+    def __init__(self, model: str, dim: int, cache_dir: Path = EMBED_CACHE_DIR):
+        self.model = model
+        self.dim = dim
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        stem = re.sub(r"[^A-Za-z0-9._-]+", "_", model)
+        self.vectors_path = cache_dir / f"{stem}-{dim}.f32"
+        self.keys_path = cache_dir / f"{stem}-{dim}.keys"
+        self._lock = threading.Lock()
+        self._keys = np.empty((0, KEY_BYTES), dtype=np.uint8)
+        self._prefixes = np.empty(0, dtype=np.uint64)  # sorted key prefixes of merged rows
+        self._prefix_rows = np.empty(0, dtype=np.int64)
+        self._delta: dict[bytes, int] = {}  # key -> row, not yet merged
+        self._vectors = None
+        self._merged = 0
+        self.hits = 0
+        self.misses = 0
+        with self._lock:
+            self._repair()
+            self._refresh()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _repair(self) -> None:
+        """Drop a torn tail left by a crash between the vector and the key append."""
+        with open(self.keys_path, "ab") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            row_bytes = self.dim * 4
+            n = min(os.path.getsize(self.keys_path) // KEY_BYTES, self._vectors_size() // row_bytes)
+            os.truncate(self.keys_path, n * KEY_BYTES)
+            with open(self.vectors_path, "ab"):
+                os.truncate(self.vectors_path, n * row_bytes)
+
+    def _vectors_size(self) -> int:
+        try:
+            return os.path.getsize(self.vectors_path)
+        except FileNotFoundError:
+            return 0
+
+    def _refresh(self) -> None:
+        """Under self._lock: pick up rows appended since the last refresh (by any process)."""
+        n = os.path.getsize(self.keys_path) // KEY_BYTES
+        if n == len(self._keys):
+            return
+        with open(self.keys_path, "rb") as f:
+            f.seek(len(self._keys) * KEY_BYTES)
+            new = np.frombuffer(f.read((n - len(self._keys)) * KEY_BYTES), dtype=np.uint8).reshape(-1, KEY_BYTES)
+        start = len(self._keys)
+        self._keys = np.concatenate([self._keys, new])
+        if n - self._merged >= _MERGE_EVERY:
+            self._merge()
+        else:
+            for i, key in enumerate(new):
+                self._delta[key.tobytes()] = start + i
+        self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(n, self.dim)) if n else None
+
+    def _merge(self) -> None:
+        prefixes = self._keys[:, :8].copy().view(np.uint64).reshape(-1)
+        order = np.argsort(prefixes, kind="stable")
+        self._prefixes, self._prefix_rows = prefixes[order], order
+        self._merged = len(self._keys)
+        self._delta.clear()
+
+    def _row(self, key: bytes) -> int:
+        """Row of key, or -1."""
+        row = self._delta.get(key)
+        if row is not None:
+            return row
+        prefix = np.frombuffer(key[:8], dtype=np.uint64)[0]
+        i = np.searchsorted(self._prefixes, prefix)
+        while i < len(self._prefixes) and self._prefixes[i] == prefix:
+            row = int(self._prefix_rows[i])
+            if self._keys[row].tobytes() == key:
+                return row
+            i += 1
+        return -1
+
+    def get_many(self, texts: list[str]) -> tuple[np.ndarray, np.ndarray]:
+        """(vectors, found): (len(texts), dim) float32 with zero rows where found is False."""
+        keys = [cache_key(self.model, self.dim, t) for t in texts]
+        with self._lock:
+            rows = np.array([self._row(k) for k in keys], dtype=np.int64)
+            if (rows < 0).any():
+                self._refresh()  # another process may have added them
+                rows = np.array([self._row(k) for k in keys], dtype=np.int64)
+            found = rows >= 0
+            out = np.zeros((len(texts), self.dim), dtype=np.float32)
+            if found.any():
+                out[found] = self._vectors[rows[found]]
+            self.hits += int(found.sum())
+            self.misses += int((~found).sum())
+        return out, found
+
+    def get(self, text: str) -> np.ndarray | None:
+        vectors, found = self.get_many([text])
+        return vectors[0] if found[0] else None
+
+    def put_many(self, texts: list[str], vectors: np.ndarray) -> None:
+        """Append embeddings for texts not already cached (duplicates within texts are stored once)."""
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(texts), self.dim)
+        keys = {}
+        for text, vector in zip(texts, vectors):
+            keys.setdefault(cache_key(self.model, self.dim, text), vector)
+        with self._lock, open(self.keys_path, "ab") as keys_file:
+            fcntl.flock(keys_file, fcntl.LOCK_EX)
+            self._refresh()
+            new = [(k, v) for k, v in keys.items() if self._row(k) < 0]
+            if not new:
+                return
+            # Vectors first: a crash before the keys are written leaves only an unreferenced tail,
+            # cut here so the rows stay aligned with the keys
+            os.truncate(self.vectors_path, len(self._keys) * self.dim * 4)
+            with open(self.vectors_path, "ab") as vectors_file:
+                vectors_file.write(np.stack([v for _, v in new]).tobytes())
+                vectors_file.flush()
+            keys_file.write(b"".join(k for k, _ in new))
+            keys_file.flush()
+            self._refresh()
+
+    def put(self, text: str, vector: np.ndarray) -> None:
+        self.put_many([text], np.asarray(vector)[None])
+
+    def get_or_compute(self, texts: list[str], compute) -> np.ndarray:
+        """
+        Embeddings of texts, calling compute(missing_texts) -> (m, dim) once for the texts not
+        cached (each distinct text once) and writing the results back.
+        """
+        out, found = self.get_many(texts)
+        if found.all():
+            return out
+        missing = list(dict.fromkeys(texts[i] for i in np.flatnonzero(~found)))
+        computed = np.asarray(compute(missing), dtype=np.float32).reshape(len(missing), self.dim)
+        self.put_many(missing, computed)
+        by_text = dict(zip(missing, computed))
+        for i in np.flatnonzero(~found):
+            out[i] = by_text[texts[i]]
+        return out
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "model": self.model,
+                "dim": self.dim,
+                "rows": len(self._keys),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "disk_mb": (self._vectors_size() + os.path.getsize(self.keys_path)) / 2**20,
+            }
+
+
+_caches: dict[tuple[str, int], EmbeddingCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(model: str, dim: int) -> EmbeddingCache:
+    """Shared EmbeddingCache for (model, dim) in this process."""
+    with _caches_lock:
+        cache = _caches.get((model, dim))
+        if cache is None:
+            cache = _caches[(model, dim)] = EmbeddingCache(model, dim)
+        return cache
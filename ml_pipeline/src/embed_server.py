@@ -0,0 +1,161 @@
+"""
+Dynamic batching in front of a SentenceTransformer: texts submitted from any thread are queued by
+(estimated) length, and a worker thread runs model.encode once per batch of similar-length texts,
+so concurrent callers share forward passes and short texts are not padded to the longest one.
+
+A batch is encoded as soon as its bucket holds max_batch texts, or when its oldest text has waited
+max_wait_ms. submit() returns a Future; embed() blocks on it.
+"""
+
+import bisect
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+
+# Texts per model.encode call
+MAX_BATCH = int(os.getenv("EMBED_MAX_BATCH", "32"))
+# Longest a text waits for its batch to fill
+MAX_WAIT_MS = float(os.getenv("EMBED_MAX_WAIT_MS", "5"))
+# Upper bounds (estimated tokens) of the length buckets; longer texts go in a last, open bucket
+BUCKETS = (32, 64, 128, 256, 512)
+# Rough characters per token for English text; only used to pick a bucket
+_CHARS_PER_TOKEN = 4
+
+
+def _finish(embedding: np.ndarray, truncate_dim: int | None, normalize: bool) -> np.ndarray:
+    """Same as encode(..., truncate_dim, normalize_embeddings): truncate first, then normalize."""
+    if truncate_dim is not None:
+        embedding = embedding[:truncate_dim]
+    if normalize:
+        embedding = embedding / max(np.linalg.norm(embedding), 1e-12)
+    return embedding
+
+
+class EmbeddingBatcher:
+    """
+    Args:
+        get_model: Callable returning the SentenceTransformer (called once, on the worker thread,
+            so a lazily loaded model is loaded there)
+        max_batch: Texts per encode call
+        max_wait_ms: Deadline for a partially filled batch, from its oldest text
+        buckets: Length bucket bounds in estimated tokens
+    """
+
+    def __init__(self, get_model, max_batch: int = MAX_BATCH, max_wait_ms: float = MAX_WAIT_MS, buckets=BUCKETS):
+        self._get_model = get_model
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait_ms / 1000
+        self.buckets = tuple(buckets)
+        # One queue per bucket of (text, future, enqueued at)
+        self._queues = [deque() for _ in range(len(self.buckets) + 1)]
+        self._cond = threading.Condition()
+        self._closed = False
+        self.batches = 0
+        self.texts = 0
+        self.full_batches = 0
+        self.busy_ms = 0.0
+        self._thread = threading.Thread(target=self._run, name="embed-batcher", daemon=True)
+        self._thread.start()
+
+    def _bucket(self, text: str) -> int:
+        return bisect.bisect_left(self.buckets, len(text) // _CHARS_PER_TOKEN)
+
+    def submit(self, text: str) -> Future:
+        """Future of the full-dimension, unnormalized float32 embedding of text."""
+        future: Future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("EmbeddingBatcher is closed")
+            self._queues[self._bucket(text)].append((text, future, time.monotonic()))
+            self._cond.notify()
+        return future
+
+    def embed(self, text: str, truncate_dim: int | None = None, normalize: bool = False) -> np.ndarray:
+        return _finish(self.submit(text).result(), truncate_dim, normalize)
+
+    def embed_many(self, texts: list[str], truncate_dim: int | None = None, normalize: bool = False) -> np.ndarray:
+        """(len(texts), dim) array, in input order; the texts are batched by length like any others."""
+        futures = [self.submit(text) for text in texts]
+        return np.stack([_finish(f.result(), truncate_dim, normalize) for f in futures])
+
+    def _next_batch(self) -> list | None:
+        """Under the lock: wait until some bucket is full or past its deadline and pop its batch; None once closed and empty."""
+        while True:
+            now = time.monotonic()
+            ready, ready_key, next_deadline = None, None, None
+            for q in self._queues:
+                if not q:
+                    continue
+                deadline = q[0][2] + self.max_wait
+                if len(q) >= self.max_batch or deadline <= now or self._closed:
+                    # Full buckets first, then the one that has waited longest
+                    key = (len(q) < self.max_batch, q[0][2])
+                    if ready is None or key < ready_key:
+                        ready, ready_key = q, key
+                elif next_deadline is None or deadline < next_deadline:
+                    next_deadline = deadline
+            if ready is not None:
+                return [ready.popleft() for _ in range(min(self.max_batch, len(ready)))]
+            if self._closed:
+                return None
+            self._cond.wait(None if next_deadline is None else next_deadline - now)
+
+    def _encode(self, model, batch: list) -> None:
+        start = time.perf_counter()
+        try:
+            embeddings = model.encode(
+                [text for text, _, _ in batch], batch_size=len(batch), convert_to_numpy=True, show_progress_bar=False
+            )
+        except BaseException as e:
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+        for (_, future, _), embedding in zip(batch, embeddings):
+            future.set_result(np.asarray(embedding, dtype=np.float32))
+        with self._cond:
+            self.batches += 1
+            self.texts += len(batch)
+            self.full_batches += len(batch) == self.max_batch
+            self.busy_ms += (time.perf_counter() - start) * 1000
+
+    def _run(self) -> None:
+        model = None
+        while True:
+            with self._cond:
+                batch = self._next_batch()
+            if batch is None:
+                return
+            # Drop futures their callers cancelled: set_result on one raises and would kill this thread
+            batch = [item for item in batch if item[1].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            if model is None:
+                try:
+                    model = self._get_model()
+                except BaseException as e:
+                    for _, future, _ in batch:
+                        future.set_exception(e)
+                    continue
+            self._encode(model, batch)
+
+    def close(self) -> None:
+        """Encode what is already queued, then stop; submit() raises afterwards."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "batches": self.batches,
+                "texts": self.texts,
+                "avg_batch": self.texts / self.batches if self.batches else 0.0,
+                "full_batches": self.full_batches,
+                "queued": sum(len(q) for q in self._queues),
+                "busy_ms": self.busy_ms,
+            }
@@ -0,0 +1,211 @@
+"""
+Async client for OpenRouter's embeddings endpoint (Gemini embeddings) for corpus-scale runs:
+many inputs per request, a bounded number of requests in flight on one pooled aiohttp session,
+a token-bucket limit on the request rate, retries with backoff on 429 / 5xx / connection errors /
+200s without embeddings, and results returned in input order as one float32 array. Texts already
+in the embedding cache (src/embed_cache.py) are not sent.
+
+    async with GeminiEmbeddingClient(api_key) as client:
+        embeddings = await client.embed(texts)          # (len(texts), dimensions)
+
+base_url can point at any server speaking the same API (e.g. the fake one in scripts/bench_gemini_client.py).
+"""
+
+import asyncio
+import random
+import time
+
+import aiohttp
+import numpy as np
+
+from src.embed_cache import get_cache
+
+BASE_URL = "https://openrouter.ai/api/v1"
+MODEL_NAME = "google/gemini-embedding-001"
+_RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class EmbeddingRequestError(Exception):
+    """A request failed with a non-retryable status, or still failed after max_retries."""
+
+
+class TokenBucket:
+    """
+    rate tokens per second, up to capacity banked (the burst). acquire() waits for a token.
+    On a 429, throttle() empties the bucket and halves the rate, so every sender backs off, not
+    just the one that got it; each success wins back a little of the configured rate (AIMD).
+    """
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        self.max_rate = rate
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._throttled_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
+
+    def throttle(self, seconds: float = 0.0) -> None:
+        """
+        Empty the bucket, owe `seconds` worth of tokens, halve the rate. The requests already in
+        flight when the limit was hit all get 429s; only the first of those halves the rate.
+        """
+        self._refill()
+        now = time.monotonic()
+        if now >= self._throttled_until:
+            self.rate = max(self.max_rate / 64, self.rate / 2)
+        self._tokens = min(self._tokens, 0.0) - seconds * self.rate
+        self._throttled_until = now + seconds + 1 / self.rate
+
+    def reward(self) -> None:
+        self.rate = min(self.max_rate, self.rate + self.max_rate / 200)
+
+
+class GeminiEmbeddingClient:
+    """
+    Args:
+        api_key: OpenRouter key (Bearer token)
+        dimensions: Output dimension requested from the model
+        batch_size: Inputs per request
+        max_concurrency: Requests in flight at once (also the connection pool size)
+        requests_per_second: Token-bucket rate; burst: its capacity
+        max_retries: Retries per request on 429 / 5xx / connection errors / timeouts / 200s without data
+        timeout: Seconds per request
+        use_cache: Read and write the persistent embedding cache
+    """
+
+    def __init__(self, api_key: str, dimensions: int = 768, model: str = MODEL_NAME, base_url: str = BASE_URL,
+                 batch_size: int = 64, max_concurrency: int = 8, requests_per_second: float = 5.0,
+                 burst: float | None = None, max_retries: int = 6, timeout: float = 60.0, use_cache: bool = True):
+        self.api_key = api_key
+        self.dimensions = dimensions
+        self.model = model
+        self.url = f"{base_url.rstrip('/')}/embeddings"
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.cache = get_cache(model, dimensions) if use_cache else None
+        self._bucket = TokenBucket(requests_per_second, burst)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._session: aiohttp.ClientSession | None = None
+        self.stats = {"requests": 0, "retries": 0, "rate_limited": 0, "texts_sent": 0, "cache_hits": 0}
+
+    async def __aenter__(self) -> "GeminiEmbeddingClient":
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.max_concurrency),
+            headers={"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"},
+            timeout=self.timeout,
+        )
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self._session.close()
+
+    def _backoff(self, attempt: int, retry_after: str | None) -> float:
+        """Server's Retry-After if given, else exponential with full jitter (capped at 30s)."""
+        if retry_after is not None:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+        return random.uniform(0, min(30.0, 0.5 * 2 ** attempt))
+
+    @staticmethod
+    async def _read_data(response: aiohttp.ClientResponse) -> tuple[list | None, str | None]:
+        """
+        (data items, None) from a 200, or (None, error) when the body is not JSON, carries no
+        "data" list (OpenRouter reports some upstream failures as a 200 with an "error" object) or
+        has an item without an "embedding"; all of these are retried.
+        """
+        try:
+            body = await response.json(content_type=None)
+        except ValueError as e:
+            return None, f"200 with a non-JSON body ({e})"
+        data = body.get("data") if isinstance(body, dict) else None
+        if not isinstance(data, list):
+            detail = body.get("error") if isinstance(body, dict) and "error" in body else body
+            return None, f"200 without data: {str(detail)[:200]}"
+        if not all(isinstance(item, dict) and "embedding" in item for item in data):
+            return None, "200 with a data item without an embedding"
+        return data, None
+
+    async def _post(self, texts: list[str]) -> np.ndarray:
+        """One request for up to batch_size texts; (len(texts), dimensions) in input order."""
+        payload = {"model": self.model, "input": texts, "dimensions": self.dimensions}
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            try:
+                async with self._semaphore:
+                    await self._bucket.acquire()
+                    async with self._session.post(self.url, json=payload) as response:
+                        self.stats["requests"] += 1
+                        if response.status == 200:
+                            data, error = await self._read_data(response)
+                            if data is not None:
+                                self._bucket.reward()
+                                # Items carry their input index; don't rely on the response order
+                                # (an item without one keeps its position)
+                                order = sorted(range(len(data)), key=lambda i: data[i].get("index", i))
+                                data = [data[i] for i in order]
+                                if len(data) != len(texts):
+                                    raise EmbeddingRequestError(f"{len(data)} embeddings for {len(texts)} inputs")
+                                return np.asarray([item["embedding"] for item in data], dtype=np.float32)
+                        else:
+                            body = await response.text()
+                            if response.status not in _RETRY_STATUSES:
+                                raise EmbeddingRequestError(f"HTTP {response.status}: {body[:500]}")
+                            retry_after = response.headers.get("Retry-After")
+                            error = f"HTTP {response.status}"
+                            if response.status == 429:
+                                self.stats["rate_limited"] += 1
+            except (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError) as e:
+                error = f"{type(e).__name__}: {e}"
+            if attempt == self.max_retries:
+                raise EmbeddingRequestError(f"Gave up after {attempt + 1} attempts ({error})")
+            delay = self._backoff(attempt, retry_after)
+            if retry_after is not None or error == "HTTP 429":
+                self._bucket.throttle(delay if retry_after is not None else 0.0)
+            self.stats["retries"] += 1
+            await asyncio.sleep(delay)
+
+    async def _post_batch(self, texts: list[str]) -> np.ndarray:
+        embeddings = await self._post(texts)
+        self.stats["texts_sent"] += len(texts)
+        # Written per batch: a run that fails part-way keeps (and later skips) what it already paid for
+        if self.cache is not None:
+            self.cache.put_many(texts, embeddings)
+        return embeddings
+
+    async def embed(self, texts: list[str]) -> np.ndarray:
+        """(len(texts), dimensions) float32, row i for texts[i]."""
+        if self._session is None:
+            raise RuntimeError("Use `async with GeminiEmbeddingClient(...) as client`")
+        if self.cache is not None:
+            out, found = self.cache.get_many(texts)
+        else:
+            out, found = np.zeros((len(texts), self.dimensions), dtype=np.float32), np.zeros(len(texts), dtype=bool)
+        self.stats["cache_hits"] += int(found.sum())
+        # Each distinct missing text is sent once
+        missing = list(dict.fromkeys(texts[i] for i in np.flatnonzero(~found)))
+        if not missing:
+            return out
+        batches = [missing[i:i + self.batch_size] for i in range(0, len(missing), self.batch_size)]
+        computed = np.concatenate(await asyncio.gather(*(self._post_batch(batch) for batch in batches)))
+        by_text = dict(zip(missing, computed))
+        for i in np.flatnonzero(~found):
+            out[i] = by_text[texts[i]]
+        return out
@@ -1,8 +1,13 @@
+import asyncio
 import os
 from dotenv import load_dotenv
+import numpy as np
 import torch
 import requests
 
+from src.embed_cache import get_cache
+from src.embeddings.gemini_client import MODEL_NAME, GeminiEmbeddingClient
+
 load_dotenv()
 
 OPEN_ROUTER_API_KEY = os.getenv("OPEN_ROUTER_API_KEY")
@@ -11,6 +16,28 @@ if OPEN_ROUTER_API_KEY is None:
 
 
 def get_gemini_embedding(text: str, dimensions: int=768) -> list[float]:
+    # Identical text is only paid for once (src/embed_cache.py)
+    cache = get_cache(MODEL_NAME, dimensions)
+    embedding = cache.get(text)
+    if embedding is None:
+        embedding = _request_embedding(text, dimensions)
+        cache.put(text, embedding)
+    return torch.from_numpy(embedding)
+
+
+def get_gemini_embeddings(texts: list[str], dimensions: int=768, **client_kwargs) -> np.ndarray:
+    """
+    Embeddings of many texts, (len(texts), dimensions) in input order: batched requests, several in
+    flight, rate-limited and retried (src/embeddings/gemini_client.py). Use this for corpora.
+    """
+    async def run():
+        async with GeminiEmbeddingClient(OPEN_ROUTER_API_KEY, dimensions=dimensions, **client_kwargs) as client:
+            return await client.embed(texts)
+
+    return asyncio.run(run())
+
+
+def _request_embedding(text: str, dimensions: int):
 
     response = requests.post(
     "https://openrouter.ai/api/v1/embeddings",
@@ -19,13 +46,13 @@ def get_gemini_embedding(text: str, dimensions: int=768) -> list[float]:
         "Content-Type": "application/json",
     },
     json={
-        "model": "google/gemini-embedding-001",
+        "model": MODEL_NAME,
         "input": text,
         "dimensions": dimensions
-    }
+    },
+    timeout=60,
     )
+    response.raise_for_status()
 
     data = response.json()
-    embedding = torch.tensor(data["data"][0]["embedding"], dtype=torch.float32)
-    
-    return embedding
\ No newline at end of file
+    return np.asarray(data["data"][0]["embedding"], dtype=np.float32)
\ No newline at end of file
@@ -1,80 +1,251 @@
 import json
 import torch
-from sentence_transformers import SentenceTransformer
 from tqdm import tqdm
 import os
+from pathlib import Path
 from dotenv import load_dotenv
 
-load_dotenv()
+import numpy as np
+
+# One shared, lazily loaded instance per process (src/model_registry.py)
+from src.hf_embed import MODEL_NAME, get_model, get_semantic_embed
+from src.embed_cache import get_cache
 
-_MODEL_CACHE_DIR = os.getenv("MODEL_CACHE_DIR")
-_MODEL_INSTANCE = None
-
-def get_model():
-    global _MODEL_INSTANCE
-    if _MODEL_INSTANCE is None:
-        os.makedirs(_MODEL_CACHE_DIR, exist_ok=True)
-        
-        print(f"Loading model into cache at: {_MODEL_CACHE_DIR}")
-        
-        _MODEL_INSTANCE = SentenceTransformer(
-            "Qwen/Qwen3-Embedding-0.6B", 
-            trust_remote_code=False,
-            cache_folder=_MODEL_CACHE_DIR
-        )
-        
-        device = "cuda" if torch.cuda.is_available() else ("mps" if torch.backends.mps.is_available() else "cpu")
-        _MODEL_INSTANCE.to(device)
-        
-    return _MODEL_INSTANCE
+load_dotenv()
 
 def get_qwen_embedding(text: str, truncate_dim: int=256) -> list[float]:
-    model = get_model()
-    embedding = model.encode(text, 
-                            show_progress_bar=True,
-                            convert_to_tensor=True,
-                            normalize_embeddings=True,
-                            truncate_dim=truncate_dim)[0]
-    return embedding
-
-def generate_qwen_embeddings(input_file, output_file, truncate_dim: int=256):
+    # Cached, and batched with other concurrent callers (src/hf_embed.py)
+    embedding = get_semantic_embed(text, truncate_dim=truncate_dim)
+    return torch.from_numpy(embedding / max(np.linalg.norm(embedding), 1e-12))
+
+BATCH_SIZE = 128
+# Rows encoded, written and checkpointed at a time
+CHUNK_SIZE = 4096
+_READ_BYTES = 1 << 20
+
+
+def iter_records(input_file):
+    """
+    Records of a metadata file one at a time, without loading the whole file: a JSON array of
+    objects (as written by scripts/data.py) or JSON lines (.jsonl).
+    """
+    with open(input_file, 'r', encoding='utf-8') as f:
+        if str(input_file).endswith('.jsonl'):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+            return
+
+        decoder = json.JSONDecoder()
+        buf, pos, eof = "", 0, False
+
+        def fill():
+            nonlocal buf, pos, eof
+            chunk = f.read(_READ_BYTES)
+            eof = not chunk
+            buf, pos = buf[pos:] + chunk, 0
+
+        def next_char():
+            """Skip whitespace; the next character, or "" at end of file."""
+            nonlocal pos
+            while True:
+                while pos < len(buf) and buf[pos].isspace():
+                    pos += 1
+                if pos < len(buf) or eof:
+                    return buf[pos:pos + 1]
+                fill()
+
+        if next_char() != '[':
+            raise ValueError(f"{input_file}: expected a JSON array")
+        pos += 1
+        while True:
+            c = next_char()
+            if c in (']', ''):
+                return
+            if c == ',':
+                pos += 1
+                continue
+            try:
+                # Records are objects, so a record cut off at the end of buf never parses as complete
+                record, pos = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                fill()
+                continue
+            yield record
+
+
+def record_text(item) -> str:
+    title = item.get('title', "")
+    abstract = item.get('abstract', "")
+    if not title and not abstract:
+        return "Paper content unavailable"
+    return f"{title}. {abstract}"
+
+
+def count_records(input_file) -> int:
+    return sum(1 for _ in iter_records(input_file))
+
+
+def _checkpoint_path(npy_path: Path) -> Path:
+    return npy_path.with_name(npy_path.name + ".ckpt.json")
+
+
+def _write_checkpoint(path: Path, state: dict) -> None:
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(state))
+    os.replace(tmp, path)
+
+
+def read_checkpoint(npy_path) -> dict | None:
+    path = _checkpoint_path(Path(npy_path))
+    return json.loads(path.read_text()) if path.exists() else None
+
+
+def shard_range(num_rows: int, shard: int, num_shards: int) -> tuple[int, int]:
+    """Row range [start, end) of shard i of n, as even as possible."""
+    bounds = np.linspace(0, num_rows, num_shards + 1).astype(int)
+    return int(bounds[shard]), int(bounds[shard + 1])
+
+
+def _encode_chunk(texts, truncate_dim: int) -> np.ndarray:
+    """Normalized, truncated embeddings; only texts missing from the cache (src/embed_cache.py) are encoded."""
+    embeddings = get_cache(MODEL_NAME, truncate_dim).get_or_compute(
+        texts,
+        # The model is only loaded if something is missing
+        lambda missing: get_model().encode(
+            missing,
+            batch_size=BATCH_SIZE,
+            show_progress_bar=False,
+            convert_to_numpy=True,
+            truncate_dim=truncate_dim
+        ),
+    )
+    # The cache holds unnormalized rows; normalizing after truncation is what encode() does
+    # Floored like embed_server's: an all-zero row (degenerate text) stays zero instead of NaN
+    return embeddings / np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+
+
+def generate_qwen_embeddings(input_file, output_file, truncate_dim: int=256, start: int=0, end: int | None=None,
+                             chunk_size: int=CHUNK_SIZE, num_rows: int | None=None):
+    """
+    Embed rows [start, end) of a metadata file into a float32 .npy, streaming the records and
+    writing each chunk into a preallocated memmap. <output>.ckpt.json records the rows done after
+    every chunk, so an interrupted run resumes where it stopped when called again with the same
+    arguments. For sharding, give each process its own output file and row range (shard_range),
+    then merge_shards.
+
+    Args:
+        input_file: Metadata JSON array / JSON lines, one record per graph node, in node order
+        output_file: .npy path; a .pt path gets a .npy next to it and, once all rows are done, the
+            torch tensor that the training / pipeline code loads
+        truncate_dim: Embedding dimension
+        start, end: Row range (end: all rows)
+        chunk_size: Rows per encode / write / checkpoint
+        num_rows: Records in input_file, if known (otherwise counted with one streaming pass)
+
+    Returns:
+        Path of the .npy
+    """
     print(f"Loading {input_file}...")
     if not os.path.exists(input_file):
         print(f"Error: {input_file} not found.")
         return
 
-    with open(input_file, 'r') as f:
-        data = json.load(f)
+    output_file = Path(output_file)
+    npy_path = output_file.with_suffix(".npy")
+    ckpt_path = _checkpoint_path(npy_path)
+    stat = os.stat(input_file)
+    state = read_checkpoint(npy_path)
+    expected = {"input": str(Path(input_file).resolve()), "input_size": stat.st_size, "input_mtime": stat.st_mtime,
+                "dim": truncate_dim, "start": start}
+    resume = (state is not None and npy_path.exists() and end in (None, state["end"])
+              and all(state.get(k) == v for k, v in expected.items()))
+    if resume:
+        end = state["end"]
+        embeddings = np.load(npy_path, mmap_mode="r+")
+        print(f"Resuming at row {start + state['done']} of [{start}, {end})")
+    else:
+        if end is None:
+            end = num_rows if num_rows is not None else count_records(input_file)
+        state = {**expected, "end": end, "rows": end - start, "done": 0}
+        npy_path.parent.mkdir(parents=True, exist_ok=True)
+        embeddings = np.lib.format.open_memmap(npy_path, mode="w+", dtype=np.float32, shape=(end - start, truncate_dim))
+        _write_checkpoint(ckpt_path, state)
+        print(f"Embedding rows [{start}, {end}) into {npy_path}")
 
+    first = start + state["done"]
+    pbar = tqdm(total=end - start, initial=state["done"], desc="Embedding")
     texts = []
-    for item in data:
-        title = item.get('title', "")
-        abstract = item.get('abstract', "")
-        if not title and not abstract:
-            text = "Paper content unavailable"
-        else:
-            text = f"{title}. {abstract}"
-        texts.append(text)
-
-    print(f"Loaded {len(texts)} papers. Loading model...")
-
-    model = get_model()
-
-    BATCH_SIZE = 128
-    
-    print("Generating embeddings...")
-    embeddings = model.encode(
-        texts, 
-        batch_size=BATCH_SIZE, 
-        show_progress_bar=True, 
-        convert_to_tensor=True,
-        normalize_embeddings=True,
-        truncate_dim=truncate_dim
-    )
-    embeddings = embeddings[:, :truncate_dim]
-    print(f"Original shape: {embeddings.shape}")
-    print(f"Truncated shape: {embeddings.shape}")
+    for i, item in enumerate(iter_records(input_file)):
+        if i < first:
+            continue
+        if i >= end:
+            break
+        texts.append(record_text(item))
+        if len(texts) == chunk_size or i == end - 1:
+            row = state["done"]
+            embeddings[row:row + len(texts)] = _encode_chunk(texts, truncate_dim)
+            # Data before checkpoint: a crash in between only redoes this chunk
+            embeddings.flush()
+            state["done"] = row + len(texts)
+            _write_checkpoint(ckpt_path, state)
+            pbar.update(len(texts))
+            texts = []
+    pbar.close()
+    del embeddings
+
+    if state["done"] != state["rows"]:
+        raise ValueError(f"{input_file} has fewer records than row {end} ({start + state['done']} read)")
+    print(f"Done: {npy_path} ({state['rows']} rows)")
+    if output_file.suffix == ".pt":
+        _save_tensor(npy_path, output_file)
+    return npy_path
+
+
+def merge_shards(shard_files, output_file, num_rows: int | None=None):
+    """
+    Concatenate completed shards (generate_qwen_embeddings outputs) into one .npy, in row order,
+    without holding more than one chunk in memory. Their row ranges must tile [0, num_rows) exactly
+    (num_rows: the input's record count; if not given, the end of the last shard).
+    """
+    if not shard_files:
+        raise ValueError("No shards to merge")
+    shards = []
+    for path in shard_files:
+        path = Path(path).with_suffix(".npy")
+        state = read_checkpoint(path)
+        if state is None or state["done"] != state["rows"]:
+            raise ValueError(f"{path} is not a completed shard")
+        shards.append((state["start"], state["end"], path, state["dim"]))
+    shards.sort()
+    if shards[0][0] != 0 or any(prev[1] != nxt[0] for prev, nxt in zip(shards, shards[1:])):
+        raise ValueError(f"Shard ranges do not tile the rows: {[(s, e) for s, e, _, _ in shards]}")
+    if num_rows is not None and shards[-1][1] != num_rows:
+        raise ValueError(f"Shards end at row {shards[-1][1]}, input has {num_rows}")
+    if len({dim for _, _, _, dim in shards}) != 1:
+        raise ValueError("Shards have different dimensions")
+
+    output_file = Path(output_file)
+    npy_path = output_file.with_suffix(".npy")
+    merged = np.lib.format.open_memmap(npy_path, mode="w+", dtype=np.float32, shape=(shards[-1][1], shards[0][3]))
+    for shard_start, shard_end, path, _ in shards:
+        shard = np.load(path, mmap_mode="r")
+        for row in range(0, shard_end - shard_start, CHUNK_SIZE):
+            block = shard[row:row + CHUNK_SIZE]
+            merged[shard_start + row:shard_start + row + len(block)] = block
+    merged.flush()
+    del merged
+    print(f"Merged {len(shards)} shards into {npy_path} ({shards[-1][1]} rows)")
+    if output_file.suffix == ".pt":
+        _save_tensor(npy_path, output_file)
+    return npy_path
+
 
+def _save_tensor(npy_path: Path, output_file: Path) -> None:
+    """The .pt (torch tensor) form of a finished .npy, for code that torch.loads the embeddings."""
     print(f"Saving to {output_file}...")
-    torch.save(embeddings.cpu(), output_file)
-    print("Done!")
\ No newline at end of file
+    tmp = output_file.with_name(f"{output_file.name}.{os.getpid()}.tmp")
+    torch.save(torch.from_numpy(np.load(npy_path)), tmp)
+    os.replace(tmp, output_file)
@@ -8,13 +8,13 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 import torch
-from torch_geometric.data import Data
-from torch_geometric.utils import k_hop_subgraph, subgraph
+from torch_geometric.data import Batch, Data
+from torch_geometric.utils import subgraph
 import numpy as np
-from contextlib import contextmanager
+from src import model_registry
 from src.model import EmbedderGNNv3
+from src.csr_sampler import CSRGraph, sample_query_graph
 from src.data_loader import load_ogbn_arxiv, unsafe_load_ogbn_arxiv
-from src.hf_embed import get_semantic_embed
 
 INPUT_DIM = 384   # 128 (Original) + 256 (Qwen)
 HIDDEN_DIM = 256
@@ -26,10 +26,31 @@ if torch.cuda.is_available():
 elif torch.backends.mps.is_available():
     device = torch.device("mps")
 
-# Load model
-model = EmbedderGNNv3(INPUT_DIM, HIDDEN_DIM, OUTPUT_DIM, num_layers=4)
-model.load_state_dict(torch.load("ml_pipeline/models/gnn_contrastive_v2.pth", map_location=device))
-model.eval()
+MODEL_PATH = Path(__file__).resolve().parent.parent / "models" / "gnn_contrastive_v2.pth"
+
+
+def _load_model():
+    model = EmbedderGNNv3(INPUT_DIM, HIDDEN_DIM, OUTPUT_DIM, num_layers=4)
+    model.load_state_dict(torch.load(MODEL_PATH, map_location=device))
+    model.eval()
+    return model
+
+
+def _warmup(model):
+    # Tiny query graph: new paper (masked) citing two nodes
+    x = torch.zeros(3, INPUT_DIM)
+    edge_index = torch.tensor([[0, 0], [1, 2]], dtype=torch.long)
+    with torch.no_grad():
+        model(x, edge_index)
+
+
+# Loaded on first use (or model_registry.warmup())
+model_registry.register("gnn", _load_model, warmup=_warmup)
+
+
+def get_model():
+    return model_registry.get("gnn")
+
 
 def get_cluster(data, center=None, num_neighbors=[10, 10, 5]):
     """Extract k-hop neighborhood with sampling. num_neighbors: list of ints per hop."""
@@ -127,15 +148,71 @@ def build_query_graph(base_graph, cited_node_ids, num_neighbors=[10, 10, 5]):
     return final_subgraph, reordered_orig_ids
 
 
-def endpoint(graph, citation_ids): 
+# id(graph) -> (graph, its CSRGraph); the graph reference keeps the id from being reused
+_csr_cache = {}
+
+
+def prepare_graph(graph):
+    """CSR index of a full graph (Data) for endpoint(); built once per graph object."""
+    if isinstance(graph, CSRGraph):
+        return graph
+    cached = _csr_cache.get(id(graph))
+    if cached is None or cached[0] is not graph:
+        cached = (graph, CSRGraph.from_data(graph))
+        _csr_cache[id(graph)] = cached
+    return cached[1]
+
+
+def endpoint(graph, citation_ids, rng=None):
+    """
+    GNN embedding of a new paper from its citation list. graph: the full Data or prepare_graph(graph).
+    Samples the neighbourhood from the CSR index with the paper as a virtual node (sample_query_graph),
+    so the full feature matrix and edge list are never scanned or copied. build_query_graph is the
+    original, O(E)-per-hop version of the same sampling.
+    """
     # Build the neighbourhood subgraph (center at index 0, will be masked)
-    neighbourhood_graph, orig_ids = build_query_graph(graph, citation_ids)
+    neighbourhood_graph, orig_ids = sample_query_graph(prepare_graph(graph), citation_ids, rng=rng)
     # Forward pass
     with torch.no_grad():
-        embeddings = model(neighbourhood_graph.x, neighbourhood_graph.edge_index)
+        embeddings = get_model()(neighbourhood_graph.x, neighbourhood_graph.edge_index)
     # Return the embedding of the new paper (always at index 0)
     return embeddings[0]
 
+
+def batch_endpoint(graph, citation_lists, batch_size=256, rng=None):
+    """
+    GNN embeddings of many new papers, one per citation list: same as calling endpoint() for each,
+    but the sampled neighbourhoods are packed into disjoint-union mini-batches (Batch.from_data_list)
+    and each mini-batch is one forward pass. Every graph's center (its first node) is masked.
+    No messages cross between graphs, and in eval mode BatchNorm uses its running statistics,
+    so the result does not depend on what else is in the batch.
+
+    Args:
+        graph: Full graph (Data) or prepare_graph(graph)
+        citation_lists: One list of cited node IDs per new paper
+        batch_size: Query graphs per forward pass (bounds peak memory)
+        rng: numpy Generator for the neighbour sampling (default: fresh, unseeded)
+
+    Returns:
+        (len(citation_lists), OUTPUT_DIM) tensor, in input order
+    """
+    csr = prepare_graph(graph)
+    rng = rng or np.random.default_rng()
+    model = get_model()
+    out = []
+    for start in range(0, len(citation_lists), batch_size):
+        graphs = [sample_query_graph(csr, ids, rng=rng)[0] for ids in citation_lists[start:start + batch_size]]
+        batch = Batch.from_data_list(graphs)
+        centers = batch.ptr[:-1]
+        center_mask = torch.zeros(batch.num_nodes, dtype=torch.bool)
+        center_mask[centers] = True
+        with torch.no_grad():
+            embeddings = model(batch.x, batch.edge_index, center_mask=center_mask)
+        out.append(embeddings[centers])
+    if not out:
+        return torch.empty(0, OUTPUT_DIM)
+    return torch.cat(out, dim=0)
+
 if __name__ == "__main__":
     # Load data
     dataset = unsafe_load_ogbn_arxiv()
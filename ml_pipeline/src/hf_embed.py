@@ -1,8 +1,12 @@
-from sentence_transformers import SentenceTransformer
 from dotenv import load_dotenv
 import os
 import torch
 
+import threading
+
+from src import model_registry
+from src.embed_cache import get_cache
+from src.embed_server import EmbeddingBatcher
 
 MODEL_NAME = "Qwen/Qwen3-Embedding-0.6B"
 
@@ -10,10 +14,45 @@ load_dotenv()
 
 MODEL_CACHE_DIR = os.getenv("MODEL_CACHE_DIR")
 
-model = SentenceTransformer(MODEL_NAME, cache_folder=MODEL_CACHE_DIR)
+
+def _load_model() -> "SentenceTransformer":
+    # Imported here: sentence_transformers alone takes seconds to import
+    from sentence_transformers import SentenceTransformer
+
+    device = "cuda" if torch.cuda.is_available() else ("mps" if torch.backends.mps.is_available() else "cpu")
+    return SentenceTransformer(MODEL_NAME, cache_folder=MODEL_CACHE_DIR, device=device)
+
+
+def _warmup(model: "SentenceTransformer") -> None:
+    model.encode(["warmup", "a slightly longer warmup sentence for the second length"], truncate_dim=256)
+
+
+# Loaded on first use (or model_registry.warmup()), shared with embeddings/qwen_embed.py
+model_registry.register("qwen", _load_model, warmup=_warmup)
+
+
+def get_model() -> "SentenceTransformer":
+    return model_registry.get("qwen")
+
+
+_batcher = None
+_batcher_lock = threading.Lock()
+
+
+def get_batcher() -> EmbeddingBatcher:
+    """Process-wide dynamic batcher: concurrent single-text calls share model.encode batches."""
+    global _batcher
+    with _batcher_lock:
+        if _batcher is None:
+            _batcher = EmbeddingBatcher(get_model)
+        return _batcher
+
 
 def get_semantic_embed(text: str, truncate_dim: int=256) -> list[float]:
-    return model.encode(text, truncate_dim=truncate_dim)
+    # Cached by content (src/embed_cache.py); unnormalized, so qwen_embed can share the entries
+    return get_cache(MODEL_NAME, truncate_dim).get_or_compute(
+        [text], lambda missing: get_batcher().embed_many(missing, truncate_dim=truncate_dim)
+    )[0]
 
 if __name__ == "__main__":
     abstract = "Humans invent new words when there is a rising demand for a new useful concept\ (e.g., doomscrolling). We explore and validate a similar idea in our communication with LLMs: introducing new words to better understand and control the models, expanding on the recently introduced neologism learning. This method introduces a new word by adding a new word embedding and training with examples that exhibit the concept with no other changes in model parameters. We show that adding a new word allows for control of concepts such as flattery, incorrect answers, text length, as well as more complex concepts in AxBench. We discover that neologisms can also further our understanding of the model via self-verbalization: models can describe what each new word means to them in natural language, like explaining that a word that represents a concept of incorrect answers means ``a lack of complete, coherent, or meaningful answers...'' To validate self-verbalizations, we introduce plug-in evaluation: we insert the verbalization into the context of a model and measure whether it controls the target concept. In some self-verbalizations, we find machine-only synonyms: words that seem unrelated to humans but cause similar behavior in machines. Finally, we show how neologism learning can jointly learn multiple concepts in multiple words."
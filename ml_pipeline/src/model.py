@@ -104,9 +104,14 @@ class EmbedderGNNv3(nn.Module):
     # Input format (probably): 
     # x: (n, F)
     # edge_index: (2, E)
-    def forward(self, x, edge_index):
+    # center_mask: (n,) bool, nodes to replace with the mask token; default node 0 only.
+    #   For a disjoint-union batch of query graphs, mark each graph's first node.
+    def forward(self, x, edge_index, center_mask=None):
         x = x.clone().detach()
-        x[0] = self.mask_embed
+        if center_mask is None:
+            x[0] = self.mask_embed
+        else:
+            x[center_mask] = self.mask_embed
 
         for i in range(self.num_layers):
             h = self.convs[i](x, edge_index)
@@ -0,0 +1,133 @@
+"""
+Process-wide registry of the ml_pipeline models. Modules register a loader (and optionally a
+warmup function) at import, which is cheap; the model is loaded on first get() and shared by
+everything in the process. warmup() loads and runs one small pass ahead of time, so a serving
+process decides when it pays for loading instead of its first request.
+
+    python -m src.model_registry      # from ml_pipeline/: load + warm every model, print load time / memory
+"""
+
+import os
+import resource
+import threading
+import time
+
+# CPU threads per process for torch intra-op work; default: all cores.
+# Processes sharing a machine (e.g. pipeline workers) should split the cores instead.
+NUM_THREADS = int(os.getenv("ML_NUM_THREADS", "0")) or os.cpu_count() or 1
+
+_loaders = {}  # name -> (loader, warmup)
+_models = {}
+_stats = {}  # name -> load/warmup timings and memory
+_lock = threading.Lock()
+_threads_configured = False
+
+
+def _rss_bytes() -> int:
+    """Current resident set size (Linux); peak RSS elsewhere."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if os.uname().sysname == "Darwin" else peak * 1024
+
+
+def _param_bytes(model) -> int:
+    """Parameter + buffer bytes of a torch module (0 for anything else)."""
+    try:
+        tensors = list(model.parameters()) + list(model.buffers())
+    except AttributeError:
+        return 0
+    return sum(t.numel() * t.element_size() for t in tensors)
+
+
+def configure_threads(num_threads: int | None = None) -> int:
+    """
+    Set torch's intra-op and inter-op thread counts. Takes effect once per process, before the
+    first model is loaded (torch cannot resize its inter-op pool after parallel work has started).
+    """
+    global _threads_configured, NUM_THREADS
+    import torch
+
+    with _lock:
+        if _threads_configured:
+            return NUM_THREADS
+        NUM_THREADS = num_threads or NUM_THREADS
+        # HF tokenizers spawn their own pool; it oversubscribes alongside torch and breaks under fork
+        os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+        torch.set_num_threads(NUM_THREADS)
+        try:
+            torch.set_num_interop_threads(1)
+        except RuntimeError:
+            pass  # already fixed by earlier parallel work in this process
+        _threads_configured = True
+    return NUM_THREADS
+
+
+def register(name: str, loader, warmup=None) -> None:
+    """loader() -> model; warmup(model) runs one representative pass."""
+    _loaders[name] = (loader, warmup)
+
+
+def get(name: str):
+    """The shared instance of a registered model, loading it on first use."""
+    model = _models.get(name)
+    if model is not None:
+        return model
+    configure_threads()
+    loader, _ = _loaders[name]
+    with _lock:
+        model = _models.get(name)
+        if model is None:
+            rss = _rss_bytes()
+            start = time.perf_counter()
+            model = loader()
+            _stats[name] = {
+                "load_s": round(time.perf_counter() - start, 2),
+                "rss_delta_mb": round((_rss_bytes() - rss) / 2**20, 1),
+                "param_mb": round(_param_bytes(model) / 2**20, 1),
+                "warmup_s": None,
+            }
+            _models[name] = model
+            print(f"Loaded model {name} in {_stats[name]['load_s']}s (+{_stats[name]['rss_delta_mb']} MB RSS)")
+    return model
+
+
+def warmup(names=None) -> dict:
+    """Load and warm the given models (default: all registered); returns stats()."""
+    for name in names or list(_loaders):
+        model = get(name)
+        _, warm = _loaders[name]
+        if warm is not None and _stats[name]["warmup_s"] is None:
+            start = time.perf_counter()
+            warm(model)
+            _stats[name]["warmup_s"] = round(time.perf_counter() - start, 2)
+    return stats()
+
+
+def is_loaded(name: str) -> bool:
+    return name in _models
+
+
+def stats() -> dict:
+    return {
+        "num_threads": NUM_THREADS,
+        "models": {name: {"loaded": name in _models, **_stats.get(name, {})} for name in _loaders},
+    }
+
+
+if __name__ == "__main__":
+    import sys
+    from pathlib import Path
+
+    sys.path.insert(0, str(Path(__file__).parent.parent))
+    # Run as a script, this module is __main__: the models register into src.model_registry, so use that copy
+    from src import gnn_embed_new, hf_embed  # noqa: F401  (registers their models)
+    from src import model_registry as registry
+
+    report = registry.warmup()
+    print(f"\nthreads: {report['num_threads']}")
+    print(f"{'model':<8}{'load s':>8}{'warmup s':>10}{'RSS MB':>9}{'params MB':>11}")
+    for name, s in report["models"].items():
+        print(f"{name:<8}{s['load_s']:>8}{s['warmup_s']:>10}{s['rss_delta_mb']:>9}{s['param_mb']:>11}")
@@ -0,0 +1,5 @@
+"""Makes `src` importable the way ml_pipeline's scripts do (from the ml_pipeline directory)."""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("torch_geometric")
+
+from torch_geometric.data import Data  # noqa: E402
+
+from src.csr_sampler import CSRGraph, sample_query_graph  # noqa: E402
+
+NUM_NODES = 300
+# Enough per hop that nothing is sampled away: both samplers are then deterministic
+KEEP_ALL = [NUM_NODES] * 3
+
+
+@pytest.fixture(scope="module")
+def graph():
+    rng = np.random.default_rng(0)
+    edge_index = torch.from_numpy(rng.integers(0, NUM_NODES, size=(2, 2000)))
+    return Data(x=torch.randn(NUM_NODES, 6), edge_index=edge_index, num_nodes=NUM_NODES)
+
+
+def _edges(sub, orig_ids) -> list[tuple[int, int]]:
+    """Sampled edges in original node ids (the new paper is NUM_NODES), sorted."""
+    src, dst = orig_ids[sub.edge_index].tolist()
+    return sorted(zip(src, dst))
+
+
+def test_matches_baseline_neighbourhood(graph):
+    from src.gnn_embed_new import build_query_graph
+
+    cited = [5, 17, 17, 120, 299]
+    base_sub, base_ids = build_query_graph(graph, cited, num_neighbors=KEEP_ALL)
+    sub, ids = sample_query_graph(CSRGraph.from_data(graph), cited, num_neighbors=KEEP_ALL)
+
+    assert ids[0] == base_ids[0] == NUM_NODES
+    assert sorted(ids.tolist()) == sorted(base_ids.tolist())
+    assert _edges(sub, ids) == _edges(base_sub, base_ids)
+    assert torch.equal(sub.x[1:], graph.x[ids[1:]])
+    assert not sub.x[0].any()
+
+
+def test_sampled_neighbourhood_is_induced(graph):
+    cited = list(range(0, 60, 3))
+    sub, ids = sample_query_graph(CSRGraph.from_data(graph), cited, num_neighbors=[4, 3, 2], rng=np.random.default_rng(1))
+    subset = set(ids[1:].tolist())
+    # At most 4 citations, 3 neighbours of each of those, 2 of each of those
+    assert 0 < len(subset) <= 4 + 4 * 3 + 4 * 3 * 2
+
+    src, dst = graph.edge_index.tolist()
+    induced = [(s, d) for s, d in zip(src, dst) if s in subset and d in subset]
+    assert _edges(sub, ids) == sorted(induced + [(NUM_NODES, c) for c in cited if c in subset])
+
+
+def test_same_rng_same_neighbourhood(graph):
+    csr = CSRGraph.from_data(graph)
+    first = sample_query_graph(csr, [1, 2, 3, 4, 5, 6], rng=np.random.default_rng(7))
+    second = sample_query_graph(csr, [1, 2, 3, 4, 5, 6], rng=np.random.default_rng(7))
+    assert torch.equal(first[1], second[1]) and torch.equal(first[0].edge_index, second[0].edge_index)
+
+
+def test_no_citations_is_the_new_paper_alone(graph):
+    sub, ids = sample_query_graph(CSRGraph.from_data(graph), [])
+    assert sub.num_nodes == 1 and sub.edge_index.shape == (2, 0) and ids.tolist() == [NUM_NODES]
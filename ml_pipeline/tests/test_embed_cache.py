@@ -0,0 +1,100 @@
+import multiprocessing
+
+import numpy as np
+import pytest
+
+from src.embed_cache import KEY_BYTES, EmbeddingCache
+
+MODEL = "test/model"
+DIM = 8
+
+
+def _vector(text: str) -> np.ndarray:
+    """Deterministic per text, so every process computes the same embedding."""
+    seed = int.from_bytes(text.encode()[:8].ljust(8, b"\0"), "little") ^ len(text)
+    return np.random.default_rng(seed).standard_normal(DIM).astype(np.float32)
+
+
+def _put_in_other_process(cache_dir, texts) -> None:
+    EmbeddingCache(MODEL, DIM, cache_dir).put_many(texts, np.stack([_vector(t) for t in texts]))
+
+
+def _lookup_in_other_process(cache_dir, texts) -> tuple[list[bool], int]:
+    cache = EmbeddingCache(MODEL, DIM, cache_dir)
+    vectors, found = cache.get_many(texts)
+    matches = all(np.array_equal(v, _vector(t)) for v, t, f in zip(vectors, texts, found) if f)
+    return found.tolist(), int(matches)
+
+
+@pytest.fixture
+def pool():
+    with multiprocessing.get_context("spawn").Pool(4) as pool:
+        yield pool
+
+
+def test_hit_and_miss(tmp_path):
+    cache = EmbeddingCache(MODEL, DIM, tmp_path)
+    cache.put_many(["a b", "c"], np.stack([_vector("a b"), _vector("c")]))
+    vectors, found = cache.get_many(["c", "  a \n b ", "d"])
+    assert found.tolist() == [True, True, False]
+    assert np.array_equal(vectors[0], _vector("c")) and np.array_equal(vectors[1], _vector("a b"))
+    assert not vectors[2].any()
+    assert (cache.hits, cache.misses) == (2, 1)
+    # A cache for another dimension is a different cache
+    assert not EmbeddingCache(MODEL, DIM * 2, tmp_path).get_many(["c"])[1].any()
+
+
+def test_get_or_compute_encodes_each_missing_text_once(tmp_path):
+    cache = EmbeddingCache(MODEL, DIM, tmp_path)
+    cache.put("a", _vector("a"))
+    calls = []
+
+    def compute(missing):
+        calls.append(missing)
+        return np.stack([_vector(t) for t in missing])
+
+    out = cache.get_or_compute(["b", "a", "b", "c"], compute)
+    assert calls == [["b", "c"]]
+    assert all(np.array_equal(row, _vector(t)) for row, t in zip(out, ["b", "a", "b", "c"]))
+    cache.get_or_compute(["c", "b"], compute)
+    assert len(calls) == 1
+
+
+def test_rows_written_by_another_process_are_hits(tmp_path, pool):
+    cache = EmbeddingCache(MODEL, DIM, tmp_path)
+    assert not cache.get_many(["x", "y"])[1].any()
+
+    pool.apply(_put_in_other_process, (tmp_path, ["x", "y"]))
+    # An open cache picks them up on its next miss; a fresh process sees them from the files
+    vectors, found = cache.get_many(["x", "y"])
+    assert found.all() and np.array_equal(vectors[1], _vector("y"))
+    assert pool.apply(_lookup_in_other_process, (tmp_path, ["y", "x", "z"])) == ([True, True, False], 1)
+
+
+def test_concurrent_writers_keep_rows_aligned(tmp_path, pool):
+    # Overlapping batches: each text must end up stored once, next to its own vector
+    batches = [[f"text {i}" for i in range(start, start + 300)] for start in range(0, 1200, 200)]
+    pool.starmap(_put_in_other_process, [(tmp_path, batch) for batch in batches])
+
+    texts = sorted({t for batch in batches for t in batch})
+    cache = EmbeddingCache(MODEL, DIM, tmp_path)
+    assert len(cache) == len(texts)
+    vectors, found = cache.get_many(texts)
+    assert found.all()
+    assert all(np.array_equal(v, _vector(t)) for v, t in zip(vectors, texts))
+
+
+def test_torn_tail_is_dropped(tmp_path):
+    cache = EmbeddingCache(MODEL, DIM, tmp_path)
+    cache.put_many(["a", "b"], np.stack([_vector("a"), _vector("b")]))
+    # A crash after the vector append but before the key append
+    with open(cache.vectors_path, "ab") as f:
+        f.write(_vector("c").tobytes())
+    with open(cache.keys_path, "ab") as f:
+        f.write(b"\1" * (KEY_BYTES // 2))
+
+    reopened = EmbeddingCache(MODEL, DIM, tmp_path)
+    assert len(reopened) == 2
+    reopened.put("c", _vector("c"))
+    vectors, found = reopened.get_many(["a", "b", "c"])
+    assert found.all() and np.array_equal(vectors[2], _vector("c"))
@@ -0,0 +1,113 @@
+import asyncio
+
+import numpy as np
+import pytest
+from aiohttp import web
+
+from src.embeddings.gemini_client import EmbeddingRequestError, GeminiEmbeddingClient
+
+DIM = 4
+
+
+def _embedding(text: str) -> list[float]:
+    return [float(len(text)), float(sum(map(ord, text))), 1.0, -1.0]
+
+
+def _ok(inputs: list[str]) -> web.Response:
+    """Items in reverse order, with their index, like the real API may return them."""
+    data = [{"index": i, "embedding": _embedding(t)} for i, t in enumerate(inputs)]
+    return web.json_response({"data": data[::-1]})
+
+
+async def _embed(script, texts, **kwargs):
+    """
+    Embed texts against a server answering request i with script[i](inputs) (the last entry
+    repeats). Returns (embeddings or the raised exception, client stats, requests served).
+    """
+    served = []
+
+    async def embeddings(request: web.Request) -> web.Response:
+        inputs = (await request.json())["input"]
+        served.append(inputs)
+        return script[min(len(served), len(script)) - 1](inputs)
+
+    app = web.Application()
+    app.router.add_post("/embeddings", embeddings)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    client = GeminiEmbeddingClient(
+        "test-key", dimensions=DIM, base_url=f"http://127.0.0.1:{port}", requests_per_second=1000.0,
+        use_cache=False, **kwargs,
+    )
+    client._backoff = lambda attempt, retry_after: 0.0
+    try:
+        async with client:
+            try:
+                result = await client.embed(texts)
+            except EmbeddingRequestError as e:
+                result = e
+    finally:
+        await runner.cleanup()
+    return result, client.stats, served
+
+
+def _expected(texts):
+    return np.asarray([_embedding(t) for t in texts], dtype=np.float32)
+
+
+def test_results_in_input_order():
+    texts = ["a", "bb", "ccc", "bb"]
+    result, stats, served = asyncio.run(_embed([_ok], texts, batch_size=2))
+    assert np.array_equal(result, _expected(texts))
+    # The duplicate is sent once
+    assert sorted(sum(served, [])) == ["a", "bb", "ccc"] and stats["requests"] == 2
+
+
+def test_429_is_retried():
+    def rate_limited(inputs):
+        return web.json_response({"error": "rate limited"}, status=429, headers={"Retry-After": "0"})
+
+    result, stats, served = asyncio.run(_embed([rate_limited, rate_limited, _ok], ["a", "b"]))
+    assert np.array_equal(result, _expected(["a", "b"]))
+    assert stats["rate_limited"] == 2 and stats["retries"] == 2 and len(served) == 3
+
+
+@pytest.mark.parametrize("bad_200", [
+    lambda inputs: web.json_response({"error": {"message": "upstream error", "code": 502}}),
+    lambda inputs: web.Response(text="<html>upstream error</html>", content_type="text/html"),
+    lambda inputs: web.json_response({"data": [{"index": i} for i in range(len(inputs))]}),
+    lambda inputs: web.json_response({"data": [None] * len(inputs)}),
+])
+def test_200_without_embeddings_is_retried(bad_200):
+    result, stats, served = asyncio.run(_embed([bad_200, _ok], ["a", "b"]))
+    assert np.array_equal(result, _expected(["a", "b"]))
+    assert stats["retries"] == 1 and len(served) == 2
+
+
+def test_items_without_index_keep_their_position():
+    def no_index(inputs):
+        return web.json_response({"data": [{"embedding": _embedding(t)} for t in inputs]})
+
+    result, _, _ = asyncio.run(_embed([no_index], ["a", "bb"]))
+    assert np.array_equal(result, _expected(["a", "bb"]))
+
+
+def test_gives_up_after_max_retries():
+    def unavailable(inputs):
+        return web.json_response({"error": "unavailable"}, status=503)
+
+    result, stats, served = asyncio.run(_embed([unavailable], ["a"], max_retries=2))
+    assert isinstance(result, EmbeddingRequestError) and "HTTP 503" in str(result)
+    assert len(served) == 3 and stats["retries"] == 2
+
+
+def test_client_errors_are_not_retried():
+    def bad_request(inputs):
+        return web.json_response({"error": "bad model"}, status=400)
+
+    result, _, served = asyncio.run(_embed([bad_request], ["a"]))
+    assert isinstance(result, EmbeddingRequestError) and "HTTP 400" in str(result)
+    assert len(served) == 1